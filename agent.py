@@ -1,36 +1,55 @@
 import random
-# used only for debugging
-from maze_generator import print_maze
+from array import array
+from collections import deque
+from time import perf_counter
 
-DIRECTIONS = {
-        "NORTH": (-1, 0),
-        "SOUTH": (1, 0),
-        "WEST": (0, -1),
-        "EAST": (0, 1)
-    }
+from cells import Cell
+from planner import DEADLINE_CHECK, DIRECTIONS, AStarPlanner, DStarLitePlanner, closest_move
 
 TILES = {
-    "START": "START",
-    "GOLD": "GOLD",
-    "WALL": "OBSTACLE",
-    "FREE": "EMPTY",
+    "START": Cell.START.name,
+    "GOLD": Cell.GOLD.name,
+    "WALL": Cell.OBSTACLE.name,
+    "FREE": Cell.EMPTY.name,
     "UNKNOWN": "UNKNOWN",
     "BARRIER": "BARRIER"
 }
 
+# bit flags of a tile in the agent's map
+KNOWN = 1
+FREE = 2
+WALL = 4
+BARRIER = 8
+VISITED = 16
+
+# which combinations of flags cannot be entered, on the way to gold unknown tiles are treated as free,
+# on the way back to start as barriers
+BLOCKED = bytes(1 if flags & (WALL | BARRIER) else 0 for flags in range(256))
+BLOCKED_WITH_UNKNOWN = bytes(1 if flags & (WALL | BARRIER) or not flags & KNOWN else 0 for flags in range(256))
+
+# distance of tiles not connected to start by known free tiles
+UNREACHED = 0xffffffff
+# flag of a tile of the search from gold (search_from_gold) whose neighbors were already searched,
+# the lower bits hold the index of the direction leading towards gold + 1
+EXPANDED = 8
+
+# planners which can be used on the way to gold, None means a full BFS every step
+PLANNERS = {
+    "bfs": None,
+    "astar": AStarPlanner,
+    "dstar": DStarLitePlanner
+}
+
 
 class Node:
     """
     A single node of a search tree used to search possible routes in the maze.
-    Each node represents one step finishing at the position stored in self.position
-    and has its children (following steps of possible routes) stored in self.children.
+    Each node represents one step finishing at the position stored in self.position.
     """
     def __init__(self, origin, position):
         # contains the first move of the route taken to get to this node
-        # or a list of all moves taken to get to this node (depends on what is needed)
         self.origin = origin
         self.position = position
-        self.children = []
 
 
 class Agent:
@@ -39,32 +58,83 @@ class Agent:
     Receives size of the maze and the maximum number of steps to find the gold in the maze.
     Agent is supplied with its position in the maze, his field of vision, gold position and number of steps passed in
     the maze when the action method is called. Based on this information, agent has to decide which action to take.
+    The planner used on the way to gold is selected by its name from PLANNERS.
+    With time_budget (seconds), searching on the way to gold stops when the budget of the step is spent,
+    the agent moves towards gold meanwhile and the search continues in the next step (see search_from_gold).
     """
 
-    def __init__(self, maze_size, step_limit, start_position, gold_position):
+    def __init__(self, maze_size, step_limit, start_position, gold_position, planner="bfs", time_budget=None):
         self.step_limit = step_limit
         self.maze_size = maze_size
         self.agent_position = start_position
         self.start_position = start_position
         self.gold_position = gold_position
 
+        # map of the maze, flat bytearray of tile flags indexed by r * cols + c
         self.maze = None
+        # indexes of tiles with barriers
+        self.barriers = set()
+        self.blocked = BLOCKED
         self.init_maze()
 
         self.gold_found = False
         self.route_back = None
         self.steps_back_taken = 0
-        self.visited_tiles = []
-        for i in range(self.maze_size[0]):
-            self.visited_tiles.append([False] * self.maze_size[1])
+
+        # shortest path tree rooted at start over the known free tiles, kept up to date while exploring,
+        # distance from start and index of the direction used to enter the tile + 1 (0 for start)
+        area = self.maze_size[0] * self.maze_size[1]
+        self.start_distance = array("I", [UNREACHED]) * area
+        self.start_distance[self.index(self.start_position)] = 0
+        self.entered_from = bytearray(area)
+
+        self.planner = None
+        # number of tiles expanded by BFS on the way to gold, planners count their own
+        self.expanded = 0
+        self.time_budget = time_budget
+        # perf_counter time by which the current step should be decided, None without time budget
+        self.deadline = None
+        # whether the search of the current step was interrupted by the deadline and the number of such steps
+        self.interrupted = False
+        self.interruptions = 0
+        # resumable BFS from gold used with the time budget, see search_from_gold
+        self.gold_tree = None
+        self.gold_frontier = None
+        if PLANNERS[planner] is not None:
+            self.planner = PLANNERS[planner](self.maze_size, self.gold_position, self.is_obstacle)
 
     def init_maze(self):
         """initialize maze map with the positions of start and gold"""
-        self.maze = []
-        for i in range(self.maze_size[0]):
-            self.maze.append([TILES["UNKNOWN"]] * self.maze_size[1])
-        self.maze[self.start_position[0]][self.start_position[1]] = TILES["START"]
-        self.maze[self.gold_position[0]][self.gold_position[1]] = TILES["GOLD"]
+        self.maze = bytearray(self.maze_size[0] * self.maze_size[1])
+        self.maze[self.index(self.start_position)] = KNOWN | FREE
+        self.maze[self.index(self.gold_position)] = KNOWN | FREE
+
+    def index(self, tile):
+        """returns index of the tile of the given coordinates in the map"""
+        return tile[0] * self.maze_size[1] + tile[1]
+
+    def tile(self, tile):
+        """returns the tile of the given coordinates as one of TILES"""
+        flags = self.maze[self.index(tile)]
+        if flags & WALL:
+            return TILES["WALL"]
+        if self.blocked[flags]:
+            return TILES["BARRIER"]
+        if not flags & KNOWN:
+            return TILES["UNKNOWN"]
+        if tuple(tile) == self.start_position:
+            return TILES["START"]
+        if tuple(tile) == self.gold_position:
+            return TILES["GOLD"]
+        return TILES["FREE"]
+
+    def maze_layout(self):
+        """returns the map as 2-D list of TILES (e.g. for print_maze)"""
+        return [[self.tile((row, col)) for col in range(self.maze_size[1])] for row in range(self.maze_size[0])]
+
+    def is_visited(self, tile):
+        """returns true if the agent has already been on the tile of the given coordinates"""
+        return bool(self.maze[self.index(tile)] & VISITED)
 
     def is_out_of_bounds(self, tile):
         """returns true if the given coordinates are out of bounds of the maze"""
@@ -79,32 +149,100 @@ class Agent:
 
     def save_observation(self, observation):
         """saves the observed information"""
-        # update visited_tiles
-        self.visited_tiles[observation.position[0]][observation.position[1]] = True
+        maze = self.maze
+        rows, cols = self.maze_size
+        # mark the tile as visited
+        maze[self.index(observation.position)] |= VISITED
 
         # check if gold has been retrieved
         if not self.gold_found and self.agent_position == self.gold_position:
             self.gold_found = True
 
         # save visible tiles in each direction
-        for direction in observation.vision:
-            observed_pos = [self.agent_position[0], self.agent_position[1]]
-            # save visible free tiles
-            for i in range(observation.vision[direction]):
-                observed_pos[0] += DIRECTIONS[direction][0]
-                observed_pos[1] += DIRECTIONS[direction][1]
-                if self.maze[observed_pos[0]][observed_pos[1]] != TILES["BARRIER"]:
-                    self.maze[observed_pos[0]][observed_pos[1]] = TILES["FREE"]
+        observed = []
+        revealed = []
+        for direction, distance in observation.vision.items():
+            move_r, move_c = DIRECTIONS[direction]
+            r, c = self.agent_position
+            # save visible free tiles (barriers and visits stay)
+            for i in range(distance):
+                r += move_r
+                c += move_c
+                index = r * cols + c
+                if not maze[index] & KNOWN:
+                    revealed.append(index)
+                maze[index] |= KNOWN | FREE
+                observed.append((r, c))
             # save visible wall tile
-            observed_pos[0] += DIRECTIONS[direction][0]
-            observed_pos[1] += DIRECTIONS[direction][1]
-            if not self.is_out_of_bounds(observed_pos):
-                self.maze[observed_pos[0]][observed_pos[1]] = TILES["WALL"]
+            r += move_r
+            c += move_c
+            if 0 <= r < rows and 0 <= c < cols:
+                index = r * cols + c
+                # the wall may cut a route of the search from gold through an unknown tile
+                if self.gold_tree is not None and self.gold_tree[index] & EXPANDED and not maze[index] & WALL:
+                    self.gold_tree = None
+                maze[index] = KNOWN | WALL
+                observed.append((r, c))
+
+        if revealed:
+            self.extend_start_tree(revealed)
+        # let the planner repair its search around the observed tiles
+        if self.planner is not None:
+            self.planner.update(observed)
 
-        # rewrite start and gold
-        if self.maze[self.start_position[0]][self.start_position[1]] != TILES["BARRIER"]:
-            self.maze[self.start_position[0]][self.start_position[1]] = TILES["START"]
-        self.maze[self.gold_position[0]][self.gold_position[1]] = TILES["GOLD"]
+    def extend_start_tree(self, revealed):
+        """
+        Connects newly revealed free tiles to the shortest path tree rooted at start.
+        Known free tiles never become obstacles, so distances can only decrease
+        and only the tiles whose distance decreased are propagated further.
+        """
+        maze, distance, entered_from = self.maze, self.start_distance, self.entered_from
+        rows, cols = self.maze_size
+        # steps to the neighbours in the order of DIRECTIONS
+        steps = (-cols, cols, -1, 1)
+        queue = deque()
+        for index in revealed:
+            r, c = divmod(index, cols)
+            # the revealed tile is entered from its nearest known neighbour (moving opposite to the step to it)
+            for i, inside in enumerate((r > 0, r < rows - 1, c > 0, c < cols - 1)):
+                neighbor = index + steps[i]
+                if inside and maze[neighbor] & FREE and distance[neighbor] + 1 < distance[index]:
+                    distance[index] = distance[neighbor] + 1
+                    entered_from[index] = (i ^ 1) + 1
+            if distance[index] != UNREACHED:
+                queue.append(index)
+
+        while queue:
+            index = queue.popleft()
+            new_distance = distance[index] + 1
+            r, c = divmod(index, cols)
+            for i, inside in enumerate((r > 0, r < rows - 1, c > 0, c < cols - 1)):
+                if not inside:
+                    continue
+                neighbor = index + steps[i]
+                if maze[neighbor] & FREE and new_distance < distance[neighbor]:
+                    distance[neighbor] = new_distance
+                    entered_from[neighbor] = i + 1
+                    queue.append(neighbor)
+
+    def route_to_start(self):
+        """
+        Returns list of directions leading from the agent to start by the shortest route over the known tiles
+        read from the maintained tree, None if the agent is not connected to start.
+        """
+        directions = list(DIRECTIONS.items())
+        cols = self.maze_size[1]
+        index = self.index(self.agent_position)
+        if self.start_distance[index] == UNREACHED:
+            return None
+        route = []
+        while self.entered_from[index]:
+            i = self.entered_from[index] - 1
+            move_r, move_c = directions[i][1]
+            # go back against the direction the tile was entered by
+            route.append(directions[i ^ 1][0])
+            index -= move_r * cols + move_c
+        return route
 
     def random_action(self):
         """Moves randomly"""
@@ -116,56 +254,90 @@ class Agent:
         :param observation: includes tuple "position" and dictionary "vision"
         :return: One of the actions from ACTIONS.keys()
         """
+        if self.time_budget is not None:
+            self.deadline = perf_counter() + self.time_budget
+        self.interrupted = False
         # save agent's position
         self.agent_position = observation.position
         # save observed tiles
         self.save_observation(observation)
 
-        # during the way to gold, perform BFS every turn
+        # during the way to gold, perform BFS (or replan incrementally) every turn
         if not self.gold_found:
-            ret = self.perform_BFS(TILES["GOLD"])
-            # check for dead ends
-            self.check_for_dead_ends(ret)
-        # during the way back to start, perform BFS only once and save the whole route
+            if self.planner is None:
+                ret = self.perform_BFS(TILES["GOLD"])
+            else:
+                ret = self.plan_to_gold()
+            # check for dead ends, the move after an interrupted search need not lead to gold
+            if not self.interrupted:
+                self.check_for_dead_ends(ret)
+        # during the way back to start, follow the route read from the maintained tree of routes to start
         else:
             if not self.route_back:
-                self.remove_barriers()
                 self.add_barriers_for_unknown_tiles()
-                self.route_back = self.perform_BFS(TILES["START"])
-            ret = self.route_back[self.steps_back_taken]
-            self.steps_back_taken += 1
+                self.steps_back_taken = 0
+                self.route_back = self.route_to_start()
+                # the tree should always reach the agent, search the route if it does not
+                if self.route_back is None:
+                    self.remove_barriers()
+                    self.route_back = self.find_route(self.start_position)
+            if self.route_back and self.steps_back_taken < len(self.route_back):
+                ret = self.route_back[self.steps_back_taken]
+                self.steps_back_taken += 1
+            else:
+                # start cannot be reached over the known tiles, move randomly and search again in the next step
+                self.route_back = None
+                ret = self.random_action()
 
         return ret
 
+    def plan_to_gold(self):
+        """Returns the direction of the next move to Gold found by the incremental planner."""
+        ret = self.planner.next_action(self.agent_position, self.deadline)
+        # barriers "locked agent in" somewhere, remove them and replan
+        if ret is None and not self.planner.interrupted:
+            self.remove_barriers()
+            ret = self.planner.next_action(self.agent_position, self.deadline)
+        if self.planner.interrupted:
+            self.interrupted = True
+            self.interruptions += 1
+        # no route exists even through the unknown tiles (or none was found before the deadline)
+        if ret is None:
+            ret = self.random_action()
+        return ret
+
     def check_for_dead_ends(self, next_move):
         """Adds barriers to cut off dead ends in order to reduce computation time."""
         next_move = DIRECTIONS[next_move]
         next_position = (self.agent_position[0] + next_move[0], self.agent_position[1] + next_move[1])
-        if self.visited_tiles[next_position[0]][next_position[1]]:
-            self.maze[self.agent_position[0]][self.agent_position[1]] = TILES["BARRIER"]
+        if self.is_visited(next_position):
+            index = self.index(self.agent_position)
+            self.maze[index] |= BARRIER
+            self.barriers.add(index)
+            if self.gold_tree is not None and self.gold_tree[index] & EXPANDED:
+                self.gold_tree = None
+            if self.planner is not None:
+                self.planner.update([self.agent_position])
 
     def remove_barriers(self):
         """Removes all barriers to be able to find way back to the Start."""
-        for row in range(self.maze_size[0]):
-            for col in range(self.maze_size[1]):
-                if self.maze[row][col] == TILES["BARRIER"]:
-                    self.maze[row][col] = TILES["FREE"]
-        self.maze[self.start_position[0]][self.start_position[1]] = TILES["START"]
+        removed = []
+        for index in self.barriers:
+            self.maze[index] &= ~BARRIER
+            removed.append(divmod(index, self.maze_size[1]))
+        self.barriers.clear()
+        if removed:
+            self.gold_tree = None
+        if self.planner is not None:
+            self.planner.update(removed)
 
     def add_barriers_for_unknown_tiles(self):
         """Add barriers to unknown tiles to ignore unknown parts of the maze on the way back to start."""
-        for row in range(self.maze_size[0]):
-            for col in range(self.maze_size[1]):
-                if self.maze[row][col] == TILES["UNKNOWN"]:
-                    self.maze[row][col] = TILES["BARRIER"]
+        self.blocked = BLOCKED_WITH_UNKNOWN
 
     def is_obstacle(self, coordinates):
         """Checks whether the tile of the given coordinates is an obstacle."""
-        if self.maze[coordinates[0]][coordinates[1]] == TILES["WALL"]:
-            return True
-        if self.maze[coordinates[0]][coordinates[1]] == TILES["BARRIER"]:
-            return True
-        return False
+        return bool(self.blocked[self.maze[coordinates[0] * self.maze_size[1] + coordinates[1]]])
 
     def perform_BFS(self, target):
         """
@@ -173,75 +345,165 @@ class Agent:
         Treats all unknown tiles as empty tiles.
         :return: if target is GOLD: The direction which to take in the next move to get to Gold by the shortest path.
                  if target is START: A list of all directions to take to get to Start by the shortest path.
+        With a deadline, Gold is searched by the resumable search_from_gold instead.
         """
         # just to make finding errors easier
         if target != TILES["GOLD"] and target != TILES["START"]:
             return None
+        if target == TILES["START"]:
+            return self.find_route(self.start_position)
+        if self.deadline is not None:
+            return self.search_from_gold()
 
+        rows, cols = self.maze_size
+        maze, blocked = self.maze, self.blocked
+        target_position = self.gold_position
         # root represents 0th step (current position)
-        if target == TILES["GOLD"]:
-            root = Node(None, self.agent_position)
-        else:
-            root = Node([], self.agent_position)
-        # a list of all visited coordinates
-        visited = []
-        for i in range(self.maze_size[0]):
-            visited.append([False] * self.maze_size[1])
+        root = Node(None, self.agent_position)
+        # flags of all visited coordinates
+        visited = bytearray(rows * cols)
         # keeps the last generation of nodes so we can access them
         youngest_nodes = []
         youngest_nodes_buffer = []
 
         # perform the first iteration of BFS (it is slightly different)
-        for dir in DIRECTIONS:
-            new_position = (root.position[0] + DIRECTIONS[dir][0], root.position[1] + DIRECTIONS[dir][1])
-            if self.is_out_of_bounds(new_position):
+        for dir, (move_r, move_c) in DIRECTIONS.items():
+            r, c = root.position[0] + move_r, root.position[1] + move_c
+            if r < 0 or c < 0 or r >= rows or c >= cols:
                 continue
-            if self.maze[new_position[0]][new_position[1]] == target:
-                if target == TILES["GOLD"]:
-                    return dir
-                else:
-                    return [dir]
-            if not self.is_obstacle((new_position[0], new_position[1])):
-                if target == TILES["GOLD"]:
-                    new_node = Node(dir, new_position)
-                else:
-                    new_node = Node([dir], new_position)
-                root.children.append(new_node)
-                youngest_nodes.append(new_node)
-                visited[new_position[0]][new_position[1]] = True
+            if (r, c) == target_position:
+                return dir
+            if not blocked[maze[r * cols + c]]:
+                youngest_nodes.append(Node(dir, (r, c)))
+                visited[r * cols + c] = 1
 
         # perform the rest of BFS to find target
         while True:
             # safety check if generated barriers "locked agent in" somewhere (probably not necessary)
-            if target == TILES["GOLD"] and len(youngest_nodes) == 0:
+            if len(youngest_nodes) == 0:
                 self.remove_barriers()
                 return self.perform_BFS(target)
 
+            self.expanded += len(youngest_nodes)
             for node in youngest_nodes:
-                for dir in DIRECTIONS:
-                    new_position = (node.position[0] + DIRECTIONS[dir][0], node.position[1] + DIRECTIONS[dir][1])
-                    if self.is_out_of_bounds(new_position):
+                for move_r, move_c in DIRECTIONS.values():
+                    r, c = node.position[0] + move_r, node.position[1] + move_c
+                    if r < 0 or c < 0 or r >= rows or c >= cols:
                         continue
-                    if visited[new_position[0]][new_position[1]]:
+                    index = r * cols + c
+                    if visited[index]:
                         continue
-                    if self.maze[new_position[0]][new_position[1]] == target:
-                        if target == TILES["GOLD"]:
-                            return node.origin
-                        else:
-                            new_origin = node.origin
-                            new_origin.append(dir)
-                            return new_origin
-                    if not self.is_obstacle((new_position[0], new_position[1])):
-                        if target == TILES["GOLD"]:
-                            new_node = Node(node.origin, new_position)
-                        else:
-                            new_origin = []
-                            for item in node.origin:
-                                new_origin.append(item)
-                            new_origin.append(dir)
-                            new_node = Node(new_origin, new_position)
-                        node.children.append(new_node)
-                        youngest_nodes_buffer.append(new_node)
-                        visited[new_position[0]][new_position[1]] = True
+                    if (r, c) == target_position:
+                        return node.origin
+                    if not blocked[maze[index]]:
+                        youngest_nodes_buffer.append(Node(node.origin, (r, c)))
+                        visited[index] = 1
             youngest_nodes = youngest_nodes_buffer
             youngest_nodes_buffer = []
+
+    def search_from_gold(self):
+        """
+        BFS from Gold to the agent, used with the time budget instead of the BFS from the agent.
+        The search is rooted at Gold, so it stays valid when the agent moves: it is kept between the steps
+        (the tree in gold_tree, the queue of tiles to expand in gold_frontier) and continues until it reaches the agent.
+        It starts anew only when a tile it has already expanded gets blocked or barriers are removed,
+        tiles blocked before they are expanded are skipped.
+        The deadline is checked once per DEADLINE_CHECK expanded tiles, at least that many are expanded every step.
+        :return: direction of the first move of the shortest route to Gold; if the search is interrupted,
+                 the move to the free neighbor closest to Gold
+        """
+        rows, cols = self.maze_size
+        maze, blocked = self.maze, self.blocked
+        directions = list(DIRECTIONS.items())
+        gold = self.index(self.gold_position)
+        if self.gold_tree is None:
+            self.gold_tree = bytearray(rows * cols)
+            self.gold_tree[gold] = len(directions) + 1
+            self.gold_frontier = deque([gold])
+        tree, frontier = self.gold_tree, self.gold_frontier
+        agent = self.index(self.agent_position)
+        deadline = self.deadline
+        expanded = 0
+        while not tree[agent]:
+            if not frontier:
+                self.expanded += expanded
+                # barriers "locked agent in" somewhere, remove them and search again
+                if self.barriers:
+                    self.remove_barriers()
+                    return self.search_from_gold()
+                return self.random_action()
+            if expanded >= DEADLINE_CHECK and not expanded & (DEADLINE_CHECK - 1) and perf_counter() > deadline:
+                self.expanded += expanded
+                self.interrupted = True
+                self.interruptions += 1
+                return self.closest_move()
+            index = frontier.popleft()
+            if index != gold and blocked[maze[index]]:
+                continue
+            tree[index] |= EXPANDED
+            expanded += 1
+            r, c = divmod(index, cols)
+            for i, (_, (move_r, move_c)) in enumerate(directions):
+                new_r, new_c = r + move_r, c + move_c
+                if new_r < 0 or new_c < 0 or new_r >= rows or new_c >= cols:
+                    continue
+                neighbor = new_r * cols + new_c
+                if tree[neighbor]:
+                    continue
+                # the agent may stand on a barrier, other blocked tiles cannot be entered
+                if neighbor == agent or not blocked[maze[neighbor]]:
+                    # moving against the direction of the expansion leads back towards gold
+                    tree[neighbor] = (i ^ 1) + 1
+                    frontier.append(neighbor)
+        self.expanded += expanded
+        return directions[(tree[agent] & ~EXPANDED) - 1][0]
+
+    def closest_move(self):
+        """Returns the direction of the move to a free neighbor closest to Gold, a random move if there is none"""
+        maze, blocked = self.maze, self.blocked
+        direction = closest_move(self.agent_position, self.gold_position, self.maze_size,
+                                 lambda index: blocked[maze[index]])
+        return direction if direction is not None else self.random_action()
+
+    def find_route(self, target):
+        """
+        Performs BFS to find the shortest path to the given target position and returns a list of all directions to take
+        to get there, None if the target cannot be reached.
+        Only the direction of the move into each tile is stored during the search, the route is rebuilt at the end.
+        """
+        rows, cols = self.maze_size
+        directions = list(DIRECTIONS.items())
+        # index of the direction used to enter the tile + 1, 0 for tiles not visited yet
+        predecessors = bytearray(rows * cols)
+        root = self.agent_position
+        predecessors[root[0] * cols + root[1]] = len(directions) + 1
+
+        queue = deque([root])
+        while queue:
+            position = queue.popleft()
+            for i, (dir, move) in enumerate(directions):
+                new_position = (position[0] + move[0], position[1] + move[1])
+                if self.is_out_of_bounds(new_position):
+                    continue
+                index = new_position[0] * cols + new_position[1]
+                if predecessors[index]:
+                    continue
+                if new_position == target:
+                    predecessors[index] = i + 1
+                    return self.rebuild_route(predecessors, new_position)
+                if not self.is_obstacle(new_position):
+                    predecessors[index] = i + 1
+                    queue.append(new_position)
+        return None
+
+    def rebuild_route(self, predecessors, position):
+        """Follows the stored directions back from the given position to the agent and returns them in order."""
+        directions = list(DIRECTIONS.items())
+        cols = self.maze_size[1]
+        route = []
+        while position != self.agent_position:
+            dir, move = directions[predecessors[position[0] * cols + position[1]] - 1]
+            route.append(dir)
+            position = (position[0] - move[0], position[1] - move[1])
+        route.reverse()
+        return route
@@ -0,0 +1,193 @@
+import numpy as np
+
+from maze_keeper import ACTIONS, OBSTACLE_CODE, Grid, Observation, build_vision_table
+
+"""
+Vectorized maze keeper running many episodes in lockstep.
+State of all episodes is kept in NumPy arrays, so a step of every episode is a handful of array operations
+instead of one MazeKeeper.agent_move call per episode.
+Actions are given as indexes into ACTION_NAMES, vision is returned in the same order of directions.
+"""
+
+ACTION_NAMES = list(ACTIONS.keys())
+ACTION_INDEX = {name: i for i, name in enumerate(ACTION_NAMES)}
+MOVES = np.array(list(ACTIONS.values()), dtype=np.int64)
+
+
+class BatchObservation:
+    """Observations of all episodes in a batch.
+    Observation variables:
+    position: array of shape (K, 2), (r,c) coordinates of the agents
+    vision: array of shape (K, 4), number of cells to the closest obstacle or edge of the
+    maze in each direction from ACTION_NAMES.
+    """
+
+    def __init__(self, vision, position):
+        self.position = position
+        self.vision = vision
+
+    def __len__(self):
+        return len(self.position)
+
+    def __getitem__(self, episode):
+        """Returns Observation of a single episode as produced by MazeKeeper"""
+        vision = dict(zip(ACTION_NAMES, self.vision[episode].tolist()))
+        return Observation(vision=vision, position=tuple(self.position[episode].tolist()))
+
+
+class BatchMazeKeeper:
+    """
+    Handles interaction between K agents and their mazes.
+    Either one layout is shared by all episodes (give the layout and the number of episodes as count),
+    or every episode has its own layout (give a list of K layouts of the same size).
+    Layouts can be given either as 2-D lists of MAZE_OBJECTS or as Grids.
+    """
+
+    def __init__(self, layouts, count=None):
+        if count is not None:
+            layouts = [layouts]
+        grids = [layout if isinstance(layout, Grid) else Grid.from_layout(layout) for layout in layouts]
+        self.rows, self.cols = grids[0].rows, grids[0].cols
+        if any((grid.rows, grid.cols) != (self.rows, self.cols) for grid in grids):
+            raise Exception('All layouts of the batch must have the same size')
+        self.count = len(grids) if count is None else count
+
+        # per layout data: start, gold and a (area, 4) vision table
+        self.start_index = np.array([self._flat(grid.unique('START')) for grid in grids], dtype=np.int64)
+        self.gold_index = np.array([self._flat(grid.unique('GOLD')) for grid in grids], dtype=np.int64)
+        self.vision_table = np.stack([self._vision_array(grid) for grid in grids])
+        # passability of every cell of every layout
+        self.movable = np.stack([np.frombuffer(bytes(grid.cells), dtype=np.uint8) != OBSTACLE_CODE for grid in grids])
+
+        # per episode state
+        if count is None:
+            self.layout_index = np.arange(self.count)
+        else:
+            self.layout_index = np.zeros(self.count, dtype=np.int64)
+        self.cell = self.start_index[self.layout_index].copy()
+        self.has_gold = np.zeros(self.count, dtype=bool)
+        self.finished = np.zeros(self.count, dtype=bool)
+
+    def _flat(self, position):
+        return position[0] * self.cols + position[1]
+
+    @staticmethod
+    def _vision_array(grid):
+        table = build_vision_table(grid)
+        return np.stack([np.frombuffer(table[direction], dtype=table[direction].typecode)
+                         for direction in ACTION_NAMES], axis=1)
+
+    @property
+    def agent_position(self):
+        """(K, 2) array of (r,c) positions of the agents"""
+        return np.stack(np.divmod(self.cell, self.cols), axis=1)
+
+    def observation(self):
+        """Returns current BatchObservation of all agents"""
+        self.has_gold |= self.cell == self.gold_index[self.layout_index]
+        self.finished |= self.has_gold & (self.cell == self.start_index[self.layout_index])
+        return BatchObservation(vision=self.vision_table[self.layout_index, self.cell],
+                                position=self.agent_position)
+
+    def agent_move(self, actions):
+        """
+        Executes actions of all agents, actions of finished episodes are ignored.
+        If an agent tries to move into an obstacle or edge of the maze, he stays at the same position.
+        :param actions: array of K indexes into ACTION_NAMES (or K names from ACTIONS.keys())
+        :return BatchObservation: new observations of the agents after executing the moves.
+        """
+        actions = np.asarray(actions)
+        if actions.dtype.kind in 'US':
+            actions = np.array([ACTION_INDEX[action] for action in actions.tolist()])
+        r, c = np.divmod(self.cell, self.cols)
+        r = r + MOVES[actions, 0]
+        c = c + MOVES[actions, 1]
+        inside = (r >= 0) & (r < self.rows) & (c >= 0) & (c < self.cols)
+        new_cell = np.where(inside, r * self.cols + c, self.cell)
+        move = inside & ~self.finished & self.movable[self.layout_index, new_cell]
+        self.cell = np.where(move, new_cell, self.cell)
+        return self.observation()
+
+
+class AgentPolicy:
+    """
+    Batch policy running one agent object per episode, for agents which cannot act on whole batches.
+    Agents of finished episodes are not asked for actions anymore.
+    """
+
+    def __init__(self, agents):
+        self.agents = agents
+
+    def __call__(self, observation, active):
+        actions = np.zeros(len(self.agents), dtype=np.int64)
+        for episode in np.flatnonzero(active).tolist():
+            actions[episode] = ACTION_INDEX[self.agents[episode].select_action(observation[episode])]
+        return actions
+
+
+def random_policy(seed=None):
+    """Returns batch policy moving every agent randomly"""
+    rng = np.random.default_rng(seed)
+
+    def policy(observation, active):
+        return rng.integers(len(ACTION_NAMES), size=len(observation))
+    return policy
+
+
+class BatchSimulation:
+    """
+    Simulation of many episodes in lockstep.
+    The policy is called once per step with the BatchObservation and a mask of unfinished episodes and returns
+    an array of action indexes. If agent class is given instead, one agent object is created for every episode.
+    """
+
+    def __init__(self, maze_size=(30, 50), episodes=1000, step_limit=5000, maze_generator=None, shared_layout=True,
+                 policy=None, agent=None):
+        self.step_limit = step_limit
+        self.maze_size = maze_size
+        if shared_layout:
+            self.layouts = [maze_generator(maze_size)]
+            self.maze_keeper = BatchMazeKeeper(self.layouts[0], count=episodes)
+        else:
+            self.layouts = [maze_generator(maze_size) for _ in range(episodes)]
+            self.maze_keeper = BatchMazeKeeper(self.layouts)
+
+        if policy is None:
+            keeper = self.maze_keeper
+            agents = []
+            for episode in range(episodes):
+                layout = keeper.layout_index[episode]
+                start = divmod(int(keeper.start_index[layout]), keeper.cols)
+                gold = divmod(int(keeper.gold_index[layout]), keeper.cols)
+                agents.append(agent(maze_size, step_limit, start, gold))
+            policy = AgentPolicy(agents)
+        self.policy = policy
+
+    def run(self):
+        """
+        Runs all episodes until they finish or reach the step limit.
+        :return: (finished, steps) arrays, whether each episode brought the gold to the start and in how many steps
+        """
+        keeper = self.maze_keeper
+        observation = keeper.observation()
+        steps = np.zeros(keeper.count, dtype=np.int64)
+        step = 0
+        while step < self.step_limit and not keeper.finished.all():
+            step += 1
+            active = ~keeper.finished
+            steps += active
+            observation = keeper.agent_move(self.policy(observation, active))
+        return keeper.finished.copy(), steps
+
+
+if __name__ == '__main__':
+    from maze_generator import generate_maze
+    import time
+
+    for episodes in [100, 1000, 10000]:
+        start = time.time()
+        sim = BatchSimulation(maze_size=(20, 20), episodes=episodes, step_limit=1000, maze_generator=generate_maze,
+                              policy=random_policy(42))
+        finished, steps = sim.run()
+        finish = time.time()
+        print('{} random episodes: {} finished, {:.3f} s'.format(episodes, finished.sum(), finish - start))
@@ -0,0 +1,186 @@
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from maze_keeper import ACTIONS, Grid, MazeKeeper
+from maze_generator import build_grid, generate_maze, is_feasible
+from agent import Agent
+
+"""
+Performance measurements of the maze generator, keeper and agent.
+Every benchmark is warmed up and repeated, the results contain statistical summary of the time of one operation
+and can be saved to JSON to compare runs over time.
+Run this file from console, use --help to see the options.
+"""
+
+SIZES = [5, 20, 70, 200, 500, 1000, 2000]
+CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'maze_cli.py')
+# largest maze size for each planner, BFS planner explores the whole maze every step
+PLANNER_MAX_SIZES = {'bfs': 200, 'astar': 500, 'dstar': 2000}
+
+
+def summarize(times):
+    """Returns statistical summary of the measured times in seconds"""
+    return {'repeat': len(times),
+            'min': min(times),
+            'max': max(times),
+            'mean': statistics.mean(times),
+            'median': statistics.median(times),
+            'stdev': statistics.stdev(times) if len(times) > 1 else 0.0}
+
+
+def measure(func, operations=1, repeat=5, warmup=1):
+    """
+    Calls func warmup times without measuring and then repeat times measuring the time.
+    :param operations: number of operations performed by one call of func, the times are divided by it
+    :return: summary of the time of one operation
+    """
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) / operations)
+    return summarize(times)
+
+
+def bench_startup(arguments=('--help',), repeat=5, warmup=1):
+    """Time from starting the maze_cli process until it exits, the interpreter start included"""
+    command = [sys.executable, CLI, *arguments]
+    return measure(lambda: subprocess.run(command, stdout=subprocess.DEVNULL, check=True), repeat=repeat,
+                   warmup=warmup)
+
+
+def bench_generate(size, repeat=5, warmup=1):
+    return measure(lambda: generate_maze((size, size)), repeat=repeat, warmup=warmup)
+
+
+def bench_build(size, repeat=5, warmup=1):
+    """Time of building the maze on the cell codes, without the feasibility check and the translation to names"""
+    return measure(lambda: build_grid((size, size)), repeat=repeat, warmup=warmup)
+
+
+def bench_translate(layout, repeat=5, warmup=1):
+    """Time of translating the layout of cell names to Grid of cell codes and back"""
+    return measure(lambda: Grid.from_layout(layout).to_layout(), repeat=repeat, warmup=warmup)
+
+
+def bench_feasible(layout, repeat=5, warmup=1):
+    return measure(lambda: is_feasible(layout), repeat=repeat, warmup=warmup)
+
+
+def bench_keeper_move(layout, steps=10000, repeat=5, warmup=1):
+    """Time of one MazeKeeper.agent_move with random actions"""
+    keeper = MazeKeeper(layout)
+    rng = random.Random(0)
+    moves = [rng.choice(list(ACTIONS.keys())) for _ in range(steps)]
+
+    def run():
+        for action in moves:
+            keeper.agent_move(action)
+    return measure(run, operations=steps, repeat=repeat, warmup=warmup)
+
+
+def bench_keeper_vision(layout, calls=10000, repeat=5, warmup=1):
+    """Time of one MazeKeeper._agent_vision from random free positions"""
+    keeper = MazeKeeper(layout)
+    rng = random.Random(0)
+    grid = keeper.grid
+    free = [(r, c) for r in range(grid.rows) for c in range(grid.cols) if grid.is_movable((r, c))]
+    positions = [rng.choice(free) for _ in range(calls)]
+
+    def run():
+        for position in positions:
+            keeper.agent_position = position
+            keeper._agent_vision()
+    return measure(run, operations=calls, repeat=repeat, warmup=warmup)
+
+
+def bench_select_action(layout, planner='bfs', steps=200, repeat=5, warmup=1):
+    """
+    Time of one Agent.select_action during the first steps of an episode,
+    the summary also contains the mean number of tiles the planner expanded per step
+    """
+    def run():
+        keeper = MazeKeeper(layout)
+        agent = Agent((len(layout), len(layout[0])), steps, keeper.start_position, keeper.gold_position,
+                      planner=planner)
+        observation = keeper.observation()
+        elapsed = 0.0
+        step = 0
+        while step < steps and not keeper.finished:
+            step += 1
+            start = time.perf_counter()
+            action = agent.select_action(observation)
+            elapsed += time.perf_counter() - start
+            observation = keeper.agent_move(action)
+        expanded = agent.planner.expanded if agent.planner is not None else agent.expanded
+        return elapsed / step, expanded / step
+
+    for _ in range(warmup):
+        run()
+    times, expanded = zip(*[run() for _ in range(repeat)])
+    summary = summarize(times)
+    summary['expanded_per_step'] = sum(expanded) / len(expanded)
+    return summary
+
+
+def run_benchmarks(sizes=SIZES, planner_max_sizes=PLANNER_MAX_SIZES, repeat=5, warmup=1, log=None):
+    """
+    Runs all benchmarks for all maze sizes.
+    :return: list of results, dictionaries with name of the benchmark, maze size and summary of times
+    """
+    results = []
+
+    def record(name, size, summary, **params):
+        results.append(dict(name=name, size=size, params=params, **summary))
+        if log is not None:
+            arguments = ' '.join('{}={}'.format(key, value) for key, value in params.items())
+            print('{:<14} {:>5}x{:<5} {:<14} median {:.3e} s'.format(name, size, size, arguments, summary['median']),
+                  file=log)
+
+    record('cli_startup', 0, bench_startup(repeat=repeat, warmup=warmup))
+    for size in sizes:
+        layout = generate_maze((size, size))
+        record('generate_maze', size, bench_generate(size, repeat, warmup))
+        record('build_grid', size, bench_build(size, repeat, warmup))
+        record('translate', size, bench_translate(layout, repeat, warmup))
+        record('is_feasible', size, bench_feasible(layout, repeat, warmup))
+        record('agent_move', size, bench_keeper_move(layout, repeat=repeat, warmup=warmup))
+        record('_agent_vision', size, bench_keeper_vision(layout, repeat=repeat, warmup=warmup))
+        for planner, max_size in planner_max_sizes.items():
+            if size <= max_size:
+                record('select_action', size, bench_select_action(layout, planner, repeat=repeat, warmup=warmup),
+                       planner=planner)
+    return results
+
+
+def save_results(results, path):
+    """Saves results with information about the environment to JSON file"""
+    data = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results}
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=1)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmarks of maze generator, keeper and agent')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='sizes of square mazes')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--output', help='JSON file to save the results to')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, PLANNER_MAX_SIZES, args.repeat, args.warmup, log=sys.stdout)
+    if args.output:
+        save_results(results, args.output)
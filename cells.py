@@ -0,0 +1,20 @@
+from enum import IntEnum
+
+"""
+Small integer encoding of maze cells shared by the keeper, the generators and the agent.
+Layouts passed to and returned from the public functions keep using the names of the cells (MAZE_OBJECTS),
+they are translated at the edges (Cell[name], Cell(code).name), everything inside works on the codes.
+Hot loops compare against the codes bound to plain int constants, which is cheaper than looking up the members.
+"""
+
+
+class Cell(IntEnum):
+    EMPTY = 0
+    OBSTACLE = 1
+    GOLD = 2
+    START = 3
+
+
+# name of the cell -> code and code -> name
+CELL_CODES = {cell.name: cell.value for cell in Cell}
+CELL_NAMES = tuple(cell.name for cell in Cell)
@@ -0,0 +1,371 @@
+import heapq
+import random
+import struct
+import sys
+import zlib
+from array import array
+from collections import deque
+from functools import partial
+
+from agent import BLOCKED, BLOCKED_WITH_UNKNOWN, DIRECTIONS, PLANNERS, UNREACHED, Agent
+from maze_file import HEADER as MAZE_HEADER, MAGIC as MAZE_MAGIC, VERSION as MAZE_VERSION, PackedGrid, pack_cells
+from planner import INFINITY, AStarPlanner, DStarLitePlanner
+from simulation import Simulation
+
+"""
+Checkpoints of paused Simulation episodes.
+Checkpoint holds the maze, the state of the keeper and everything the agent knows (its map, barriers, the tree
+of routes to start, the route back, its time budget with the searches interrupted by it and the state of its planner),
+optionally with the state of the random generator the agent draws its random moves from,
+so a restored episode continues exactly as the original one would.
+Serialized checkpoint starts with a fixed header, the variable parts follow as length-prefixed sections compressed
+by zlib: the maze in the packed format of maze_file, then the agent's arrays stored little-endian.
+Forking copies the state in memory and shares the maze and its vision table with the original episode.
+"""
+
+MAGIC = b'MZCP'
+VERSION = 3
+# magic, version, flags, planner, steps, step limit, keeper position, agent position, steps back taken,
+# length of the route back (-1 if none), tiles expanded by the agent's BFS, time budget (0 if none),
+# number of the agent's steps interrupted by the time budget
+HEADER = struct.Struct('<4sBBBxIIIIIIIiQdI')
+SECTION = struct.Struct('<I')
+# flags
+HAS_GOLD = 1
+FINISHED = 2
+GOLD_FOUND = 4
+UNKNOWN_BLOCKED = 8
+RANDOM_STATE = 16
+TIME_BUDGET = 32
+
+PLANNER_NAMES = list(PLANNERS)
+DIRECTION_NAMES = list(DIRECTIONS)
+
+
+def pack_array(values):
+    """Returns array as little-endian bytes"""
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack_array(typecode, data):
+    """Returns array of the given typecode from little-endian bytes"""
+    values = array(typecode, data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def pack_maze(grid):
+    """Returns the grid in the format of the maze files"""
+    cells = b''.join(grid.iter_rows())
+    header = MAZE_HEADER.pack(MAZE_MAGIC, MAZE_VERSION, grid.rows, grid.cols,
+                              *grid.unique('START'), *grid.unique('GOLD'))
+    return header + pack_cells(cells)
+
+
+class Checkpoint:
+    """
+    State of a paused episode, capture it from a Simulation and restore it to a new one.
+    Arrays are copied when capturing and restoring, so one checkpoint can be restored any number of times.
+    """
+
+    def __init__(self, grid, maze_size, step_limit, steps, keeper, agent, planner, random_state=None,
+                 agent_class=None):
+        self.grid = grid
+        self.maze_size = maze_size
+        self.step_limit = step_limit
+        self.steps = steps
+        # dictionaries of the attributes of the keeper, the agent and the planner
+        self.keeper = keeper
+        self.agent = agent
+        self.planner = planner
+        self.random_state = random_state
+        # class of the captured agent, it is not serialized
+        self.agent_class = agent_class
+
+    @classmethod
+    def capture(cls, simulation, include_random=True):
+        """
+        Captures the state of the simulation between two steps.
+        :param include_random: capture also the state of the random module (used by the agent's random moves)
+        """
+        keeper, agent = simulation.maze_keeper, simulation.agent
+        keeper_state = {'agent_position': keeper.agent_position, 'has_gold': keeper.has_gold,
+                        'finished': keeper.finished}
+        agent_state = {
+            'agent_position': agent.agent_position,
+            'maze': bytearray(agent.maze),
+            'barriers': list(agent.barriers),
+            'blocked': agent.blocked,
+            'gold_found': agent.gold_found,
+            'route_back': list(agent.route_back) if agent.route_back is not None else None,
+            'steps_back_taken': agent.steps_back_taken,
+            'start_distance': array('I', agent.start_distance),
+            'entered_from': bytearray(agent.entered_from),
+            'expanded': agent.expanded,
+            'time_budget': agent.time_budget,
+            'interruptions': agent.interruptions,
+            # the search from gold interrupted by the time budget, None if there is none
+            'gold_tree': bytearray(agent.gold_tree) if agent.gold_tree is not None else None,
+            'gold_frontier': array('I', agent.gold_frontier) if agent.gold_tree is not None else None,
+        }
+        planner_state = None
+        planner = agent.planner
+        if planner is not None:
+            planner_state = {
+                'name': next(name for name, planner_class in PLANNERS.items() if planner_class is type(planner)),
+                'blocked': bytearray(planner.blocked),
+                'changed': list(planner.changed),
+                'expanded': planner.expanded,
+                'interruptions': planner.interruptions,
+                'step_expansions': array('I', planner.step_expansions),
+            }
+            if isinstance(planner, AStarPlanner) and planner.queue is not None:
+                # the search from the goal used with a deadline, it continues after restoring
+                planner_state.update(search=planner.search, g=array('I', planner.g), stamp=array('I', planner.stamp),
+                                     closed=array('I', planner.closed), origin=bytearray(planner.origin),
+                                     queue=list(planner.queue), target=planner.target)
+            if isinstance(planner, DStarLitePlanner):
+                planner_state.update(g=list(planner.g), rhs=list(planner.rhs), queued=list(planner.queued),
+                                     queue=list(planner.queue), km=planner.km, last_position=planner.last_position)
+        random_state = random.getstate() if include_random else None
+        return cls(keeper.grid, simulation.maze_size, simulation.step_limit, simulation.steps,
+                   keeper_state, agent_state, planner_state, random_state, type(agent))
+
+    def restore(self, agent=None, vision_table=None, restore_random=True):
+        """
+        Returns new Simulation continuing the episode from the checkpoint.
+        :param agent: agent class (Agent or its subclass), it is created with the planner and the time budget
+                      of the captured agent; the class of the captured agent by default, Agent if it is not known
+                      (checkpoints read from bytes)
+        :param vision_table: vision table of the maze shared with other episodes, built again if not given
+        :param restore_random: set the random module to the captured state
+        """
+        planner_state = self.planner
+        agent = partial(agent or self.agent_class or Agent, planner=planner_state['name'] if planner_state is not None else 'bfs',
+                        time_budget=self.agent['time_budget'])
+        simulation = Simulation(maze_size=self.maze_size, step_limit=self.step_limit, visualize=False, agent=agent,
+                                maze_generator=lambda maze_size: self.grid, vision_table=vision_table)
+        simulation.steps = self.steps
+        for name, value in self.keeper.items():
+            setattr(simulation.maze_keeper, name, value)
+
+        restored = simulation.agent
+        state = self.agent
+        restored.agent_position = state['agent_position']
+        restored.maze = bytearray(state['maze'])
+        restored.barriers = set(state['barriers'])
+        restored.blocked = state['blocked']
+        restored.gold_found = state['gold_found']
+        restored.route_back = list(state['route_back']) if state['route_back'] is not None else None
+        restored.steps_back_taken = state['steps_back_taken']
+        restored.start_distance = array('I', state['start_distance'])
+        restored.entered_from = bytearray(state['entered_from'])
+        restored.expanded = state['expanded']
+        restored.interruptions = state['interruptions']
+        if state['gold_tree'] is not None:
+            restored.gold_tree = bytearray(state['gold_tree'])
+            restored.gold_frontier = deque(state['gold_frontier'])
+
+        if planner_state is not None:
+            planner = restored.planner
+            planner.blocked = bytearray(planner_state['blocked'])
+            planner.changed = list(planner_state['changed'])
+            planner.expanded = planner_state['expanded']
+            planner.interruptions = planner_state['interruptions']
+            planner.step_expansions = array('I', planner_state['step_expansions'])
+            if isinstance(planner, AStarPlanner) and 'queue' in planner_state:
+                planner.search = planner_state['search']
+                planner.g = array('I', planner_state['g'])
+                planner.stamp = array('I', planner_state['stamp'])
+                planner.closed = array('I', planner_state['closed'])
+                planner.origin = bytearray(planner_state['origin'])
+                planner.queue = list(planner_state['queue'])
+                planner.target = planner_state['target']
+            if isinstance(planner, DStarLitePlanner):
+                planner.g = list(planner_state['g'])
+                planner.rhs = list(planner_state['rhs'])
+                planner.queued = list(planner_state['queued'])
+                planner.queue = list(planner_state['queue'])
+                planner.km = planner_state['km']
+                planner.last_position = planner_state['last_position']
+
+        if restore_random and self.random_state is not None:
+            random.setstate(self.random_state)
+        return simulation
+
+    def to_bytes(self):
+        keeper, agent, planner = self.keeper, self.agent, self.planner
+        flags = ((HAS_GOLD if keeper['has_gold'] else 0) | (FINISHED if keeper['finished'] else 0)
+                 | (GOLD_FOUND if agent['gold_found'] else 0)
+                 | (UNKNOWN_BLOCKED if agent['blocked'] is BLOCKED_WITH_UNKNOWN else 0)
+                 | (RANDOM_STATE if self.random_state is not None else 0)
+                 | (TIME_BUDGET if agent['time_budget'] is not None else 0))
+        route_back = agent['route_back']
+        header = HEADER.pack(MAGIC, VERSION, flags, PLANNER_NAMES.index(planner['name']) if planner else 0,
+                             self.steps, self.step_limit, *keeper['agent_position'], *agent['agent_position'],
+                             agent['steps_back_taken'], len(route_back) if route_back is not None else -1,
+                             agent['expanded'], agent['time_budget'] or 0.0, agent['interruptions'])
+        gold_tree = agent['gold_tree']
+        sections = [
+            pack_maze(self.grid),
+            agent['maze'],
+            pack_array(array('I', agent['barriers'])),
+            bytes(DIRECTION_NAMES.index(direction) for direction in route_back or ()),
+            pack_array(agent['start_distance']),
+            agent['entered_from'],
+            # empty if there is no search from gold
+            gold_tree if gold_tree is not None else b'',
+            pack_array(agent['gold_frontier']) if gold_tree is not None else b'',
+        ]
+        if self.random_state is not None:
+            version, internal_state, gauss_next = self.random_state
+            sections.append(pack_array(array('I', internal_state)))
+            sections.append(struct.pack('<d', gauss_next) if gauss_next is not None else b'')
+        if planner is not None:
+            sections += [planner['blocked'], pack_array(array('I', planner['changed'])),
+                         struct.pack('<QI', planner['expanded'], planner['interruptions']),
+                         pack_array(planner['step_expansions'])]
+            if planner['name'] == 'astar' and 'queue' in planner:
+                sections += [
+                    struct.pack('<Iii', planner['search'], *(planner['target'] or (-1, -1))),
+                    pack_array(planner['g']),
+                    pack_array(planner['stamp']),
+                    pack_array(planner['closed']),
+                    planner['origin'],
+                    pack_array(array('I', (value for entry in planner['queue'] for value in entry))),
+                ]
+            if planner['name'] == 'dstar':
+                # only the live entries of the queue are stored, outdated ones would be skipped anyway
+                queued = [(key[0], key[1], index) for index, key in enumerate(planner['queued']) if key is not None]
+                sections += [
+                    pack_array(array('I', (UNREACHED if value == INFINITY else value for value in planner['g']))),
+                    pack_array(array('I', (UNREACHED if value == INFINITY else value for value in planner['rhs']))),
+                    pack_array(array('I', (value for entry in queued for value in entry))),
+                    struct.pack('<Qii', planner['km'], *(planner['last_position'] or (-1, -1))),
+                ]
+        body = b''.join(SECTION.pack(len(section)) + section for section in sections)
+        return header + zlib.compress(body, 1)
+
+    @classmethod
+    def from_bytes(cls, data):
+        (magic, version, flags, planner_code, steps, step_limit, keeper_r, keeper_c, agent_r, agent_c,
+         steps_back_taken, route_length, expanded, time_budget, interruptions) = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise Exception('Data do not contain a checkpoint of version {}'.format(VERSION))
+        body = zlib.decompress(data[HEADER.size:])
+        sections = []
+        offset = 0
+        while offset < len(body):
+            length, = SECTION.unpack_from(body, offset)
+            offset += SECTION.size
+            sections.append(body[offset:offset + length])
+            offset += length
+        sections.reverse()
+
+        grid = PackedGrid(sections.pop()).to_grid()
+        maze_size = (grid.rows, grid.cols)
+        keeper = {'agent_position': (keeper_r, keeper_c), 'has_gold': bool(flags & HAS_GOLD),
+                  'finished': bool(flags & FINISHED)}
+        maze, barriers, route_back = sections.pop(), sections.pop(), sections.pop()
+        agent = {
+            'agent_position': (agent_r, agent_c),
+            'maze': bytearray(maze),
+            'barriers': list(unpack_array('I', barriers)),
+            'blocked': BLOCKED_WITH_UNKNOWN if flags & UNKNOWN_BLOCKED else BLOCKED,
+            'gold_found': bool(flags & GOLD_FOUND),
+            'route_back': [DIRECTION_NAMES[i] for i in route_back] if route_length >= 0 else None,
+            'steps_back_taken': steps_back_taken,
+            'start_distance': unpack_array('I', sections.pop()),
+            'entered_from': bytearray(sections.pop()),
+            'expanded': expanded,
+            'time_budget': time_budget if flags & TIME_BUDGET else None,
+            'interruptions': interruptions,
+        }
+        gold_tree, gold_frontier = sections.pop(), sections.pop()
+        agent.update(gold_tree=bytearray(gold_tree) if gold_tree else None,
+                     gold_frontier=unpack_array('I', gold_frontier) if gold_tree else None)
+        random_state = None
+        if flags & RANDOM_STATE:
+            internal_state = tuple(unpack_array('I', sections.pop()))
+            gauss_next = sections.pop()
+            random_state = (3, internal_state, struct.unpack('<d', gauss_next)[0] if gauss_next else None)
+        planner = None
+        if sections:
+            planner = {
+                'name': PLANNER_NAMES[planner_code],
+                'blocked': bytearray(sections.pop()),
+                'changed': list(unpack_array('I', sections.pop())),
+            }
+            planner['expanded'], planner['interruptions'] = struct.unpack('<QI', sections.pop())
+            planner['step_expansions'] = unpack_array('I', sections.pop())
+            if sections and planner['name'] == 'astar':
+                search, target_r, target_c = struct.unpack('<Iii', sections.pop())
+                g = unpack_array('I', sections.pop())
+                stamp = unpack_array('I', sections.pop())
+                closed = unpack_array('I', sections.pop())
+                origin = bytearray(sections.pop())
+                entries = unpack_array('I', sections.pop())
+                planner.update(search=search, g=g, stamp=stamp, closed=closed, origin=origin,
+                               queue=[tuple(entries[i:i + 3]) for i in range(0, len(entries), 3)],
+                               target=(target_r, target_c) if target_r >= 0 else None)
+            if sections and planner['name'] == 'dstar':
+                g = [INFINITY if value == UNREACHED else value for value in unpack_array('I', sections.pop())]
+                rhs = [INFINITY if value == UNREACHED else value for value in unpack_array('I', sections.pop())]
+                entries = unpack_array('I', sections.pop())
+                queued = [None] * len(g)
+                queue = []
+                for i in range(0, len(entries), 3):
+                    k1, k2, index = entries[i:i + 3]
+                    queued[index] = (k1, k2)
+                    queue.append((k1, k2, index))
+                heapq.heapify(queue)
+                km, last_r, last_c = struct.unpack('<Qii', sections.pop())
+                planner.update(g=g, rhs=rhs, queued=queued, queue=queue, km=km,
+                               last_position=(last_r, last_c) if last_r >= 0 else None)
+        return cls(grid, maze_size, step_limit, steps, keeper, agent, planner, random_state)
+
+
+def checkpoint(simulation, include_random=True):
+    """Returns the paused episode of the simulation serialized to bytes"""
+    return Checkpoint.capture(simulation, include_random).to_bytes()
+
+
+def restore(data, agent=Agent, restore_random=True):
+    """Returns new Simulation continuing the episode serialized by checkpoint"""
+    return Checkpoint.from_bytes(data).restore(agent, restore_random=restore_random)
+
+
+def fork(simulation, include_random=False):
+    """
+    Returns new Simulation continuing the paused episode of the simulation independently of it.
+    The maze and its vision table are shared, the forked episode copies only the state of the keeper and the agent.
+    The random module is left as it is unless include_random is set, so forks draw different random moves.
+    The forked agent is of the same class as the original one.
+    """
+    return Checkpoint.capture(simulation, include_random).restore(
+        vision_table=simulation.maze_keeper._vision_table, restore_random=include_random)
+
+
+if __name__ == '__main__':
+    from maze_generator import generate_maze
+    import time
+
+    sim = Simulation(maze_size=(201, 201), step_limit=100000, visualize=False,
+                     agent=partial(Agent, planner='dstar'), maze_generator=generate_maze)
+    sim.run(steps=2000)
+    start = time.time()
+    data = checkpoint(sim)
+    saved = time.time()
+    restored = restore(data)
+    loaded = time.time()
+    forks = [fork(restored) for _ in range(10)]
+    forked = time.time()
+    print('checkpoint of {} bytes saved in {:.1f} ms, restored in {:.1f} ms, forked in {:.1f} ms per fork'.format(
+        len(data), 1000 * (saved - start), 1000 * (loaded - saved), 100 * (forked - loaded)))
+    trace, _ = sim.run()
+    restored_trace, _ = restored.run()
+    print('original finished in {} steps, restored in {} steps'.format(sim.steps, restored.steps))
@@ -0,0 +1,228 @@
+import random
+from collections import OrderedDict
+
+from cells import CELL_CODES, CELL_NAMES, Cell
+
+"""
+Lazily generated mazes of practically unbounded size.
+The maze is split to square chunks, every chunk is generated only when a cell of it is queried and it depends only
+on the seed and its coordinates, so any chunk can be generated again after it was evicted from the cache.
+Rooms lie on cells with both coordinates even like in random_mazes. Every chunk is a random spanning tree of its
+rooms (depth first search) and opens one passage through its east and south border to the neighbouring chunks,
+so the whole maze is connected. Materialized chunks are kept in an LRU cache with a memory budget.
+ChunkedMaze provides the queries of Grid used by MazeKeeper, the keeper does not precompute the vision of chunked
+mazes and the vision and passability are pulled from the chunks around the agent only.
+to_layout (and so MazeKeeper.layout) is the only query which generates the whole maze.
+Only the maze is lazy: Agent still keeps its memory of the maze in dense arrays of rows * cols entries,
+so an agent can explore only mazes whose cells fit into memory.
+"""
+
+EMPTY = Cell.EMPTY.value
+WALL = Cell.OBSTACLE.value
+GOLD = Cell.GOLD.value
+START = Cell.START.value
+
+DEFAULT_CHUNK_SIZE = 64
+DEFAULT_MAX_BYTES = 64 << 20
+
+
+def generate_chunk(seed, chunk_r, chunk_c, chunk_size, rows, cols):
+    """
+    Returns cells of the chunk as bytearray of chunk_size * chunk_size cell codes (row by row),
+    cells lying outside of the maze of the given size are walls.
+    """
+    rng = random.Random('{}:{}:{}'.format(seed, chunk_r, chunk_c))
+    top, left = chunk_r * chunk_size, chunk_c * chunk_size
+    # rooms of the chunk inside of the maze
+    room_rows = (min(chunk_size, rows - top) + 1) // 2
+    room_cols = (min(chunk_size, cols - left) + 1) // 2
+    cells = bytearray([WALL]) * (chunk_size * chunk_size)
+    for i in range(room_rows):
+        start = 2 * i * chunk_size
+        cells[start:start + 2 * room_cols:2] = bytes(room_cols)
+
+    # passages to the east and south neighbours, drawn first so they do not depend on the rest of the generation
+    east = rng.randrange(room_rows)
+    south = rng.randrange(room_cols)
+    if left + chunk_size < cols:
+        cells[2 * east * chunk_size + chunk_size - 1] = EMPTY
+    if top + chunk_size < rows:
+        cells[(chunk_size - 1) * chunk_size + 2 * south] = EMPTY
+
+    # randomized depth first search over the rooms of the chunk
+    count = room_rows * room_cols
+    visited = bytearray(count)
+    visited[0] = 1
+    stack = [0]
+    while stack:
+        room = stack[-1]
+        i, j = divmod(room, room_cols)
+        neighbors = []
+        if i > 0 and not visited[room - room_cols]:
+            neighbors.append(room - room_cols)
+        if i < room_rows - 1 and not visited[room + room_cols]:
+            neighbors.append(room + room_cols)
+        if j > 0 and not visited[room - 1]:
+            neighbors.append(room - 1)
+        if j < room_cols - 1 and not visited[room + 1]:
+            neighbors.append(room + 1)
+        if not neighbors:
+            stack.pop()
+            continue
+        neighbor = neighbors[int(rng.random() * len(neighbors))]
+        visited[neighbor] = 1
+        k, m = divmod(neighbor, room_cols)
+        # carve the wall between the rooms
+        cells[(i + k) * chunk_size + j + m] = EMPTY
+        stack.append(neighbor)
+    return cells
+
+
+class ChunkedCells:
+    """Indexable view of the cell codes of ChunkedMaze, same as Grid.cells"""
+
+    def __init__(self, maze):
+        self.maze = maze
+
+    def __len__(self):
+        return self.maze.rows * self.maze.cols
+
+    def __getitem__(self, index):
+        return self.maze.cell(divmod(index, self.maze.cols))
+
+
+class ChunkedMaze:
+    """
+    Maze of rows x cols cells generated chunk by chunk on demand.
+    Start is at (0,0), gold at gold_position (by default the bottom-right room).
+    :param chunk_size: size of the side of a chunk, even number
+    :param max_bytes: memory budget of the cache of materialized chunks
+    """
+
+    def __init__(self, rows, cols, seed=0, gold_position=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        if chunk_size < 2 or chunk_size % 2:
+            raise Exception('Chunk size must be an even number, not {}'.format(chunk_size))
+        if gold_position is None:
+            gold_position = ((rows - 1) // 2 * 2, (cols - 1) // 2 * 2)
+        if gold_position[0] % 2 or gold_position[1] % 2 or not (0 <= gold_position[0] < rows
+                                                                 and 0 <= gold_position[1] < cols):
+            raise Exception('Gold must lie in a room of the maze (both coordinates even), not at {}'
+                            .format(gold_position))
+        self.rows = rows
+        self.cols = cols
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.start_position = (0, 0)
+        self.gold_position = tuple(gold_position)
+        self.max_chunks = max(1, max_bytes // (chunk_size * chunk_size))
+        self.chunks = OrderedDict()
+        self.cells = ChunkedCells(self)
+        self.hits = self.misses = self.evictions = 0
+        # the last queried chunk, consecutive queries mostly fall into the same chunk
+        self._last_key = None
+        self._last_cells = None
+
+    def chunk(self, chunk_r, chunk_c):
+        """Returns cells of the chunk, generates it if it is not cached"""
+        key = (chunk_r, chunk_c)
+        cells = self.chunks.get(key)
+        if cells is not None:
+            self.hits += 1
+            self.chunks.move_to_end(key)
+            return cells
+        self.misses += 1
+        cells = generate_chunk(self.seed, chunk_r, chunk_c, self.chunk_size, self.rows, self.cols)
+        size = self.chunk_size
+        for position, code in ((self.start_position, START), (self.gold_position, GOLD)):
+            if divmod(position[0], size)[0] == chunk_r and divmod(position[1], size)[0] == chunk_c:
+                cells[position[0] % size * size + position[1] % size] = code
+        self.chunks[key] = cells
+        if len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+            self.evictions += 1
+        return cells
+
+    @property
+    def memory(self):
+        """Bytes taken by the cached chunks"""
+        return len(self.chunks) * self.chunk_size * self.chunk_size
+
+    def index(self, position):
+        """Returns index of (r,c) position in the cells or -1 if it lies outside of the maze"""
+        r, c = position
+        if 0 <= r < self.rows and 0 <= c < self.cols:
+            return r * self.cols + c
+        return -1
+
+    def cell(self, position):
+        """Returns code of the cell at given position, position must lie inside the maze"""
+        r, c = position
+        if not (0 <= r < self.rows and 0 <= c < self.cols):
+            raise IndexError('Position {} lies outside of the maze'.format(position))
+        size = self.chunk_size
+        chunk_r, r = divmod(r, size)
+        chunk_c, c = divmod(c, size)
+        if (chunk_r, chunk_c) != self._last_key:
+            self._last_cells = self.chunk(chunk_r, chunk_c)
+            self._last_key = (chunk_r, chunk_c)
+        return self._last_cells[r * size + c]
+
+    def is_movable(self, position):
+        """Returns True if the position lies inside the maze and is not an obstacle"""
+        r, c = position
+        return 0 <= r < self.rows and 0 <= c < self.cols and self.cell(position) != WALL
+
+    def row(self, r):
+        """Returns row of the maze as bytes of CELL_CODES, generates all chunks the row goes through"""
+        size = self.chunk_size
+        chunk_r, offset = divmod(r, size)
+        parts = [self.chunk(chunk_r, chunk_c)[offset * size:(offset + 1) * size]
+                 for chunk_c in range((self.cols + size - 1) // size)]
+        return bytes(b''.join(parts)[:self.cols])
+
+    def iter_rows(self):
+        """Yields rows of the maze one by one as bytes of CELL_CODES"""
+        for r in range(self.rows):
+            yield self.row(r)
+
+    def to_layout(self):
+        """
+        Returns the maze as 2-D list layout of MAZE_OBJECTS (e.g. for MazeKeeper.layout and Visualization),
+        generates every chunk and takes a list entry per cell, so it is meant only for mazes which fit into memory.
+        """
+        return [[CELL_NAMES[code] for code in row] for row in self.iter_rows()]
+
+    def unique(self, cell_type):
+        """Returns position of START or GOLD"""
+        if cell_type == 'START':
+            return self.start_position
+        if cell_type == 'GOLD':
+            return self.gold_position
+        raise Exception('Only START and GOLD positions are known without generating the whole maze, not {}'
+                        .format(cell_type if cell_type in CELL_CODES else repr(cell_type)))
+
+
+if __name__ == '__main__':
+    from maze_keeper import ACTIONS, MazeKeeper
+    import time
+
+    # agent following the right hand wall in a maze of 10^10 cells with 256 kB of cached chunks
+    maze = ChunkedMaze(100000, 100000, seed=42, max_bytes=1 << 18)
+    keeper = MazeKeeper(maze)
+    # clockwise order of the actions
+    actions = ['NORTH', 'EAST', 'SOUTH', 'WEST']
+    heading = 1
+    steps = 200000
+    start = time.time()
+    for step in range(steps):
+        r, c = keeper.agent_position
+        for turn in (1, 0, 3, 2):
+            move_r, move_c = ACTIONS[actions[(heading + turn) % 4]]
+            if maze.is_movable((r + move_r, c + move_c)):
+                heading = (heading + turn) % 4
+                break
+        keeper.agent_move(actions[heading])
+    finish = time.time()
+    print('{} steps in {:.2f} s, at {}, {} chunks generated, {} evicted, {} kB cached'.format(
+        steps, finish - start, keeper.agent_position, maze.misses, maze.evictions, maze.memory // 1024))
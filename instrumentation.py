@@ -0,0 +1,137 @@
+import cProfile
+import os
+import time
+
+"""
+Optional instrumentation of Simulation.run.
+Simulation runs an instrumented loop only when it is given an Instrumentation, otherwise the plain loop is used,
+so the instrumentation costs nothing when it is disabled.
+"""
+
+PHASES = ('select_action', 'agent_move')
+# the run is split to the way to gold and the way back to start
+STAGES = ('to_gold', 'to_start')
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of latencies with bounded memory.
+    Latencies are rounded down to SIGNIFICANT_BITS significant bits of nanoseconds, a bucket spans at most
+    1 / 2 ** (SIGNIFICANT_BITS - 1) of its values, so the percentiles are at most about 3 % below the exact ones.
+    """
+    SIGNIFICANT_BITS = 6
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        nanoseconds = round(seconds * 1e9)
+        shift = nanoseconds.bit_length() - self.SIGNIFICANT_BITS
+        if shift > 0:
+            nanoseconds = nanoseconds >> shift << shift
+        self.buckets[nanoseconds] = self.buckets.get(nanoseconds, 0) + 1
+
+    def percentile(self, q):
+        """Returns latency in seconds under which q percent of the recorded latencies lie"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for nanoseconds in sorted(self.buckets):
+            seen += self.buckets[nanoseconds]
+            if seen >= rank:
+                return nanoseconds / 1e9
+        return self.max
+
+    def summary(self):
+        return {'count': self.count,
+                'total': self.total,
+                'mean': self.total / self.count if self.count else 0.0,
+                'p50': self.percentile(50),
+                'p99': self.percentile(99),
+                'max': self.max}
+
+
+class Instrumentation:
+    """
+    Collects per step timings of the simulation phases (select_action of the agent and agent_move of the keeper),
+    separately for the way to gold and the way back to start.
+    :param callbacks: functions called after every step as callback(step, action, observation, timings),
+                      timings is dictionary with time in seconds spent in each of PHASES
+    :param profile_dir: if given, the whole run is profiled by cProfile and stats are dumped to this directory
+                        to file profile_<rows>x<cols>.prof
+    :param time_budget: if given, steps whose select_action took longer than this number of seconds are counted
+    """
+
+    def __init__(self, callbacks=(), profile_dir=None, time_budget=None):
+        self.callbacks = list(callbacks)
+        self.profile_dir = profile_dir
+        self.time_budget = time_budget
+        self.histograms = {(stage, phase): LatencyHistogram() for stage in STAGES for phase in PHASES}
+        # number of steps over the time budget in each stage
+        self.over_budget = dict.fromkeys(STAGES, 0)
+        # step in which the gold was picked up
+        self.gold_step = None
+
+    def add_callback(self, callback):
+        self.callbacks.append(callback)
+
+    def record(self, step, action, observation, timings, has_gold):
+        """Records timings of one step, has_gold tells whether the agent had the gold before the step"""
+        stage = STAGES[has_gold]
+        for phase, seconds in timings.items():
+            self.histograms[stage, phase].add(seconds)
+        if self.time_budget is not None and timings['select_action'] > self.time_budget:
+            self.over_budget[stage] += 1
+        for callback in self.callbacks:
+            callback(step, action, observation, timings)
+
+    def profile(self, run, maze_size):
+        """Calls run, profiled by cProfile if profile_dir is set, and returns its result"""
+        if self.profile_dir is None:
+            return run()
+        profiler = cProfile.Profile()
+        result = profiler.runcall(run)
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.profile_dir, 'profile_{}x{}.prof'.format(*maze_size)))
+        return result
+
+    def summary(self):
+        """Returns dictionary {stage: {phase: summary of LatencyHistogram}}"""
+        return {stage: {phase: self.histograms[stage, phase].summary() for phase in PHASES} for stage in STAGES}
+
+    def budget_summary(self):
+        """Returns dictionary {stage: (steps over the time budget, all steps)}"""
+        return {stage: (self.over_budget[stage], self.histograms[stage, 'select_action'].count) for stage in STAGES}
+
+    def report(self):
+        """Returns human readable table of the timings"""
+        lines = ['{:<9} {:<14} {:>7} {:>10} {:>10} {:>10} {:>10}'.format(
+            'stage', 'phase', 'steps', 'total [s]', 'p50 [us]', 'p99 [us]', 'max [us]')]
+        for stage, phases in self.summary().items():
+            for phase, summary in phases.items():
+                lines.append('{:<9} {:<14} {:>7} {:>10.4f} {:>10.1f} {:>10.1f} {:>10.1f}'.format(
+                    stage, phase, summary['count'], summary['total'],
+                    summary['p50'] * 1e6, summary['p99'] * 1e6, summary['max'] * 1e6))
+        if self.time_budget is not None:
+            for stage, (over, steps) in self.budget_summary().items():
+                lines.append('{:<9} select_action over the budget of {:.1f} us in {} of {} steps ({:.2f} %)'.format(
+                    stage, self.time_budget * 1e6, over, steps, 100 * over / steps if steps else 0.0))
+        return '\n'.join(lines)
+
+
+def timed_step(agent, maze_keeper, observation, clock=time.perf_counter):
+    """Performs one simulation step and returns (action, observation, timings)"""
+    start = clock()
+    action = agent.select_action(observation)
+    selected = clock()
+    observation = maze_keeper.agent_move(action)
+    moved = clock()
+    return action, observation, {'select_action': selected - start, 'agent_move': moved - selected}
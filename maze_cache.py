@@ -0,0 +1,214 @@
+import hashlib
+import inspect
+import os
+import random
+import struct
+from collections import OrderedDict
+
+from maze_keeper import Grid
+from maze_generator import is_feasible
+
+"""
+Memoization of maze generators.
+Generated layouts are cached together with the feasibility verdict and start/gold positions, first in an in-process
+LRU cache and then in an on-disk store. Entries are keyed by the generator name, its parameters and the hash of the
+source of the generator's module, so changing the generator invalidates its entries.
+The on-disk store is bounded in size, the least recently used entries are evicted first.
+"""
+
+DEFAULT_DIRECTORY = os.environ.get('MAZE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'maze_keeper'))
+DEFAULT_MAX_BYTES = 1 << 30
+MAGIC = b'MZCE'
+VERSION = 1
+# magic, version, feasible, rows, cols, start r, start c, gold r, gold c (-1 when missing)
+HEADER = struct.Struct('<4sBBIIiiii')
+
+
+class CachedMaze:
+    """Generated maze with its feasibility verdict, grid is None if the generator did not return any layout"""
+
+    def __init__(self, grid, feasible, start_position, gold_position):
+        self.grid = grid
+        self.feasible = feasible
+        self.start_position = start_position
+        self.gold_position = gold_position
+
+    @classmethod
+    def from_result(cls, result):
+        """Creates CachedMaze from a layout or Grid returned by a generator"""
+        if result is None:
+            return cls(None, False, None, None)
+        grid = result if isinstance(result, Grid) else Grid.from_layout(result)
+        try:
+            start, gold = grid.unique('START'), grid.unique('GOLD')
+        except Exception:
+            return cls(grid, False, None, None)
+        return cls(grid, is_feasible(grid), start, gold)
+
+    def to_bytes(self):
+        rows, cols = (self.grid.rows, self.grid.cols) if self.grid is not None else (0, 0)
+        start = self.start_position or (-1, -1)
+        gold = self.gold_position or (-1, -1)
+        header = HEADER.pack(MAGIC, VERSION, self.feasible, rows, cols, *start, *gold)
+        return header + (bytes(self.grid.cells) if self.grid is not None else b'')
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, feasible, rows, cols, start_r, start_c, gold_r, gold_c = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise Exception('Not a maze cache entry of version {}'.format(VERSION))
+        grid = Grid(rows, cols, bytearray(data[HEADER.size:])) if rows else None
+        start = (start_r, start_c) if start_r >= 0 else None
+        gold = (gold_r, gold_c) if gold_r >= 0 else None
+        return cls(grid, bool(feasible), start, gold)
+
+
+def source_hash(generator):
+    """Returns hash of the source of the module defining the generator"""
+    module = inspect.getmodule(generator)
+    try:
+        source = inspect.getsource(module)
+    except (TypeError, OSError):
+        source = repr(generator)
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def generator_name(generator):
+    return '{}.{}'.format(generator.__module__, generator.__qualname__)
+
+
+class MazeCache:
+    """
+    Two level cache of generated mazes.
+    :param directory: directory of the on-disk store, None disables it
+    :param max_bytes: maximal total size of the on-disk store
+    :param memory_items: number of mazes kept in the in-process LRU cache
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES, memory_items=64):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.memory = OrderedDict()
+        self.source_hashes = {}
+        self.hits = self.disk_hits = self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, generator, maze_size, seed, params):
+        if generator not in self.source_hashes:
+            self.source_hashes[generator] = source_hash(generator)
+        description = repr((generator_name(generator), tuple(maze_size), seed, sorted(params.items()),
+                            self.source_hashes[generator]))
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.maze')
+
+    def get(self, generator, maze_size, seed=None, **params):
+        """
+        Returns CachedMaze generated by generator(maze_size, **params), generating it only when it is not cached.
+        If seed is given, it is passed to the generator if the generator takes it,
+        otherwise the random module is seeded with it for the time of the generation.
+        Without a seed the generator draws from the current random state, so its mazes are never cached
+        (pass any seed to cache mazes of generators which do not use randomness at all).
+        """
+        if seed is None:
+            self.misses += 1
+            return CachedMaze.from_result(call_generator(generator, maze_size, seed, params))
+        key = self.key(generator, maze_size, seed, params)
+        if key in self.memory:
+            self.hits += 1
+            self.memory.move_to_end(key)
+            return self.memory[key]
+
+        entry = self.load(key)
+        if entry is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            entry = CachedMaze.from_result(call_generator(generator, maze_size, seed, params))
+            self.store(key, entry)
+
+        self.memory[key] = entry
+        if len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+        return entry
+
+    def load(self, key):
+        if self.directory is None:
+            return None
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                entry = CachedMaze.from_bytes(file.read())
+        except Exception:
+            # missing or corrupted entry
+            return None
+        # modification time serves as the time of the last use for the eviction
+        os.utime(path)
+        return entry
+
+    def store(self, key, entry):
+        if self.directory is None:
+            return
+        path = self.path(key)
+        temporary = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temporary, 'wb') as file:
+            file.write(entry.to_bytes())
+        os.replace(temporary, path)
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the store fits into max_bytes"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.maze'):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        self.memory.clear()
+        if self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith('.maze'):
+                    os.remove(os.path.join(self.directory, name))
+
+
+def call_generator(generator, maze_size, seed, params):
+    if seed is None:
+        return generator(maze_size, **params)
+    if 'seed' in inspect.signature(generator).parameters:
+        return generator(maze_size, seed=seed, **params)
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        return generator(maze_size, **params)
+    finally:
+        random.setstate(state)
+
+
+def cached(generator, cache=None, seed=None, **params):
+    """
+    Returns maze generator with the same interface as generator (usable as maze_generator of Simulation),
+    which takes the layouts from the cache. The layouts are cached only if seed is given.
+    """
+    cache = cache if cache is not None else MazeCache()
+
+    def cached_generator(maze_size):
+        entry = cache.get(generator, maze_size, seed, **params)
+        return entry.grid.to_layout() if entry.grid is not None else None
+    cached_generator.__name__ = 'cached_' + generator.__name__
+    return cached_generator
@@ -0,0 +1,267 @@
+import argparse
+import sys
+import time
+
+"""
+Command line entry point of the maze keeper tools:
+generate a maze, run one episode, sweep many episodes, run the benchmarks or render saved traces.
+Modules are imported inside the subcommands, only the ones the subcommand needs, so starting the tool stays cheap
+(benchmark.bench_startup measures it). Generators are looked up by their names in GENERATORS.
+    python maze_cli.py generate --size 30x50 --output maze.maze
+    python maze_cli.py run --maze maze.maze --planner dstar --trace run.trace
+    python maze_cli.py render run.trace --formats gif
+"""
+
+# name -> (module, function) of maze generators, the module is imported only when the generator is used
+GENERATORS = {
+    'maze': ('maze_generator', 'generate_maze'),
+    'feasible': ('maze_generator', 'generate_random_feasible'),
+    'random': ('maze_generator', 'generate_random'),
+    'empty': ('maze_generator', 'generate_empty'),
+    'dfs': ('random_mazes', 'generate_dfs'),
+    'kruskal': ('random_mazes', 'generate_kruskal'),
+    'wilson': ('random_mazes', 'generate_wilson'),
+}
+# same as agent.PLANNERS and trace_export.FORMATS, repeated so the parser does not import them
+PLANNERS = ('bfs', 'astar', 'dstar')
+FORMATS = ('cast', 'gif', 'png')
+
+
+def maze_size(text):
+    """Parses size of the maze given as ROWSxCOLS or as a single number of a square maze"""
+    try:
+        sizes = [int(part) for part in text.lower().split('x')]
+    except ValueError:
+        sizes = []
+    if len(sizes) == 1:
+        sizes *= 2
+    if len(sizes) != 2 or min(sizes) < 1:
+        raise argparse.ArgumentTypeError('size must be ROWSxCOLS or a single number, not {}'.format(text))
+    return tuple(sizes)
+
+
+def generator(name):
+    """Returns maze generator of the given name from GENERATORS"""
+    from importlib import import_module
+    module, function = GENERATORS[name]
+    return getattr(import_module(module), function)
+
+
+def load_layout(path):
+    """Returns maze saved by maze_file (as PackedGrid) or by random_mazes.write_maze (as 2-D layout)"""
+    if path.endswith('.maze'):
+        from maze_file import load_maze
+        return load_maze(path)
+    with open(path, encoding='utf-8') as file:
+        characters = {'·': 'EMPTY', '█': 'OBSTACLE', 'S': 'START', 'G': 'GOLD'}
+        return [[characters[character] for character in line.rstrip('\n')] for line in file if line.strip()]
+
+
+def command_generate(args):
+    import random
+    random.seed(args.seed)
+    layout = generator(args.generator)(args.size)
+    if layout is None:
+        print('Generator {} did not return a feasible maze of size {}x{}'.format(args.generator, *args.size),
+              file=sys.stderr)
+        return 1
+    if args.output is None:
+        from maze_generator import print_maze
+        print_maze(layout)
+    elif args.output.endswith('.maze'):
+        from maze_file import save_maze
+        save_maze(args.output, layout)
+    else:
+        from maze_keeper import Grid
+        from random_mazes import write_maze
+        with open(args.output, 'w', encoding='utf-8') as file:
+            write_maze(Grid.from_layout(layout), file)
+    return 0
+
+
+def command_run(args):
+    import os
+    import random
+    from functools import partial
+    from agent import Agent
+    from simulation import Simulation
+
+    random.seed(args.seed)
+    instrumentation = None
+    time_budget = args.time_budget / 1000 if args.time_budget is not None else None
+    if args.profile or time_budget is not None:
+        from instrumentation import Instrumentation
+        instrumentation = Instrumentation(time_budget=time_budget)
+    start = time.perf_counter()
+    # the layout is made before the simulation, so a missing maze is reported instead of failing in the keeper
+    try:
+        if args.maze is not None:
+            layout = load_layout(args.maze)
+        else:
+            layout = generator(args.generator)(args.size)
+    except Exception as error:
+        print('Maze cannot be {}: {}'.format('loaded' if args.maze is not None else 'generated', error),
+              file=sys.stderr)
+        return 1
+    if layout is None:
+        print('Generator {} did not return a feasible maze of size {}x{}'.format(args.generator, *args.size),
+              file=sys.stderr)
+        return 1
+    size = (layout.rows, layout.cols) if hasattr(layout, 'rows') else (len(layout), len(layout[0]))
+    try:
+        sim = Simulation(maze_size=size, step_limit=args.step_limit, visualize=False,
+                         agent=partial(Agent, planner=args.planner, time_budget=time_budget),
+                         maze_generator=lambda maze_size: layout, instrumentation=instrumentation)
+    except Exception as error:
+        print('Episode cannot be started in the maze: {}'.format(error), file=sys.stderr)
+        return 1
+    if args.trace is None:
+        trace, _ = sim.run()
+    else:
+        from maze_file import save_maze
+        from trace_file import TraceWriter
+        with TraceWriter(args.trace, size) as trace:
+            sim.run(trace)
+        save_maze(os.path.splitext(args.trace)[0] + '.maze', sim.maze_keeper.grid)
+    finish = time.perf_counter()
+    print('{} in {} steps, {:.3f} s'.format('SUCCESS' if sim.maze_keeper.finished else 'FAILURE', sim.steps,
+                                           finish - start))
+    if instrumentation is not None:
+        print(instrumentation.report())
+    if time_budget is not None:
+        print('search interrupted by the time budget in {} steps'.format(sim.agent.interruptions))
+    if args.visualize:
+        from visualization import Visualization
+        if args.trace is not None:
+            from trace_file import read_trace
+            trace = read_trace(args.trace)
+        Visualization(sim.maze_keeper.grid.to_layout(), speed=args.speed).show_trace(trace)
+    return 0 if sim.maze_keeper.finished else 2
+
+
+def command_sweep(args):
+    from functools import partial
+    from agent import Agent
+    from sweep import make_jobs, sweep, write_table
+
+    agents = [partial(Agent, planner=planner) for planner in args.planners]
+    generators = [generator(name) for name in args.generators]
+    jobs = make_jobs(args.sizes, args.seeds, agents, generators)
+    if args.traces is not None:
+        import os
+        os.makedirs(args.traces, exist_ok=True)
+    cache_directory = None
+    if args.maze_cache is not None:
+        from maze_cache import DEFAULT_DIRECTORY
+        cache_directory = args.maze_cache or DEFAULT_DIRECTORY
+    start = time.perf_counter()
+    results = sweep(jobs, step_limit=args.step_limit, workers=args.workers, trace_directory=args.traces,
+                    cache_directory=cache_directory)
+    finish = time.perf_counter()
+    if args.output is None:
+        write_table(results)
+    else:
+        with open(args.output, 'w', newline='') as file:
+            write_table(results, file)
+    print('{} jobs, {} succeeded, {:.2f} s'.format(len(results), sum(row['success'] for row in results),
+                                                    finish - start), file=sys.stderr)
+    return 0
+
+
+def command_bench(args):
+    from benchmark import PLANNER_MAX_SIZES, SIZES, run_benchmarks, save_results
+
+    results = run_benchmarks(args.sizes or SIZES, PLANNER_MAX_SIZES, args.repeat, args.warmup, log=sys.stdout)
+    if args.output:
+        save_results(results, args.output)
+    return 0
+
+
+def command_render(args):
+    import os
+
+    if args.terminal:
+        from trace_file import replay_trace
+        for path in args.paths:
+            replay_trace(path, load_layout(os.path.splitext(path)[0] + '.maze').to_layout(), speed=args.speed)
+        return 0
+    from trace_export import export_directory, export_files
+    start = time.perf_counter()
+    options = dict(speed=args.speed, steps_per_frame=args.steps_per_frame, scale=args.scale)
+    written = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            written += export_directory(path, args.formats, args.workers, **options)
+        else:
+            written += export_files(os.path.splitext(path)[0] + '.maze', path, args.formats, **options)
+    print('{} files written in {:.2f} s'.format(len(written), time.perf_counter() - start), file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='maze_cli', description='Maze keeper tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('generate', help='generate a maze and print or save it')
+    command.add_argument('--size', type=maze_size, default=(30, 50), help='ROWSxCOLS')
+    command.add_argument('--generator', choices=GENERATORS, default='maze')
+    command.add_argument('--seed', type=int, default=42)
+    command.add_argument('--output', help='.maze file (maze_file) or text file, printed if not given')
+    command.set_defaults(handler=command_generate)
+
+    command = commands.add_parser('run', help='run one episode of the agent')
+    mazes = command.add_mutually_exclusive_group()
+    mazes.add_argument('--size', type=maze_size, default=(30, 50), help='ROWSxCOLS of a generated maze')
+    mazes.add_argument('--maze', help='.maze file or text file of the maze')
+    command.add_argument('--generator', choices=GENERATORS, default='maze')
+    command.add_argument('--planner', choices=PLANNERS, default='bfs')
+    command.add_argument('--seed', type=int, default=42)
+    command.add_argument('--step-limit', type=int, default=5000)
+    command.add_argument('--trace', help='trace file to write, the maze is saved next to it with .maze')
+    command.add_argument('--profile', action='store_true', help='report time spent in the phases of the steps')
+    command.add_argument('--time-budget', type=float, help='milliseconds the agent may spend searching in a step')
+    command.add_argument('--visualize', action='store_true', help='replay the episode in the terminal')
+    command.add_argument('--speed', type=float, default=0.1, help='seconds per step of the replay')
+    command.set_defaults(handler=command_run)
+
+    command = commands.add_parser('sweep', help='run episodes for all combinations of the parameters in parallel')
+    command.add_argument('--sizes', type=maze_size, nargs='+', default=[(30, 50)], help='ROWSxCOLS')
+    command.add_argument('--seeds', type=int, nargs='+', default=[42])
+    command.add_argument('--planners', choices=PLANNERS, nargs='+', default=['dstar'])
+    command.add_argument('--generators', choices=GENERATORS, nargs='+', default=['maze'])
+    command.add_argument('--step-limit', type=int, default=5000)
+    command.add_argument('--workers', type=int)
+    command.add_argument('--traces', help='directory to save mazes and traces of all episodes to')
+    command.add_argument('--maze-cache', nargs='?', const='', metavar='DIRECTORY',
+                         help='take the mazes from the maze cache in the directory, '
+                              'MAZE_CACHE_DIR or ~/.cache/maze_keeper if none is given')
+    command.add_argument('--output', help='CSV file with the results, printed if not given')
+    command.set_defaults(handler=command_sweep)
+
+    command = commands.add_parser('bench', help='run the benchmarks')
+    command.add_argument('--sizes', type=int, nargs='+', help='sizes of square mazes')
+    command.add_argument('--repeat', type=int, default=5)
+    command.add_argument('--warmup', type=int, default=1)
+    command.add_argument('--output', help='JSON file to save the results to')
+    command.set_defaults(handler=command_bench)
+
+    command = commands.add_parser('render', help='export or replay saved traces')
+    command.add_argument('paths', nargs='+', help='trace files (the maze file has the same name with .maze) '
+                                                  'or directories written by sweep')
+    command.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS))
+    command.add_argument('--terminal', action='store_true', help='replay the traces in the terminal instead')
+    command.add_argument('--speed', type=float, default=0.1, help='seconds per step')
+    command.add_argument('--steps-per-frame', type=int, default=1)
+    command.add_argument('--scale', type=int, default=1, help='size of a cell in pixels')
+    command.add_argument('--workers', type=int)
+    command.set_defaults(handler=command_render)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
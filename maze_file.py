@@ -0,0 +1,157 @@
+import mmap
+import struct
+
+from maze_keeper import CELL_CODES, CELL_NAMES, OBSTACLE_CODE, Grid
+
+"""
+Packed binary maze files.
+File starts with a 32 byte header: magic, format version, size of the maze and start/gold positions,
+the cells follow row by row packed by 2 bits (CELL_CODES), four cells per byte, the first cell in the lowest bits.
+Loaded files are memory mapped read-only, so even huge mazes open instantly and the pages are shared between
+all processes which load the same file.
+"""
+
+MAGIC = b'MZKP'
+VERSION = 1
+# magic, version, rows, cols, start r, start c, gold r, gold c
+HEADER = struct.Struct('<4sB3xIIIIII')
+# number of cells packed at once when saving, multiple of 4
+CHUNK = 1 << 20
+
+# shifts each of the four lanes of a packed byte to its place
+LANE_SHIFTS = [bytes((code << (2 * lane)) & 0xff for code in range(256)) for lane in range(4)]
+# unpacks byte to its four cells
+UNPACK = [bytes((byte >> (2 * lane)) & 3 for lane in range(4)) for byte in range(256)]
+
+
+def pack_cells(cells):
+    """Packs bytes of CELL_CODES (length must be a multiple of 4 unless it is the last chunk) by 2 bits per cell"""
+    cells = bytes(cells)
+    padding = -len(cells) % 4
+    cells += bytes(padding)
+    packed = 0
+    for lane in range(4):
+        packed |= int.from_bytes(cells[lane::4].translate(LANE_SHIFTS[lane]), 'little')
+    return packed.to_bytes(len(cells) // 4, 'little')
+
+
+def save_maze(path, layout):
+    """Saves layout (2-D list of MAZE_OBJECTS, Grid or PackedGrid) to the packed binary file"""
+    grid = Grid.from_layout(layout) if isinstance(layout, list) else layout
+    start, gold = grid.unique('START'), grid.unique('GOLD')
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, grid.rows, grid.cols, *start, *gold))
+        buffer = bytearray()
+        for row in grid.iter_rows():
+            buffer += row
+            if len(buffer) >= CHUNK:
+                full = len(buffer) - len(buffer) % 4
+                file.write(pack_cells(buffer[:full]))
+                del buffer[:full]
+        file.write(pack_cells(buffer))
+
+
+def load_maze(path):
+    """Returns PackedGrid memory mapping the maze file"""
+    with open(path, 'rb') as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return PackedGrid(data)
+
+
+class PackedCells:
+    """Indexable view of the cell codes of PackedGrid, same as Grid.cells without unpacking the data"""
+
+    def __init__(self, grid):
+        self.grid = grid
+
+    def __len__(self):
+        return self.grid.rows * self.grid.cols
+
+    def __getitem__(self, index):
+        return self.grid.code(index)
+
+
+class PackedGrid:
+    """
+    Read-only grid over packed maze data (bytes or mmap of the maze file).
+    Provides the same queries as Grid, so it can be used by MazeKeeper and is_feasible directly.
+    """
+
+    def __init__(self, data):
+        magic, version, rows, cols, start_r, start_c, gold_r, gold_c = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise Exception('Data do not contain a maze of version {}'.format(VERSION))
+        if len(data) < HEADER.size + (rows * cols + 3) // 4:
+            raise Exception('Maze data are truncated')
+        self.data = data
+        self.rows = rows
+        self.cols = cols
+        self.start_position = (start_r, start_c)
+        self.gold_position = (gold_r, gold_c)
+        self.cells = PackedCells(self)
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def index(self, position):
+        """Returns index of (r,c) position in the flat cell array or -1 if it lies outside of the grid"""
+        r, c = position
+        if 0 <= r < self.rows and 0 <= c < self.cols:
+            return r * self.cols + c
+        return -1
+
+    def code(self, index):
+        """Returns code of the cell with the given index"""
+        return (self.data[HEADER.size + (index >> 2)] >> ((index & 3) << 1)) & 3
+
+    def cell(self, position):
+        """Returns code of the cell at given position, position must lie inside the grid"""
+        index = self.index(position)
+        if index < 0:
+            raise IndexError('Position {} lies outside of the maze'.format(position))
+        return self.code(index)
+
+    def is_movable(self, position):
+        """Returns True if the position lies inside the grid and is not an obstacle"""
+        r, c = position
+        return 0 <= r < self.rows and 0 <= c < self.cols and self.code(r * self.cols + c) != OBSTACLE_CODE
+
+    def row(self, r):
+        """Returns row of the grid as bytes of CELL_CODES"""
+        start = r * self.cols
+        first, last = HEADER.size + (start >> 2), HEADER.size + ((start + self.cols + 3) >> 2)
+        cells = b''.join([UNPACK[byte] for byte in self.data[first:last]])
+        return cells[start & 3:(start & 3) + self.cols]
+
+    def iter_rows(self):
+        """Yields rows of the grid one by one as bytes of CELL_CODES"""
+        for r in range(self.rows):
+            yield self.row(r)
+
+    def find(self, cell_type):
+        """Returns list of positions of cells of given type"""
+        code = CELL_CODES[cell_type]
+        positions = []
+        for r, row in enumerate(self.iter_rows()):
+            c = row.find(code)
+            while c >= 0:
+                positions.append((r, c))
+                c = row.find(code, c + 1)
+        return positions
+
+    def unique(self, cell_type):
+        """Returns position of START or GOLD stored in the header"""
+        if cell_type == 'START':
+            return self.start_position
+        if cell_type == 'GOLD':
+            return self.gold_position
+        raise Exception('Only START and GOLD positions are stored in the maze file')
+
+    def to_grid(self):
+        """Unpacks the whole maze to Grid"""
+        return Grid(self.rows, self.cols, bytearray(b''.join(self.iter_rows())))
+
+    def to_layout(self):
+        """Returns the grid as 2-D list layout of MAZE_OBJECTS"""
+        return [[CELL_NAMES[code] for code in row] for row in self.iter_rows()]
@@ -1,5 +1,8 @@
-from maze_keeper import ACTIONS, get_cell_positions, get_unique_cell, add_tuples
+from cells import Cell
+from maze_keeper import OBSTACLE_CODE, Grid
+import hashlib
 import random
+import re
 
 """
 When supplied with the size of the maze as NxM tuple (M - number of rows,
@@ -18,6 +21,19 @@ WALL = 'OBSTACLE'
 GOLD = 'GOLD'
 START = 'START'
 UNKNOWN = 'UNKNOWN'
+# codes of the cells used while the maze is built, generate_maze translates the finished layout to the names above
+EMPTY_CODE = Cell.EMPTY.value
+WALL_CODE = Cell.OBSTACLE.value
+GOLD_CODE = Cell.GOLD.value
+START_CODE = Cell.START.value
+# characters of the cells (by their names) used by print_maze
+CHARACTERS = {
+    Cell.EMPTY.name: "·",
+    Cell.OBSTACLE.name: "\u2588",
+    Cell.START.name: "S",
+    Cell.GOLD.name: "G",
+    UNKNOWN: " "
+}
 RIGHT_LINE_THRESHOLD = 10
 GOLD_THRESHOLD = 5
 
@@ -50,52 +66,146 @@ def generate_random(maze_size):
 
 def is_feasible(layout):
     """
-    Use BFS to find whether the layout is feasible, i.e. whether there exists
+    Use bidirectional BFS to find whether the layout is feasible, i.e. whether there exists
     a path beween start and gold.
+    Layout can be also given as Grid or memory mapped maze_file.PackedGrid.
     """
-    gold = get_unique_cell(layout, "GOLD")
-    start = get_unique_cell(layout, "START")
-    movable_positions = set(get_cell_positions(layout, ["EMPTY", "GOLD"]))
-
-    wave = {start}
-    while wave:
-        if gold in wave:
-            return True
-        expanding_cell = wave.pop()
-        for action in ACTIONS.values():
-            new_cell = add_tuples(expanding_cell, action)
-            if new_cell in movable_positions:
-                movable_positions.remove(new_cell)
-                wave.add(new_cell)
+    grid = Grid.from_layout(layout) if isinstance(layout, list) else layout
+    return is_grid_feasible(grid)
+
+def is_grid_feasible(grid):
+    """
+    Bidirectional BFS over the flat cell indexes of Grid or PackedGrid.
+    Waves grow from start and gold, the smaller one is expanded first and the search stops
+    as soon as the waves meet or one of them cannot grow anymore.
+    """
+    rows, cols, cells = grid.rows, grid.cols, grid.cells
+    start = grid.unique("START")
+    gold = grid.unique("GOLD")
+    start = start[0] * cols + start[1]
+    gold = gold[0] * cols + gold[1]
+    area = rows * cols
+    # 1 for cells reached from start, 2 for cells reached from gold
+    owner = bytearray(area)
+    owner[start] = 1
+    owner[gold] = 2
+    waves = [None, [start], [gold]]
+    while waves[1] and waves[2]:
+        side = 1 if len(waves[1]) <= len(waves[2]) else 2
+        other = 3 - side
+        next_wave = []
+        for index in waves[side]:
+            c = index % cols
+            for neighbor in (index - cols, index + cols, index - 1 if c > 0 else -1, index + 1 if c < cols - 1 else -1):
+                if 0 <= neighbor < area and cells[neighbor] != OBSTACLE_CODE:
+                    if owner[neighbor] == other:
+                        return True
+                    if not owner[neighbor]:
+                        owner[neighbor] = side
+                        next_wave.append(neighbor)
+        waves[side] = next_wave
     return False
 
+def feasible_batch(layouts):
+    """
+    Checks feasibility of many layouts at once.
+    Every layout is labeled by runs: maximal horizontal runs of free cells are joined by union-find with the
+    overlapping runs of the previous row, the layout is feasible if start and gold lie in runs with the same root.
+    The labeling works on whole runs instead of single cells, buffers are shared by all candidates and identical
+    candidates are checked only once.
+    :return: list of booleans, one for each layout
+    """
+    results = []
+    known = {}
+    parent = []
+    for layout in layouts:
+        grid = Grid.from_layout(layout) if isinstance(layout, list) else layout
+        digest = hashlib.blake2b(digest_size=16)
+        for row in grid.iter_rows():
+            digest.update(row)
+        key = (grid.rows, grid.cols, grid.unique("START"), grid.unique("GOLD"), digest.digest())
+        if key not in known:
+            known[key] = _label_runs(grid, parent)
+        results.append(known[key])
+    return results
+
+# maps obstacles to b"#" and every other cell code to b"." for finding the runs of free cells
+_RUN_TABLE = bytes(ord("#") if code == OBSTACLE_CODE else ord(".") for code in range(256))
+_RUN_PATTERN = re.compile(b"[.]+")
+
+def _label_runs(grid, parent):
+    """Run based connectivity check of start and gold used by feasible_batch, parent is reused union-find buffer"""
+    start = grid.unique("START")
+    gold = grid.unique("GOLD")
+    del parent[:]
+    start_run = gold_run = None
+    previous = []
+    for r, row in enumerate(grid.iter_rows()):
+        current = []
+        for match in _RUN_PATTERN.finditer(row.translate(_RUN_TABLE)):
+            run = len(parent)
+            parent.append(run)
+            first, last = match.start(), match.end()
+            current.append((first, last, run))
+            if r == start[0] and first <= start[1] < last:
+                start_run = run
+            if r == gold[0] and first <= gold[1] < last:
+                gold_run = run
+        # join overlapping runs of the previous and current row
+        i = j = 0
+        while i < len(previous) and j < len(current):
+            first, last, run = previous[i]
+            other_first, other_last, other = current[j]
+            if first < other_last and other_first < last:
+                a, b = _find(parent, run), _find(parent, other)
+                if a != b:
+                    parent[a] = b
+            if last < other_last:
+                i += 1
+            else:
+                j += 1
+        previous = current
+    if start_run is None or gold_run is None:
+        return False
+    return _find(parent, start_run) == _find(parent, gold_run)
+
+def _find(parent, run):
+    while parent[run] != run:
+        parent[run] = parent[parent[run]]
+        run = parent[run]
+    return run
+
+def generate_random_feasible(maze_size, batch=16, attempts=100):
+    """Creates random mazes by generate_random in batches until one of them is feasible, None if none is"""
+    for _ in range(attempts):
+        candidates = [generate_random(maze_size) for _ in range(batch)]
+        for candidate, feasible in zip(candidates, feasible_batch(candidates)):
+            if feasible:
+                return candidate
+    return None
+
 def init_maze(rows, cols):
-    layout = []
-    for i in range(rows):
-        temp = []
-        for n in range(cols):
-            temp.append(EMPTY)
-        layout.append(temp)
-    return layout
+    """Creates empty layout of cell codes"""
+    return [[EMPTY_CODE] * cols for _ in range(rows)]
 
 def place_start_gold(layout):
-    layout[0][0] = START
+    layout[0][0] = START_CODE
     gold_position = (len(layout) - 3, 0)
     if len(layout) == GOLD_THRESHOLD:
         gold_position = (len(layout) - 2, 0)
-    layout[gold_position[0]][gold_position[1]] = GOLD
-    layout[gold_position[0] - 1][gold_position[1]] = WALL
-    layout[gold_position[0]][gold_position[1] + 1] = WALL
+    layout[gold_position[0]][gold_position[1]] = GOLD_CODE
+    layout[gold_position[0] - 1][gold_position[1]] = WALL_CODE
+    layout[gold_position[0]][gold_position[1] + 1] = WALL_CODE
 
 
 def place_right_line(layout):
     for i in range(1, len(layout) - 1):
-        layout[i][len(layout[0]) - 2] = WALL
-    layout[len(layout) - 1][len(layout[0]) - 3] = WALL
+        layout[i][len(layout[0]) - 2] = WALL_CODE
+    layout[len(layout) - 1][len(layout[0]) - 3] = WALL_CODE
 
 def place_start_path(layout):
     for i in range(1, len(layout) - 3):
-        layout[i][1] = WALL
+        layout[i][1] = WALL_CODE
 
 def place_gold_path(layout):
     start = len(layout[0]) - 2
@@ -103,9 +213,9 @@ def place_gold_path(layout):
         place_right_line(layout)
         start -= 2
     for i in range(1, start):
-        layout[len(layout) - 2][i] = WALL
+        layout[len(layout) - 2][i] = WALL_CODE
     for i in range(len(layout) - 3, 0, -1):
-        layout[i][start] = WALL
+        layout[i][start] = WALL_CODE
 
 def place_dead_ends_thin(layout):
     count = len(layout[0]) - 6
@@ -120,23 +230,23 @@ def place_dead_ends_thin(layout):
         c = 2
         if i == count:
             c = i + 1
-        while layout[y + c][x] != WALL:
-            layout[y][x] = WALL
+        while layout[y + c][x] != WALL_CODE:
+            layout[y][x] = WALL_CODE
             y += 1
         y -= 1
         for n in range(i + 1):
-            layout[y][x] = WALL
+            layout[y][x] = WALL_CODE
             y += 1
             x -= 1
         y -= 1
-        while layout[y][x] != WALL:
-            layout[y][x] = WALL
+        while layout[y][x] != WALL_CODE:
+            layout[y][x] = WALL_CODE
             x -= 1
         position -= 2
 
 def diagonalize_up(layout, x, y):
-    while layout[y - 1][x + 1] != WALL:
-        layout[y][x] = WALL
+    while layout[y - 1][x + 1] != WALL_CODE:
+        layout[y][x] = WALL_CODE
         y -= 1
         x += 1
 
@@ -145,10 +255,10 @@ def place_diagonals_thin(layout):
     if len(layout) <= GOLD_THRESHOLD:
         y += 1
     x = 2
-    while layout[y - 1][x] == WALL:
+    while layout[y - 1][x] == WALL_CODE:
         x += 1
     x += 1
-    while layout[y][x] != WALL and layout[y][x + 1] != WALL and layout[y][x + 2]:
+    while layout[y][x] != WALL_CODE and layout[y][x + 1] != WALL_CODE:
         diagonalize_up(layout, x, y)
         x += 3
 
@@ -162,8 +272,8 @@ def place_dead_ends_thick(layout):
         x += 1
     for i in range(count):
         y = 1
-        while layout[y][x] != WALL:
-            layout[y][x] = WALL
+        while layout[y][x] != WALL_CODE:
+            layout[y][x] = WALL_CODE
             y += 1
         x += 2
 
@@ -174,8 +284,8 @@ def clear_vertical(layout):
         end += 1
         start += 1
     for y in range(start, end):
-        if layout[y][2] == WALL:
-            layout[y][1] = EMPTY
+        if layout[y][2] == WALL_CODE:
+            layout[y][1] = EMPTY_CODE
 
 def clear_horizontal(layout):
     end = len(layout[0]) - 3
@@ -183,35 +293,28 @@ def clear_horizontal(layout):
         end -= 2
     y = len(layout) - 2
     for x in range(1, end):
-        if layout[y - 1][x] == WALL:
-            layout[y][x] = EMPTY
+        if layout[y - 1][x] == WALL_CODE:
+            layout[y][x] = EMPTY_CODE
 
 def place_top_thin(layout):
     x = 3
     y = 2
-    while layout[y][x] == EMPTY and layout[y + 1][x] == EMPTY:
-        layout[y][x] = WALL
-        layout[y][x + 1] = EMPTY
+    while layout[y][x] == EMPTY_CODE and layout[y + 1][x] == EMPTY_CODE:
+        layout[y][x] = WALL_CODE
+        layout[y][x + 1] = EMPTY_CODE
         y += 2
 
 def place_top_thick(layout):
     if len(layout[0]) % 2 == 0:
         x = 3
         y = 2
-        while layout[y][x] == EMPTY and layout[y + 1][x] == EMPTY:
-            layout[y][x] = WALL
-            layout[y][x + 1] = EMPTY
+        while layout[y][x] == EMPTY_CODE and layout[y + 1][x] == EMPTY_CODE:
+            layout[y][x] = WALL_CODE
+            layout[y][x + 1] = EMPTY_CODE
             y += 2
 
-def generate_maze(maze_size):
-    """
-    Maze is built from cells that can be one of the elements of the MazeObjects enum,
-    i.e. empty, obstacle, start or gold. Generated maze must be feasible.
-
-    :return: 2-D list, the layout of the maze
-
-    ===YOUR MAZE GENERATION CODE GOES HERE===
-    """
+def build_grid(maze_size):
+    """Builds the maze on the cell codes and returns it as Grid"""
     rows = maze_size[0]
     cols = maze_size[1]
     layout = init_maze(rows, cols)
@@ -229,17 +332,25 @@ def generate_maze(maze_size):
     clear_vertical(layout)
     clear_horizontal(layout)
     place_start_gold(layout)
-    if is_feasible(layout):
-        return layout
+    return Grid(rows, cols, bytearray(b"".join(bytes(row) for row in layout)))
+
+def generate_maze(maze_size):
+    """
+    Maze is built from cells that can be one of the elements of the MazeObjects enum,
+    i.e. empty, obstacle, start or gold. Generated maze must be feasible.
+
+    The maze is built on the cell codes (build_grid) and translated to the names of the cells at the end.
+
+    :return: 2-D list, the layout of the maze
+
+    ===YOUR MAZE GENERATION CODE GOES HERE===
+    """
+    grid = build_grid(maze_size)
+    if is_grid_feasible(grid):
+        return grid.to_layout()
 
 def print_maze(maze):
-    values = {
-        EMPTY: "·",
-        WALL: "\u2588",
-        START: "S",
-        GOLD: "G",
-        UNKNOWN: " "
-    }
+    values = CHARACTERS
     print_maze_header(maze)
     print()
     for row in range(len(maze)):
@@ -278,13 +389,7 @@ def test_mazes():
                 print(i, n, "Error")
 
 def save_mazes():
-    values = {
-        EMPTY: "·",
-        WALL: "\u2588",
-        START: "S",
-        GOLD: "G",
-        UNKNOWN: " "
-    }
+    values = CHARACTERS
     l = []
     y = 0
     for i in range(5, 71):
@@ -1,5 +1,11 @@
+from array import array
+
+from cells import CELL_CODES, CELL_NAMES, Cell
+
 ACTIONS = {'NORTH': (-1, 0), 'SOUTH': (1, 0), 'WEST': (0, -1), 'EAST': (0, 1)}
-MAZE_OBJECTS = {'EMPTY', 'OBSTACLE', 'GOLD', 'START'}
+MAZE_OBJECTS = set(CELL_NAMES)
+# Small integer codes of MAZE_OBJECTS (cells.Cell) are used by the compact Grid representation
+OBSTACLE_CODE = Cell.OBSTACLE.value
 
 
 def get_cell_positions(layout, cell_types):
@@ -31,6 +37,136 @@ def add_tuples(c1, c2):
     return tuple(v1 + v2 for v1, v2 in zip(c1, c2))
 
 
+class Grid:
+    """
+    Compact representation of a maze layout.
+    Cells are stored row by row in a flat bytearray of CELL_CODES, so every lookup
+    is a bounds check and a single index operation.
+    """
+
+    def __init__(self, rows, cols, cells=None):
+        self.rows = rows
+        self.cols = cols
+        self.cells = bytearray(rows * cols) if cells is None else cells
+        if len(self.cells) != rows * cols:
+            raise Exception('Grid of size {}x{} cannot hold {} cells'.format(rows, cols, len(self.cells)))
+
+    @classmethod
+    def from_layout(cls, layout):
+        """Creates Grid from 2-D list layout of MAZE_OBJECTS"""
+        rows = len(layout)
+        cols = len(layout[0]) if rows else 0
+        cells = bytearray()
+        for r, row in enumerate(layout):
+            if len(row) != cols:
+                raise Exception('Row {} of maze layout has {} cells instead of {}'.format(r, len(row), cols))
+            try:
+                cells += bytes(map(CELL_CODES.__getitem__, row))
+            except KeyError as e:
+                raise Exception('Maze layout contains unknown cell type {}'.format(e.args[0]))
+        return cls(rows, cols, cells)
+
+    def to_layout(self):
+        """Returns the grid as 2-D list layout of MAZE_OBJECTS"""
+        return [[CELL_NAMES[code] for code in row] for row in self.iter_rows()]
+
+    def row(self, r):
+        """Returns row of the grid as bytes of CELL_CODES"""
+        return bytes(self.cells[r * self.cols:(r + 1) * self.cols])
+
+    def iter_rows(self):
+        """Yields rows of the grid one by one as bytes of CELL_CODES"""
+        for r in range(self.rows):
+            yield self.row(r)
+
+    def index(self, position):
+        """Returns index of (r,c) position in the flat cell array or -1 if it lies outside of the grid"""
+        r, c = position
+        if 0 <= r < self.rows and 0 <= c < self.cols:
+            return r * self.cols + c
+        return -1
+
+    def cell(self, position):
+        """Returns code of the cell at given position, position must lie inside the grid"""
+        index = self.index(position)
+        if index < 0:
+            raise IndexError('Position {} lies outside of the maze'.format(position))
+        return self.cells[index]
+
+    def is_movable(self, position):
+        """Returns True if the position lies inside the grid and is not an obstacle"""
+        r, c = position
+        return 0 <= r < self.rows and 0 <= c < self.cols and self.cells[r * self.cols + c] != OBSTACLE_CODE
+
+    def find(self, cell_type):
+        """Returns list of positions of cells of given type"""
+        code = CELL_CODES[cell_type]
+        cells, cols = self.cells, self.cols
+        positions = []
+        index = cells.find(code)
+        while index >= 0:
+            positions.append(divmod(index, cols))
+            index = cells.find(code, index + 1)
+        return positions
+
+    def unique(self, cell_type):
+        """
+        Returns position of single cell type cell if given cell type is present only once in the grid.
+        Otherwise, raises an exception
+        """
+        code = CELL_CODES[cell_type]
+        index = self.cells.find(code)
+        if index < 0 or self.cells.find(code, index + 1) >= 0:
+            raise Exception('Maze layout contains more than one {0} or does not contain {0} at all'.format(cell_type))
+        return divmod(index, self.cols)
+
+
+def build_vision_table(grid):
+    """
+    Precomputes vision for every cell of the grid with four run-length sweeps.
+    :return dictionary:
+    key is direction from ACTIONS.keys(),
+    value is flat array indexed like Grid.cells with number of cells to the closest obstacle or edge
+    in given direction (0 for obstacle cells).
+    """
+    rows, cols = grid.rows, grid.cols
+    typecode = 'H' if max(rows, cols) < 2 ** 16 else 'I'
+    table = {direction: array(typecode, bytes(array(typecode).itemsize * rows * cols)) for direction in ACTIONS}
+
+    # WEST and EAST: runs of movable cells along each row
+    for r in range(rows):
+        start = r * cols
+        row = grid.row(r)
+        west, east = [0] * cols, [0] * cols
+        run = 0
+        for c in range(cols):
+            if row[c] == OBSTACLE_CODE:
+                run = 0
+            else:
+                west[c] = run
+                run += 1
+        run = 0
+        for c in range(cols - 1, -1, -1):
+            if row[c] == OBSTACLE_CODE:
+                run = 0
+            else:
+                east[c] = run
+                run += 1
+        table['WEST'][start:start + cols] = array(typecode, west)
+        table['EAST'][start:start + cols] = array(typecode, east)
+
+    # NORTH and SOUTH: runs of movable cells along each column, swept row by row
+    for direction, row_order in (('NORTH', range(rows)), ('SOUTH', range(rows - 1, -1, -1))):
+        runs = [0] * cols
+        for r in row_order:
+            start = r * cols
+            row = grid.row(r)
+            table[direction][start:start + cols] = array(
+                typecode, [0 if code == OBSTACLE_CODE else run for code, run in zip(row, runs)])
+            runs = [0 if code == OBSTACLE_CODE else run + 1 for code, run in zip(row, runs)]
+    return table
+
+
 class Observation:
     """Observation of an agent in a maze.
     Observation variables:
@@ -44,18 +180,48 @@ class Observation:
         self.vision = vision
 
 
-class MazeKeeper:
+class MazeKeeperBase:
+    """
+    Maze shared by the keepers: the Grid, start and gold positions, the vision table and the 2-D list layout.
+    Layout can be given either as 2-D list of MAZE_OBJECTS or as a Grid (or maze_file.PackedGrid).
+    Vision is precomputed for every cell if precompute_vision is True, otherwise the vision is found
+    by walking from the agent, so huge memory mapped mazes can be used without touching all their cells.
+    By default it is precomputed only for 2-D lists and Grids, grids reading their cells on demand
+    (maze_file.PackedGrid, chunked_maze.ChunkedMaze) are walked, the table would take about 8 bytes per cell.
+    Keepers of many episodes in the same maze can share one Grid and the vision table built by build_vision_table.
+    """
+
+    def __init__(self, layout, precompute_vision=None, vision_table=None):
+        # 2-D list layout, built from the grid when it is first asked for
+        self._layout = layout if isinstance(layout, list) else None
+        self.grid = Grid.from_layout(layout) if isinstance(layout, list) else layout
+        self.start_position = self.grid.unique('START')
+        self.gold_position = self.grid.unique('GOLD')
+        if precompute_vision is None:
+            precompute_vision = isinstance(self.grid, Grid)
+        if vision_table is None and precompute_vision:
+            vision_table = build_vision_table(self.grid)
+        self._vision_table = vision_table
+
+    @property
+    def layout(self):
+        """Returns the maze as 2-D list of MAZE_OBJECTS, a Grid given to the keeper is converted only once"""
+        if self._layout is None:
+            self._layout = self.grid.to_layout()
+        return self._layout
+
+
+class MazeKeeper(MazeKeeperBase):
     """
     Handles interaction between the agent and the maze.
-    Takes agents actions and returns agents new Observation after executing the action
+    Takes agents actions and returns agents new Observation after executing the action.
+    The maze and its vision are set up by MazeKeeperBase.
+    Only the keeper is lazy, Agent keeps its own map of the maze in dense arrays of rows * cols entries.
     """
 
-    def __init__(self, layout):
-        self.layout = layout
-        self.start_position = get_unique_cell(layout, 'START')
+    def __init__(self, layout, precompute_vision=None, vision_table=None):
+        super().__init__(layout, precompute_vision, vision_table)
         self.agent_position = self.start_position
-        self.gold_position = get_unique_cell(self.layout, 'GOLD')
-        self._movable_positions = get_cell_positions(self.layout, ['EMPTY', 'GOLD', 'START'])
         self.finished = False
         self.has_gold = False
 
@@ -66,11 +232,19 @@ class MazeKeeper:
         key is direction from ACTIONS.keys(),
         value is number of cells to the closest obstacle or edge in given diraction from the current position of the agent.
         """
+        if self._vision_table is None:
+            return self._walk_vision()
+        r, c = self.agent_position
+        index = r * self.grid.cols + c
+        return {direction: distances[index] for direction, distances in self._vision_table.items()}
+
+    def _walk_vision(self):
+        """Returns vision of the agent found by walking from the current position in each direction"""
         vision = {}
         for direction, move in ACTIONS.items():
             vision[direction] = -1
             tmp_position = self.agent_position
-            while tmp_position in self._movable_positions:
+            while self.grid.is_movable(tmp_position):
                 tmp_position = add_tuples(tmp_position, move)
                 vision[direction] += 1
         return vision
@@ -91,7 +265,7 @@ class MazeKeeper:
         :return Observation: new observation of the agent after executing the move.
         """
         new_position = add_tuples(self.agent_position, ACTIONS[action])
-        if new_position in self._movable_positions:
+        if self.grid.is_movable(new_position):
             self.agent_position = new_position
         return self.observation()
 
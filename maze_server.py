@@ -0,0 +1,416 @@
+import asyncio
+from abc import ABCMeta, abstractmethod
+import itertools
+import struct
+import sys
+import time
+
+from maze_keeper import ACTIONS, Grid, MazeKeeper, Observation, build_vision_table
+
+"""
+Asyncio server hosting MazeKeeper episodes for agents running in other processes.
+Clients connect over TCP or a Unix socket, one connection can run any number of episodes at once.
+Messages are fixed size little-endian structs (MESSAGES) starting with the kind of the message:
+client opens an episode by NEW, moves the agent by STEP and ends the episode by CLOSE,
+server answers NEW by EPISODE followed by the first OBSERVATION and every STEP by OBSERVATION (or ERROR).
+Steps received in the same tick of the event loop are executed together in one batch and the answers to every
+connection are written at once. Episodes in the mazes of the same size share the Grid and the vision table.
+Run this file from console to start the server or the clients, use --help to see the options.
+"""
+
+HOST = '127.0.0.1'
+PORT = 7878
+
+ACTION_NAMES = tuple(ACTIONS)
+ACTION_INDEX = {name: i for i, name in enumerate(ACTION_NAMES)}
+
+# client -> server
+NEW, STEP, CLOSE = 1, 2, 3
+# server -> client
+EPISODE, OBSERVATION, ERROR = 4, 5, 6
+MESSAGES = {
+    # kind, tag chosen by the client, rows, cols
+    NEW: struct.Struct('<BIII'),
+    # kind, episode, index of the action in ACTIONS
+    STEP: struct.Struct('<BIB'),
+    # kind, episode
+    CLOSE: struct.Struct('<BI'),
+    # kind, tag, episode, start r, start c, gold r, gold c
+    EPISODE: struct.Struct('<BIIIIII'),
+    # kind, episode, r, c, vision in the order of ACTIONS, flags
+    OBSERVATION: struct.Struct('<BIIIIIIIB'),
+    # kind, tag (for NEW) or episode, error code
+    ERROR: struct.Struct('<BIB'),
+}
+
+# flags of OBSERVATION
+FINISHED = 1
+HAS_GOLD = 2
+
+# error codes
+UNKNOWN_EPISODE = 1
+NO_MAZE = 2
+INVALID_ACTION = 3
+ERRORS = {UNKNOWN_EPISODE: 'Episode {} does not exist',
+          NO_MAZE: 'Maze of request {} cannot be generated',
+          INVALID_ACTION: 'Invalid action in episode {}'}
+
+
+def pack_observation(episode, keeper, observation):
+    flags = (FINISHED if keeper.finished else 0) | (HAS_GOLD if keeper.has_gold else 0)
+    vision = observation.vision
+    return MESSAGES[OBSERVATION].pack(OBSERVATION, episode, *observation.position,
+                                      *[vision[name] for name in ACTION_NAMES], flags)
+
+
+class MessageProtocol(asyncio.Protocol, metaclass=ABCMeta):
+    """
+    Splits the received stream to messages of the accepted kinds and passes them to received,
+    messages sent during one tick of the event loop are written to the transport at once.
+    """
+    accepted = ()
+
+    def __init__(self):
+        self.transport = None
+        self.buffer = bytearray()
+        self.outgoing = []
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        buffer = self.buffer
+        buffer += data
+        offset = 0
+        while offset < len(buffer):
+            kind = buffer[offset]
+            if kind not in self.accepted:
+                # the stream cannot be synchronized again
+                self.transport.close()
+                return
+            message = MESSAGES[kind]
+            if offset + message.size > len(buffer):
+                break
+            self.received(message.unpack_from(buffer, offset))
+            offset += message.size
+        del buffer[:offset]
+
+    @abstractmethod
+    def received(self, message):
+        """Handles the unpacked message"""
+
+    def send(self, data):
+        if not self.outgoing:
+            asyncio.get_running_loop().call_soon(self.write_outgoing)
+        self.outgoing.append(data)
+
+    def write_outgoing(self):
+        if not self.transport.is_closing():
+            self.transport.write(b''.join(self.outgoing))
+        self.outgoing = []
+
+
+class ServerProtocol(MessageProtocol):
+    """Connection of one client to EpisodeServer"""
+    accepted = (NEW, STEP, CLOSE)
+
+    def __init__(self, server):
+        super().__init__()
+        self.server = server
+        # episodes opened by this connection
+        self.episodes = set()
+
+    def received(self, message):
+        self.server.handle(self, message)
+
+    def connection_lost(self, exc):
+        self.server.disconnected(self)
+
+
+class EpisodeServer:
+    """
+    Hosts MazeKeeper episodes of all connected clients.
+    :param maze_generator: function generating layout of the given size, it is called once for every size
+    :param report_interval: seconds between throughput reports written to log, None disables them
+    """
+
+    def __init__(self, maze_generator, report_interval=None, log=sys.stderr):
+        self.maze_generator = maze_generator
+        self.report_interval = report_interval
+        self.log = log
+        # maze size -> (Grid, vision table), None if the maze cannot be generated
+        self.mazes = {}
+        self.keepers = {}
+        self.episode_ids = itertools.count()
+        # steps waiting for the next batch
+        self.pending = []
+        self.server = None
+        self.reporter = None
+        self.started = None
+        self.episodes = self.steps = self.batches = 0
+
+    async def start(self, host=HOST, port=PORT, path=None):
+        """Starts listening on TCP host and port (0 chooses a free port), or on Unix socket path if it is given"""
+        loop = asyncio.get_running_loop()
+        if path is not None:
+            self.server = await loop.create_unix_server(lambda: ServerProtocol(self), path)
+        else:
+            self.server = await loop.create_server(lambda: ServerProtocol(self), host, port)
+        self.started = time.perf_counter()
+        if self.report_interval:
+            self.reporter = asyncio.ensure_future(self.report_periodically())
+        return self.server
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        await self.server.serve_forever()
+
+    def close(self):
+        if self.reporter is not None:
+            self.reporter.cancel()
+        self.server.close()
+
+    def maze(self, maze_size):
+        if maze_size not in self.mazes:
+            try:
+                layout = self.maze_generator(maze_size)
+            except Exception:
+                layout = None
+            if layout is None:
+                self.mazes[maze_size] = None
+            else:
+                grid = Grid.from_layout(layout) if isinstance(layout, list) else layout
+                self.mazes[maze_size] = (grid, build_vision_table(grid))
+        return self.mazes[maze_size]
+
+    def handle(self, protocol, message):
+        kind = message[0]
+        if kind == STEP:
+            if not self.pending:
+                asyncio.get_running_loop().call_soon(self.run_batch)
+            self.pending.append((protocol, message[1], message[2]))
+        elif kind == NEW:
+            self.open_episode(protocol, *message[1:])
+        elif kind == CLOSE:
+            if message[1] in protocol.episodes:
+                protocol.episodes.discard(message[1])
+                del self.keepers[message[1]]
+
+    def open_episode(self, protocol, tag, rows, cols):
+        maze = self.maze((rows, cols))
+        if maze is None:
+            protocol.send(MESSAGES[ERROR].pack(ERROR, tag, NO_MAZE))
+            return
+        keeper = MazeKeeper(maze[0], vision_table=maze[1])
+        episode = next(self.episode_ids)
+        self.keepers[episode] = keeper
+        protocol.episodes.add(episode)
+        self.episodes += 1
+        protocol.send(MESSAGES[EPISODE].pack(EPISODE, tag, episode, *keeper.start_position, *keeper.gold_position))
+        protocol.send(pack_observation(episode, keeper, keeper.observation()))
+
+    def run_batch(self):
+        """Executes all steps received since the last batch"""
+        pending, self.pending = self.pending, []
+        keepers = self.keepers
+        error = MESSAGES[ERROR]
+        for protocol, episode, action in pending:
+            if episode not in protocol.episodes:
+                protocol.send(error.pack(ERROR, episode, UNKNOWN_EPISODE))
+            elif action >= len(ACTION_NAMES):
+                protocol.send(error.pack(ERROR, episode, INVALID_ACTION))
+            else:
+                keeper = keepers[episode]
+                protocol.send(pack_observation(episode, keeper, keeper.agent_move(ACTION_NAMES[action])))
+        self.steps += len(pending)
+        self.batches += 1
+
+    def disconnected(self, protocol):
+        for episode in protocol.episodes:
+            del self.keepers[episode]
+        protocol.episodes.clear()
+
+    def throughput(self):
+        """Returns steps per second since the server started"""
+        elapsed = time.perf_counter() - self.started
+        return self.steps / elapsed if elapsed > 0 else 0.0
+
+    def report(self):
+        return '{} episodes running, {} opened, {} steps, {:.0f} steps/s, {:.1f} steps per batch'.format(
+            len(self.keepers), self.episodes, self.steps, self.throughput(), self.steps / max(self.batches, 1))
+
+    async def report_periodically(self):
+        steps = self.steps
+        while True:
+            await asyncio.sleep(self.report_interval)
+            print('{}, last {:.0f} steps/s'.format(self.report(), (self.steps - steps) / self.report_interval),
+                  file=self.log)
+            steps = self.steps
+
+
+class RemoteEpisode:
+    """Episode hosted by EpisodeServer as seen by the client"""
+
+    def __init__(self, episode, start_position, gold_position):
+        self.episode = episode
+        self.start_position = start_position
+        self.gold_position = gold_position
+        self.observation = None
+        self.finished = False
+        self.has_gold = False
+
+
+class ClientConnection(MessageProtocol):
+    """
+    Client side of the connection to EpisodeServer, runs any number of episodes at once.
+    Use connect to create it.
+    """
+    accepted = (EPISODE, OBSERVATION, ERROR)
+
+    def __init__(self):
+        super().__init__()
+        self.tags = itertools.count()
+        # tag of NEW -> future of RemoteEpisode
+        self.opening = {}
+        # episode waiting for its first observation or for the observation after a step -> (future, RemoteEpisode),
+        # the future is resolved when the observation of the RemoteEpisode is updated
+        self.waiting = {}
+
+    async def new_episode(self, maze_size):
+        """Opens an episode in the maze of the given size on the server and returns RemoteEpisode"""
+        tag = next(self.tags)
+        future = asyncio.get_running_loop().create_future()
+        self.opening[tag] = future
+        self.send(MESSAGES[NEW].pack(NEW, tag, *maze_size))
+        return await future
+
+    async def step(self, episode, action):
+        """Executes action in the RemoteEpisode and returns the new Observation"""
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[episode.episode] = (future, episode)
+        self.send(MESSAGES[STEP].pack(STEP, episode.episode, ACTION_INDEX[action]))
+        await future
+        return episode.observation
+
+    def close_episode(self, episode):
+        self.send(MESSAGES[CLOSE].pack(CLOSE, episode.episode))
+
+    def close(self):
+        """Writes the messages sent so far and closes the connection"""
+        if self.outgoing:
+            self.write_outgoing()
+        self.transport.close()
+
+    def received(self, message):
+        kind = message[0]
+        if kind == OBSERVATION:
+            _, episode, r, c, *vision, flags = message
+            future, remote = self.waiting.pop(episode)
+            remote.observation = Observation(vision=dict(zip(ACTION_NAMES, vision)), position=(r, c))
+            remote.finished = bool(flags & FINISHED)
+            remote.has_gold = bool(flags & HAS_GOLD)
+            future.set_result(remote)
+        elif kind == EPISODE:
+            _, tag, episode, start_r, start_c, gold_r, gold_c = message
+            remote = RemoteEpisode(episode, (start_r, start_c), (gold_r, gold_c))
+            self.waiting[episode] = (self.opening.pop(tag), remote)
+        else:
+            _, key, code = message
+            if code == NO_MAZE:
+                future = self.opening.pop(key)
+            else:
+                future = self.waiting.pop(key)[0]
+            future.set_exception(Exception(ERRORS[code].format(key)))
+
+    def connection_lost(self, exc):
+        futures = list(self.opening.values()) + [future for future, _ in self.waiting.values()]
+        for future in futures:
+            if not future.done():
+                future.set_exception(ConnectionError('Connection to the maze server was lost'))
+
+
+async def connect(host=HOST, port=PORT, path=None):
+    """Returns ClientConnection to the server listening on TCP host and port or on Unix socket path"""
+    loop = asyncio.get_running_loop()
+    if path is not None:
+        _, connection = await loop.create_unix_connection(ClientConnection, path)
+    else:
+        _, connection = await loop.create_connection(ClientConnection, host, port)
+    return connection
+
+
+async def run_episode(connection, agent, maze_size, step_limit=5000):
+    """
+    Runs one episode of the agent (any Agent class, created the same way as by Simulation) on the server.
+    :return: (finished, number of steps)
+    """
+    episode = await connection.new_episode(maze_size)
+    agent = agent(maze_size, step_limit, episode.start_position, episode.gold_position)
+    observation = episode.observation
+    step = 0
+    while not episode.finished and step < step_limit:
+        step += 1
+        action = agent.select_action(observation)
+        observation = await connection.step(episode, action)
+    connection.close_episode(episode)
+    return episode.finished, step
+
+
+async def run_clients(agent, maze_size, episodes, step_limit=5000, connections=1, host=HOST, port=PORT, path=None):
+    """
+    Runs episodes concurrently over the given number of connections.
+    :return: dictionary with number of episodes, finished episodes, steps, elapsed time and steps per second
+    """
+    opened = [await connect(host, port, path) for _ in range(connections)]
+    start = time.perf_counter()
+    results = await asyncio.gather(*[run_episode(opened[i % connections], agent, maze_size, step_limit)
+                                     for i in range(episodes)])
+    elapsed = time.perf_counter() - start
+    for connection in opened:
+        connection.close()
+    steps = sum(step for _, step in results)
+    return {'episodes': episodes,
+            'finished': sum(finished for finished, _ in results),
+            'steps': steps,
+            'elapsed': elapsed,
+            'steps_per_second': steps / elapsed if elapsed > 0 else 0.0}
+
+
+if __name__ == '__main__':
+    import argparse
+    from functools import partial
+
+    parser = argparse.ArgumentParser(description='Maze episode server and its clients')
+    parser.add_argument('mode', choices=['serve', 'clients'])
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--unix', help='path of Unix socket used instead of TCP')
+    parser.add_argument('--report', type=float, default=5.0, help='seconds between throughput reports of the server')
+    parser.add_argument('--episodes', type=int, default=100)
+    parser.add_argument('--connections', type=int, default=1)
+    parser.add_argument('--size', type=int, nargs=2, default=[20, 20], metavar=('ROWS', 'COLS'))
+    parser.add_argument('--step-limit', type=int, default=5000)
+    parser.add_argument('--planner', default='bfs')
+    args = parser.parse_args()
+
+    async def serve():
+        from maze_generator import generate_maze
+        server = EpisodeServer(generate_maze, report_interval=args.report)
+        await server.start(args.host, args.port, args.unix)
+        print('Serving on {}'.format(server.address), file=sys.stderr)
+        await server.serve_forever()
+
+    async def clients():
+        from agent import Agent
+        summary = await run_clients(partial(Agent, planner=args.planner), tuple(args.size), args.episodes,
+                                    args.step_limit, args.connections, args.host, args.port, args.unix)
+        print('{episodes} episodes, {finished} finished, {steps} steps in {elapsed:.2f} s, '
+              '{steps_per_second:.0f} steps/s'.format(**summary))
+
+    try:
+        asyncio.run(serve() if args.mode == 'serve' else clients())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,179 @@
+from array import array
+
+import numpy as np
+
+from agent import DIRECTIONS, FREE, Agent
+from batch_keeper import ACTION_NAMES, BatchObservation
+from maze_keeper import ACTIONS, MazeKeeperBase
+
+"""
+Maze keeper of many agents moving in one maze at the same time.
+The layout and the precomputed vision are shared by all agents, state of the agents is kept in flat arrays
+(cell index, gold and finish flags), so every extra agent costs only a few bytes.
+Observations of all agents are returned at once as batch_keeper.BatchObservation, the arrays of positions
+and vision indexed by agent are gathered from the shared vision table by NumPy without a loop over the agents.
+Agents can optionally block each other, see BLOCKING_RULES, CoordinatedAgent gives way to the agents blocking it.
+"""
+
+# 'none': agents pass through each other
+# 'occupied': agents move one by one in the order of their indexes and cannot enter a cell occupied by another
+#             agent at that moment, start and gold can hold any number of agents
+BLOCKING_RULES = ('none', 'occupied')
+
+
+class MultiAgentKeeper(MazeKeeperBase):
+    """
+    Handles interaction between count agents and one shared maze, all agents start at the start of the maze.
+    Layout can be given either as 2-D list of MAZE_OBJECTS or as a Grid (or maze_file.PackedGrid),
+    vision_table built by build_vision_table can be shared with other keepers of the same maze.
+    """
+
+    def __init__(self, layout, count, blocking='none', vision_table=None):
+        if blocking not in BLOCKING_RULES:
+            raise Exception('Unknown blocking rule {}, use one of {}'.format(blocking, BLOCKING_RULES))
+        super().__init__(layout, precompute_vision=True, vision_table=vision_table)
+        self.count = count
+        self.blocking = blocking
+
+        cols = self.grid.cols
+        self.start_index = self.start_position[0] * cols + self.start_position[1]
+        self.gold_index = self.gold_position[0] * cols + self.gold_position[1]
+        # per agent state
+        self.cell = array('I', [self.start_index]) * count
+        self.has_gold = bytearray(count)
+        self.finished = bytearray(count)
+        # number of agents in every occupied cell, used by the blocking rules
+        self.occupied = {self.start_index: count} if count else {}
+        # NumPy views of the per agent state and of the vision table in the order of ACTION_NAMES, no copies
+        self._cells = np.frombuffer(self.cell, dtype=self.cell.typecode)
+        self._has_gold = np.frombuffer(self.has_gold, dtype=np.uint8)
+        self._finished = np.frombuffer(self.finished, dtype=np.uint8)
+        self._vision = [np.frombuffer(self._vision_table[direction], dtype=self._vision_table[direction].typecode)
+                        for direction in ACTION_NAMES]
+
+    def agent_position(self, agent):
+        return divmod(self.cell[agent], self.grid.cols)
+
+    def observations(self):
+        """Returns BatchObservation of all agents, observations[agent] is the Observation of one agent"""
+        cells = self._cells
+        self._has_gold |= cells == self.gold_index
+        self._finished |= (self._has_gold == 1) & (cells == self.start_index)
+        return BatchObservation(vision=np.stack([vision[cells] for vision in self._vision], axis=1),
+                                position=np.stack(np.divmod(cells, self.grid.cols), axis=1))
+
+    def _is_free(self, cell):
+        return cell == self.start_index or cell == self.gold_index or cell not in self.occupied
+
+    def step(self, actions):
+        """
+        Executes actions of all agents, actions of finished agents and None actions are ignored.
+        If an agent tries to move into an obstacle, edge of the maze or a blocked cell, he stays at the same position.
+        :param actions: sequence of count actions from ACTIONS.keys() or None
+        :return: BatchObservation of all agents after executing the moves
+        """
+        grid, cols, cell, finished = self.grid, self.grid.cols, self.cell, self.finished
+        blocking = self.blocking != 'none'
+        occupied = self.occupied
+        for agent, action in enumerate(actions):
+            if action is None or finished[agent]:
+                continue
+            move_r, move_c = ACTIONS[action]
+            r, c = divmod(cell[agent], cols)
+            new_position = (r + move_r, c + move_c)
+            if not grid.is_movable(new_position):
+                continue
+            new_cell = new_position[0] * cols + new_position[1]
+            if blocking:
+                if not self._is_free(new_cell):
+                    continue
+                if occupied[cell[agent]] == 1:
+                    del occupied[cell[agent]]
+                else:
+                    occupied[cell[agent]] -= 1
+                occupied[new_cell] = occupied.get(new_cell, 0) + 1
+            cell[agent] = new_cell
+        return self.observations()
+
+
+class CoordinatedAgent(Agent):
+    """
+    Agent sharing the maze with other agents which may block its moves.
+    It notices that its last move into a known free tile did not happen, then it gives way by a random move
+    on the way to gold (the blocking agent might want to get to its tile) and repeats the step on the way back.
+    """
+
+    def __init__(self, maze_size, step_limit, start_position, gold_position, planner='bfs', time_budget=None):
+        super().__init__(maze_size, step_limit, start_position, gold_position, planner, time_budget)
+        # position the last move should have led to
+        self.expected_position = None
+
+    def select_action(self, observation):
+        expected = self.expected_position
+        # tiles next to the agent are always known, so the tile of the blocked move is known before the observation
+        blocked = (expected is not None and observation.position != expected and not self.is_out_of_bounds(expected)
+                   and self.maze[self.index(expected)] & FREE)
+        if not blocked:
+            ret = super().select_action(observation)
+        else:
+            self.agent_position = observation.position
+            self.save_observation(observation)
+            if self.gold_found and self.route_back:
+                ret = self.route_back[self.steps_back_taken - 1]
+            else:
+                ret = self.random_action()
+        move = DIRECTIONS[ret]
+        self.expected_position = (self.agent_position[0] + move[0], self.agent_position[1] + move[1])
+        return ret
+
+
+class MultiAgentSimulation:
+    """
+    Simulation of count agents searching for the gold in one maze at the same time.
+    One agent object is created for every agent, agents which finished are not asked for actions anymore.
+    """
+
+    def __init__(self, maze_size=(30, 50), count=10, step_limit=5000, agent=CoordinatedAgent, maze_generator=None,
+                 blocking='none'):
+        self.step_limit = step_limit
+        self.maze_size = maze_size
+        self.layout = maze_generator(maze_size)
+        self.maze_keeper = MultiAgentKeeper(self.layout, count, blocking)
+        self.agents = [agent(maze_size, step_limit, self.maze_keeper.start_position, self.maze_keeper.gold_position)
+                       for _ in range(count)]
+
+    def run(self):
+        """
+        Runs the simulation until all agents finish or reach the step limit.
+        :return: (finished, steps) lists, whether each agent brought the gold to the start and in how many steps
+        """
+        keeper = self.maze_keeper
+        observations = keeper.observations()
+        steps = [0] * keeper.count
+        step = 0
+        while step < self.step_limit and not all(keeper.finished):
+            step += 1
+            actions = []
+            for agent in range(keeper.count):
+                if keeper.finished[agent]:
+                    actions.append(None)
+                else:
+                    steps[agent] += 1
+                    actions.append(self.agents[agent].select_action(observations[agent]))
+            observations = keeper.step(actions)
+        return [bool(finished) for finished in keeper.finished], steps
+
+
+if __name__ == '__main__':
+    from functools import partial
+    from maze_generator import generate_random_feasible
+    import time
+
+    for blocking in BLOCKING_RULES:
+        start = time.time()
+        sim = MultiAgentSimulation(maze_size=(30, 30), count=20, step_limit=5000, agent=partial(CoordinatedAgent, planner='dstar'),
+                                   maze_generator=generate_random_feasible, blocking=blocking)
+        finished, steps = sim.run()
+        finish = time.time()
+        print('{} agents, blocking {}: {} finished, {} steps at most, {:.3f} s'.format(
+            len(finished), blocking, sum(finished), max(steps), finish - start))
@@ -0,0 +1,402 @@
+import heapq
+from abc import ABC, abstractmethod
+from array import array
+from time import perf_counter
+
+"""
+Planners for the Agent's way to gold.
+Planners keep their own copy of passability of the tiles, the agent tells them which tiles it has observed
+and they ask it (by is_blocked) only about those. Incremental planners also keep their search state between
+the steps of the agent and only repair the part of the search invalidated by the tiles whose passability changed.
+Every planner counts the tiles it expands in total (expanded) and in every step (step_expansions).
+Planning can be given a deadline (perf_counter time), the search is then interrupted when the deadline passes and
+the best move found so far is returned. A* (searching from the goal when given a deadline) and D* Lite resume
+the interrupted search in the next step even though the agent has moved.
+"""
+
+DIRECTIONS = {
+        "NORTH": (-1, 0),
+        "SOUTH": (1, 0),
+        "WEST": (0, -1),
+        "EAST": (0, 1)
+    }
+
+INFINITY = float("inf")
+# the deadline is checked once per this number of expanded tiles (must be a power of two),
+# every search expands at least this number of tiles, so an interrupted search always makes progress
+DEADLINE_CHECK = 64
+
+
+def closest_move(position, goal, maze_size, is_blocked):
+    """
+    Returns the direction of the move from the position to a free neighbor closest to the goal (Manhattan distance),
+    None if there is no such neighbor, used as the move of a search interrupted by the deadline.
+    :param is_blocked: function returning True if the tile of the given index (r * cols + c) cannot be entered
+    """
+    rows, cols = maze_size
+    best_direction, best_distance = None, INFINITY
+    for direction, move in DIRECTIONS.items():
+        r, c = position[0] + move[0], position[1] + move[1]
+        if 0 <= r < rows and 0 <= c < cols and not is_blocked(r * cols + c):
+            distance = abs(r - goal[0]) + abs(c - goal[1])
+            if distance < best_distance:
+                best_direction, best_distance = direction, distance
+    return best_direction
+
+
+class GridPlanner(ABC):
+    """
+    Common part of the planners on the 4-connected grid of the agent's map.
+    Moving into a blocked tile is not allowed, moving out of it is (the agent may stand on a barrier).
+    """
+
+    def __init__(self, maze_size, goal, is_blocked):
+        """
+        :param maze_size: (rows, cols) of the maze
+        :param goal: (r, c) position the planner searches the way to
+        :param is_blocked: function returning True if the tile of the given coordinates cannot be entered
+        """
+        self.rows, self.cols = maze_size
+        self.goal = goal
+        self.is_blocked = is_blocked
+        self.blocked = bytearray(self.rows * self.cols)
+        # indexes of tiles whose passability changed since the last step
+        self.changed = []
+        self.expanded = 0
+        self.step_expansions = array("I")
+        # whether the last search was interrupted by the deadline and the number of such searches
+        self.interrupted = False
+        self.interruptions = 0
+
+    def index(self, position):
+        return position[0] * self.cols + position[1]
+
+    def heuristic(self, index, position):
+        """Manhattan distance between the tile with the given index and the given position"""
+        r, c = divmod(index, self.cols)
+        return abs(r - position[0]) + abs(c - position[1])
+
+    def neighbors(self, index):
+        """Yields indexes of tiles next to the tile with the given index"""
+        r, c = divmod(index, self.cols)
+        if r > 0:
+            yield index - self.cols
+        if r < self.rows - 1:
+            yield index + self.cols
+        if c > 0:
+            yield index - 1
+        if c < self.cols - 1:
+            yield index + 1
+
+    def update(self, positions):
+        """Rechecks passability of the given tiles and remembers the ones that changed"""
+        for position in positions:
+            index = self.index(position)
+            blocked = 1 if self.is_blocked(position) else 0
+            if self.blocked[index] != blocked:
+                self.blocked[index] = blocked
+                self.changed.append(index)
+
+    def next_action(self, position, deadline=None):
+        """
+        Returns the direction of the next move on the shortest route from the given position to the goal,
+        None if there is no such route.
+        If the search is interrupted by the deadline, returns the best move found so far (None if there is none)
+        and sets interrupted.
+        """
+        expanded = self.expanded
+        self.interrupted = False
+        action = self.plan(position, deadline)
+        if self.interrupted:
+            self.interruptions += 1
+        self.step_expansions.append(self.expanded - expanded)
+        return action
+
+    @abstractmethod
+    def plan(self, position, deadline=None):
+        """Returns the next move from the position to the goal, None if there is no way, used by next_action"""
+
+    def closest_move(self, position):
+        """Returns the direction of the move to a free neighbor closest to the goal, None if there is no such"""
+        return closest_move(position, self.goal, (self.rows, self.cols), self.blocked.__getitem__)
+
+
+class AStarPlanner(GridPlanner):
+    """
+    A* search with Manhattan distance heuristic.
+    Without a deadline, the search goes from the agent to the goal and it is repeated every step,
+    among the tiles with the same estimate the ones closer to the goal are expanded first.
+    With a deadline, the search goes from the goal to the agent (plan_from_goal). Being rooted at the goal, it stays
+    valid while the agent moves, so an interrupted search is kept and continued in the next steps towards the new
+    position of the agent (the open list is ordered again by the new heuristic) until it reaches the agent,
+    meanwhile the agent moves to the free neighbor closest to the goal. The search starts anew only when a tile
+    it has expanded gets blocked or a tile next to an expanded one gets free, tiles blocked before they are
+    expanded are skipped. A step in which the agent stands on an already expanded tile needs no expansions.
+    Search data live in flat arrays which are reused by all searches, a tile's values are valid only
+    if its stamp equals the number of the current search.
+    """
+
+    def __init__(self, maze_size, goal, is_blocked):
+        super().__init__(maze_size, goal, is_blocked)
+        area = self.rows * self.cols
+        self.g = array("I", bytes(4 * area))
+        self.stamp = array("I", bytes(4 * area))
+        # number of the search from the goal which expanded the tile
+        self.closed = array("I", bytes(4 * area))
+        # index of the first move of the best known route to the tile (search from the agent)
+        # or of the move to the next tile of the route to the goal (search from the goal)
+        self.origin = bytearray(area)
+        self.search = 0
+        # open list of the search from the goal as (f, h, index), None if there is no such search,
+        # and the position its heuristic leads to
+        self.queue = None
+        self.target = None
+
+    def plan(self, position, deadline=None):
+        if deadline is not None:
+            return self.plan_from_goal(position, deadline)
+        self.changed = []
+        self.queue = None
+        self.search += 1
+        search, g, stamp, origin, blocked = self.search, self.g, self.stamp, self.origin, self.blocked
+        rows, cols = self.rows, self.cols
+        goal_r, goal_c = self.goal
+        goal = goal_r * cols + goal_c
+        moves = list(DIRECTIONS.values())
+        start = self.index(position)
+        g[start] = 0
+        stamp[start] = search
+        h = abs(position[0] - goal_r) + abs(position[1] - goal_c)
+        queue = [(h, h, start)]
+        while queue:
+            f, h, index = heapq.heappop(queue)
+            cost = f - h
+            if cost > g[index]:
+                # outdated entry, the tile was reached cheaper later
+                continue
+            self.expanded += 1
+            r, c = divmod(index, cols)
+            for i, (move_r, move_c) in enumerate(moves):
+                new_r, new_c = r + move_r, c + move_c
+                if new_r < 0 or new_c < 0 or new_r >= rows or new_c >= cols:
+                    continue
+                neighbor = new_r * cols + new_c
+                if blocked[neighbor]:
+                    continue
+                if stamp[neighbor] != search or cost + 1 < g[neighbor]:
+                    stamp[neighbor] = search
+                    g[neighbor] = cost + 1
+                    origin[neighbor] = i if index == start else origin[index]
+                    # with consistent heuristic and unit costs the goal is reached optimally when first generated
+                    if neighbor == goal:
+                        return list(DIRECTIONS)[origin[neighbor]]
+                    h = abs(new_r - goal_r) + abs(new_c - goal_c)
+                    heapq.heappush(queue, (cost + 1 + h, h, neighbor))
+        return None
+
+    def start_search(self):
+        self.search += 1
+        goal = self.index(self.goal)
+        self.g[goal] = 0
+        self.stamp[goal] = self.search
+        self.queue = [(0, 0, goal)]
+        self.target = None
+
+    def invalidates_search(self, index):
+        """Returns True if the change of passability of the tile makes the current search invalid"""
+        closed, search = self.closed, self.search
+        if closed[index] == search:
+            return True
+        return not self.blocked[index] and any(closed[neighbor] == search for neighbor in self.neighbors(index))
+
+    def plan_from_goal(self, position, deadline):
+        """
+        Resumable search from the goal to the agent used with a deadline, see the class description.
+        Returns the next move, the move to the free neighbor closest to the goal if the search is interrupted.
+        """
+        if self.queue is None or any(self.invalidates_search(index) for index in self.changed):
+            self.start_search()
+        self.changed = []
+        search, g, stamp, closed, origin, blocked = (self.search, self.g, self.stamp, self.closed, self.origin,
+                                                     self.blocked)
+        rows, cols = self.rows, self.cols
+        directions = list(DIRECTIONS)
+        start = self.index(position)
+        if closed[start] == search:
+            return directions[origin[start]]
+        target_r, target_c = position
+        if position != self.target:
+            # the heuristic leads to the new position of the agent, order the open list by it
+            self.target = position
+            self.queue = [(g[index] + abs(index // cols - target_r) + abs(index % cols - target_c),
+                           abs(index // cols - target_r) + abs(index % cols - target_c), index)
+                          for f, h, index in self.queue if f - h == g[index] and closed[index] != search]
+            heapq.heapify(self.queue)
+        queue = self.queue
+        goal = self.index(self.goal)
+        moves = list(DIRECTIONS.values())
+        first = self.expanded
+        while queue:
+            f, h, index = heapq.heappop(queue)
+            cost = f - h
+            if cost > g[index] or closed[index] == search:
+                # outdated entry, the tile was reached cheaper later
+                continue
+            if (not self.expanded & (DEADLINE_CHECK - 1) and self.expanded - first >= DEADLINE_CHECK
+                    and perf_counter() > deadline):
+                heapq.heappush(queue, (f, h, index))
+                self.interrupted = True
+                return self.closest_move(position)
+            closed[index] = search
+            found = index == start
+            # the agent may stand on a blocked tile when it is reached, blocked tiles cannot be passed
+            if index != goal and blocked[index]:
+                if found:
+                    return directions[origin[index]]
+                continue
+            self.expanded += 1
+            r, c = divmod(index, cols)
+            for i, (move_r, move_c) in enumerate(moves):
+                new_r, new_c = r + move_r, c + move_c
+                if new_r < 0 or new_c < 0 or new_r >= rows or new_c >= cols:
+                    continue
+                neighbor = new_r * cols + new_c
+                if neighbor != start and blocked[neighbor]:
+                    continue
+                if stamp[neighbor] != search or cost + 1 < g[neighbor]:
+                    stamp[neighbor] = search
+                    g[neighbor] = cost + 1
+                    # moving against the direction of the expansion leads back towards the goal
+                    origin[neighbor] = i ^ 1
+                    h = abs(new_r - target_r) + abs(new_c - target_c)
+                    heapq.heappush(queue, (cost + 1 + h, h, neighbor))
+                    # with consistent heuristic and unit costs the agent is reached optimally when first generated
+                    found = found or neighbor == start
+            if found:
+                return directions[origin[start]]
+        return None
+
+
+class DStarLitePlanner(GridPlanner):
+    """
+    D* Lite (optimized version by Koenig and Likhachev) on the 4-connected grid of the agent's map.
+    The search is rooted at the goal, so the values computed in previous steps stay valid while the agent moves
+    and only the tiles whose passability changed have to be repaired.
+    The queue keeps all inconsistent tiles whenever the search stops, so a search interrupted by the deadline
+    simply continues in the next step, meanwhile the agent follows the values computed so far.
+    """
+
+    def __init__(self, maze_size, goal, is_blocked):
+        super().__init__(maze_size, goal, is_blocked)
+        area = self.rows * self.cols
+        self.g = [INFINITY] * area
+        self.rhs = [INFINITY] * area
+        # current key of every queued tile, None if the tile is not in the queue
+        self.queued = [None] * area
+        self.queue = []
+        self.km = 0
+        self.last_position = None
+
+        goal_index = self.index(goal)
+        self.rhs[goal_index] = 0
+        self.push(goal_index, (0, 0))
+
+    def calculate_key(self, index):
+        value = min(self.g[index], self.rhs[index])
+        return value + self.heuristic(index, self.last_position) + self.km, value
+
+    def push(self, index, key):
+        self.queued[index] = key
+        heapq.heappush(self.queue, (key[0], key[1], index))
+
+    def top(self):
+        """Returns (key, index) of the queued tile with the smallest key, skipping outdated entries"""
+        queue, queued = self.queue, self.queued
+        while queue:
+            k1, k2, index = queue[0]
+            if queued[index] == (k1, k2):
+                return (k1, k2), index
+            heapq.heappop(queue)
+        return (INFINITY, INFINITY), None
+
+    def best_rhs(self, index):
+        """Returns the cost of the best route to the goal through one of the neighbors"""
+        best = INFINITY
+        g, blocked = self.g, self.blocked
+        for neighbor in self.neighbors(index):
+            if not blocked[neighbor] and g[neighbor] + 1 < best:
+                best = g[neighbor] + 1
+        return best
+
+    def update_vertex(self, index):
+        if self.g[index] != self.rhs[index]:
+            self.push(index, self.calculate_key(index))
+        else:
+            self.queued[index] = None
+
+    def compute_shortest_path(self, start, deadline=None):
+        """Returns False if the search was interrupted by the deadline before it finished"""
+        g, rhs, queued = self.g, self.rhs, self.queued
+        goal = self.index(self.goal)
+        first = self.expanded
+        while True:
+            key, index = self.top()
+            if index is None or (key >= self.calculate_key(start) and rhs[start] == g[start]):
+                return True
+            if (deadline is not None and not self.expanded & (DEADLINE_CHECK - 1)
+                    and self.expanded - first >= DEADLINE_CHECK and perf_counter() > deadline):
+                return False
+            new_key = self.calculate_key(index)
+            if key < new_key:
+                self.push(index, new_key)
+                continue
+            heapq.heappop(self.queue)
+            queued[index] = None
+            self.expanded += 1
+            if g[index] > rhs[index]:
+                g[index] = rhs[index]
+                if not self.blocked[index]:
+                    for neighbor in self.neighbors(index):
+                        if neighbor != goal and g[index] + 1 < rhs[neighbor]:
+                            rhs[neighbor] = g[index] + 1
+                            self.update_vertex(neighbor)
+            else:
+                g[index] = INFINITY
+                for tile in (index, *self.neighbors(index)):
+                    if tile != goal:
+                        rhs[tile] = self.best_rhs(tile)
+                        self.update_vertex(tile)
+
+    def plan(self, position, deadline=None):
+        """Repairs the search after the changes of the map and returns the next move"""
+        if self.last_position is None:
+            self.last_position = position
+        elif position != self.last_position:
+            self.km += self.heuristic(self.index(position), self.last_position)
+            self.last_position = position
+
+        goal = self.index(self.goal)
+        for index in self.changed:
+            for neighbor in self.neighbors(index):
+                if neighbor != goal:
+                    self.rhs[neighbor] = self.best_rhs(neighbor)
+                    self.update_vertex(neighbor)
+        self.changed = []
+
+        start = self.index(position)
+        if not self.compute_shortest_path(start, deadline):
+            self.interrupted = True
+        elif self.rhs[start] == INFINITY:
+            return None
+
+        best_direction, best_cost = None, INFINITY
+        for direction, move in DIRECTIONS.items():
+            r, c = position[0] + move[0], position[1] + move[1]
+            if 0 <= r < self.rows and 0 <= c < self.cols:
+                index = r * self.cols + c
+                if not self.blocked[index] and self.g[index] + 1 < best_cost:
+                    best_direction, best_cost = direction, self.g[index] + 1
+        # the interrupted search has not reached the agent yet
+        if best_direction is None and self.interrupted:
+            return self.closest_move(position)
+        return best_direction
@@ -0,0 +1,225 @@
+import random
+
+import numpy as np
+
+from cells import Cell
+from maze_keeper import Grid
+
+"""
+Seedable random maze generators working on flat arrays.
+Rooms lie on cells with both coordinates even, the cells between them are walls which get carved
+when the generator connects two neighbouring rooms. Every generator builds a spanning tree of the rooms,
+so the mazes are feasible by construction: start is at (0,0), gold at the bottom-right room.
+Generators return Grid, the generate_* functions return 2-D list layouts and can be used as maze_generator
+of Simulation. When seed is not given, the random module state is used.
+Kruskal's generator is vectorized with NumPy and is the one to use for huge mazes (10k x 10k in about 25 s),
+depth first search and Wilson's algorithm walk the maze one room at a time in pure Python, they are linear
+in the area of the maze but take minutes for 10k x 10k.
+"""
+
+EMPTY = Cell.EMPTY.value
+WALL = Cell.OBSTACLE.value
+GOLD = Cell.GOLD.value
+START = Cell.START.value
+
+
+class RoomMaze:
+    """Flat grid of cells with rooms on even coordinates and helpers to connect the rooms"""
+
+    def __init__(self, maze_size):
+        self.rows, self.cols = maze_size
+        # number of rooms in each direction
+        self.room_rows = (self.rows + 1) // 2
+        self.room_cols = (self.cols + 1) // 2
+        if self.room_rows * self.room_cols < 2:
+            raise Exception('Maze of size {}x{} is too small for a random maze'.format(*maze_size))
+        self.cells = bytearray([WALL]) * (self.rows * self.cols)
+        room_row = bytearray([EMPTY, WALL]) * (self.cols // 2) + bytearray([EMPTY]) * (self.cols % 2)
+        for i in range(self.room_rows):
+            start = 2 * i * self.cols
+            self.cells[start:start + self.cols] = room_row
+
+    def cell(self, room):
+        """Returns index of the cell of the room in the flat cell array"""
+        i, j = divmod(room, self.room_cols)
+        return 2 * i * self.cols + 2 * j
+
+    def connect(self, room, other):
+        """Carves the wall between two neighbouring rooms"""
+        self.cells[(self.cell(room) + self.cell(other)) // 2] = EMPTY
+
+    def neighbors(self, room):
+        """Returns list of rooms next to the given room"""
+        i, j = divmod(room, self.room_cols)
+        neighbors = []
+        if i > 0:
+            neighbors.append(room - self.room_cols)
+        if i < self.room_rows - 1:
+            neighbors.append(room + self.room_cols)
+        if j > 0:
+            neighbors.append(room - 1)
+        if j < self.room_cols - 1:
+            neighbors.append(room + 1)
+        return neighbors
+
+    def grid(self):
+        """Places start and gold and returns the maze as Grid"""
+        self.cells[0] = START
+        self.cells[self.cell(self.room_rows * self.room_cols - 1)] = GOLD
+        return Grid(self.rows, self.cols, self.cells)
+
+
+def dfs_grid(maze_size, seed=None):
+    """
+    Randomized iterative depth first search (recursive backtracker), long winding corridors.
+    Pure Python, about 4 s for 2000 x 2000.
+    """
+    rng = random.Random(seed) if seed is not None else random
+    maze = RoomMaze(maze_size)
+    visited = bytearray(maze.room_rows * maze.room_cols)
+    visited[0] = 1
+    stack = [0]
+    while stack:
+        room = stack[-1]
+        unvisited = [neighbor for neighbor in maze.neighbors(room) if not visited[neighbor]]
+        if not unvisited:
+            stack.pop()
+            continue
+        neighbor = unvisited[int(rng.random() * len(unvisited))]
+        visited[neighbor] = 1
+        maze.connect(room, neighbor)
+        stack.append(neighbor)
+    return maze.grid()
+
+
+def kruskal_grid(maze_size, seed=None):
+    """
+    Randomized Kruskal's algorithm, many short dead ends.
+    Kruskal's algorithm over randomly shuffled edges builds the minimum spanning tree for random distinct weights
+    of the edges. The same tree is built here by Boruvka's algorithm vectorized with NumPy: in every round each
+    component takes its cheapest edge to another component, so the number of components at least halves.
+    10k x 10k maze takes about 25 s and 2.5 GB of memory.
+    """
+    rng = np.random.default_rng(seed if seed is not None else random.getrandbits(64))
+    maze = RoomMaze(maze_size)
+    room_rows, room_cols = maze.room_rows, maze.room_cols
+    rooms = np.arange(room_rows * room_cols, dtype=np.int32).reshape(room_rows, room_cols)
+    # edge from room u to room u + step, east (step 1) and south (step room_cols) edges
+    u = np.concatenate([rooms[:, :-1].ravel(), rooms[:-1, :].ravel()])
+    step = np.concatenate([np.ones(room_rows * (room_cols - 1), dtype=np.int32),
+                           np.full((room_rows - 1) * room_cols, room_cols, dtype=np.int32)])
+    # distinct random weights
+    weights = rng.permutation(u.size).astype(np.int32)
+    # component of every room, components are numbered 0..count-1
+    component = rooms.ravel().copy()
+    count = component.size
+    carved = []
+    while u.size:
+        cu, cv = component[u], component[u + step]
+        inner = cu == cv
+        if inner.any():
+            outer = ~inner
+            u, step, weights, cu, cv = u[outer], step[outer], weights[outer], cu[outer], cv[outer]
+            if not u.size:
+                break
+        cheapest = np.full(count, np.iinfo(np.int32).max, dtype=np.int32)
+        np.minimum.at(cheapest, cu, weights)
+        np.minimum.at(cheapest, cv, weights)
+        own_u, own_v = cheapest[cu] == weights, cheapest[cv] == weights
+        taken = own_u | own_v
+        carved.append((u[taken], step[taken]))
+        # hook every component to the component on the other side of its cheapest edge,
+        # two components sharing the cheapest edge point at each other, the lower one becomes the root
+        labels = np.arange(count, dtype=np.int32)
+        parent = labels.copy()
+        parent[cu[own_u]] = cv[own_u]
+        parent[cv[own_v]] = cu[own_v]
+        roots = (parent[parent] == labels) & (labels < parent)
+        parent[roots] = labels[roots]
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+        renumber = np.cumsum(parent == labels, dtype=np.int32) - 1
+        component = renumber[parent][component]
+        count = int(renumber[-1]) + 1
+
+    cells = np.frombuffer(maze.cells, dtype=np.uint8).reshape(maze.rows, maze.cols)
+    for u, step in carved:
+        i, j = np.divmod(u, room_cols)
+        # with a single column of rooms there are no east edges and south edges have step 1 too
+        east = step == 1 if room_cols > 1 else np.zeros(step.size, dtype=bool)
+        cells[2 * i[east], 2 * j[east] + 1] = EMPTY
+        cells[2 * i[~east] + 1, 2 * j[~east]] = EMPTY
+    del cells
+    return maze.grid()
+
+
+def wilson_grid(maze_size, seed=None):
+    """
+    Wilson's algorithm (loop-erased random walks), uniformly random spanning tree.
+    Pure Python, about 30 s for 2000 x 2000.
+    """
+    rng = random.Random(seed) if seed is not None else random
+    maze = RoomMaze(maze_size)
+    count = maze.room_rows * maze.room_cols
+    in_tree = bytearray(count)
+    in_tree[0] = 1
+    # the room the walk continued to from each room, overwriting it erases the loops
+    following = [0] * count
+    for start in range(1, count):
+        if in_tree[start]:
+            continue
+        room = start
+        while not in_tree[room]:
+            neighbors = maze.neighbors(room)
+            following[room] = neighbors[int(rng.random() * len(neighbors))]
+            room = following[room]
+        room = start
+        while not in_tree[room]:
+            in_tree[room] = 1
+            maze.connect(room, following[room])
+            room = following[room]
+    return maze.grid()
+
+
+GENERATORS = {'dfs': dfs_grid, 'kruskal': kruskal_grid, 'wilson': wilson_grid}
+
+
+def generate_dfs(maze_size, seed=None):
+    return dfs_grid(maze_size, seed).to_layout()
+
+
+def generate_kruskal(maze_size, seed=None):
+    return kruskal_grid(maze_size, seed).to_layout()
+
+
+def generate_wilson(maze_size, seed=None):
+    return wilson_grid(maze_size, seed).to_layout()
+
+
+def write_maze(grid, file):
+    """
+    Streams the maze to a text file row by row, one character per cell as in print_maze
+    ('·' empty, '█' wall, 'S' start, 'G' gold), without building the nested list layout.
+    """
+    characters = {EMPTY: '·', WALL: '█', START: 'S', GOLD: 'G'}
+    table = {code: ord(character) for code, character in characters.items()}
+    for row in grid.iter_rows():
+        file.write(bytes(row).decode('latin-1').translate(table))
+        file.write('\n')
+
+
+if __name__ == '__main__':
+    from maze_generator import print_maze
+    import time
+
+    for name, generator in GENERATORS.items():
+        print_maze(generator((11, 21), seed=42).to_layout())
+        for size in [100, 1000, 2000]:
+            start = time.time()
+            grid = generator((size, size), seed=42)
+            finish = time.time()
+            print('{} {}x{}: {:.3f} s'.format(name, size, size, finish - start))
+        print()
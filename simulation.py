@@ -1,5 +1,6 @@
 import random
 
+from instrumentation import timed_step
 from maze_keeper import MazeKeeper
 from visualization import Visualization
 
@@ -12,31 +13,81 @@ class Simulation:
     """
     Simulation class that controls the main simulation loop and visualization of the agents movement in the maze.
     WARNING: Run this file from console for visualization to work properly.
+    Pass Instrumentation to measure time spent in the phases of every step.
+    The run can be paused after a number of steps and continued later, see checkpoint for saving and forking
+    of paused episodes. vision_table built by build_vision_table can be shared with other episodes of the same maze.
     """
 
-    def __init__(self, maze_size=(30, 50), step_limit=5000, visualize=True, agent=None, maze_generator=None):
+    def __init__(self, maze_size=(30, 50), step_limit=5000, visualize=True, agent=None, maze_generator=None,
+                 instrumentation=None, vision_table=None):
         self.visualize = visualize
+        self.instrumentation = instrumentation
         self.step_limit = step_limit
         self.maze_size = maze_size
+        # number of steps taken so far
+        self.steps = 0
 
         self.layout = maze_generator(maze_size)
 
-        self.maze_keeper = MazeKeeper(self.layout)
+        self.maze_keeper = MazeKeeper(self.layout, vision_table=vision_table)
 
         self.agent = agent(maze_size, step_limit, self.maze_keeper.start_position, self.maze_keeper.gold_position)
 
-    def run(self):
+    def step_bound(self, steps):
+        """Returns the number of steps after which the run stops, pauses after the given number of steps if any"""
+        if steps is None:
+            return self.step_limit
+        return min(self.step_limit, self.steps + steps)
+
+    def run(self, trace=None, steps=None):
+        """
+        Runs the simulation until the agent finishes or reaches the step limit, continues a paused run.
+        :param trace: object with append method receiving positions of the agent after every step,
+                      e.g. trace_file.TraceWriter to stream the positions to a file; a new list by default
+        :param steps: pause the run after this number of steps
+        :return: (trace, layout)
+        """
+        if trace is None:
+            trace = []
+        if self.instrumentation is not None:
+            return self.instrumentation.profile(lambda: self.run_instrumented(trace, steps), self.maze_size)
         observation = self.maze_keeper.observation()
-        step = 0
-        trace = []
-        while not self.maze_keeper.finished and step < self.step_limit:
+        step, bound = self.steps, self.step_bound(steps)
+        while not self.maze_keeper.finished and step < bound:
             step += 1
             action = self.agent.select_action(observation)
             observation = self.maze_keeper.agent_move(action)
             trace.append(observation.position)
+        self.steps = step
 
         return trace, self.maze_keeper.layout
 
+    def run_instrumented(self, trace, steps=None):
+        """Same as run, but records timings of every step to the instrumentation"""
+        instrumentation = self.instrumentation
+        observation = self.maze_keeper.observation()
+        step, bound = self.steps, self.step_bound(steps)
+        while not self.maze_keeper.finished and step < bound:
+            step += 1
+            has_gold = self.maze_keeper.has_gold
+            action, observation, timings = timed_step(self.agent, self.maze_keeper, observation)
+            trace.append(observation.position)
+            if not has_gold and self.maze_keeper.has_gold:
+                instrumentation.gold_step = step
+            instrumentation.record(step, action, observation, timings, has_gold)
+        self.steps = step
+
+        return trace, self.maze_keeper.layout
+
+    def positions(self):
+        """Runs the simulation step by step, yields position of the agent after every step"""
+        observation = self.maze_keeper.observation()
+        while not self.maze_keeper.finished and self.steps < self.step_limit:
+            self.steps += 1
+            action = self.agent.select_action(observation)
+            observation = self.maze_keeper.agent_move(action)
+            yield observation.position
+
     def run_and_display_results(self, speed=0.1):
         trace, layout = self.run()
 
@@ -46,6 +97,8 @@ class Simulation:
         else:
             print('Agent FAILED to bring the gold to the start', end='')
         print(' in {} steps.'.format(len(trace)))
+        if self.instrumentation is not None:
+            print(self.instrumentation.report())
         #input('Press any key to visualize the agents progress.')
         if self.visualize:
             vis = Visualization(layout, speed=speed)
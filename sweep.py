@@ -0,0 +1,151 @@
+import csv
+import os
+import random
+import re
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import Instrumentation
+from maze_cache import MazeCache
+from maze_file import save_maze
+from simulation import Simulation
+from trace_file import TraceWriter
+
+"""
+Runs Simulation over many (size, seed, agent, generator) combinations in a pool of processes.
+Every job seeds the random generator with its own seed, so results do not depend on which worker ran it.
+Agents and maze generators must be picklable, i.e. module level classes and functions or functools.partial of them.
+If a trace directory is given, maze (maze_file) and trace (trace_file) of every job are saved there
+as NAME.maze and NAME.trace, trace_export exports whole such directories.
+If a cache directory is given, mazes are taken from maze_cache keyed by the generator, size and seed of the job,
+so repeated sweeps do not generate and check the same mazes again. The cache generates mazes without touching
+the random generator seeded by the job, so with the cache the agents' random moves are the same whether the maze
+was generated or cached (but they differ from the moves in sweeps without the cache).
+"""
+
+Job = namedtuple('Job', ['size', 'seed', 'agent', 'maze_generator'])
+COLUMNS = ['size', 'seed', 'agent', 'generator', 'success', 'steps', 'wall_time', 'planning_time']
+
+
+def callable_name(obj):
+    """Returns readable name of a class, function or functools.partial"""
+    if hasattr(obj, 'func'):
+        arguments = ','.join('{}={}'.format(key, value) for key, value in obj.keywords.items())
+        return '{}({})'.format(callable_name(obj.func), arguments)
+    return getattr(obj, '__name__', repr(obj))
+
+
+def make_jobs(sizes, seeds, agents, maze_generators):
+    """Returns list of Jobs for all combinations of the given parameters"""
+    return [Job(size, seed, agent, maze_generator)
+            for size in sizes for seed in seeds for agent in agents for maze_generator in maze_generators]
+
+
+def job_name(job):
+    """Returns name of the job usable as a file name"""
+    name = '{}x{}_{}_{}_{}'.format(*job.size, job.seed, callable_name(job.agent), callable_name(job.maze_generator))
+    return re.sub(r'[^\w.=-]+', '_', name).strip('_')
+
+
+# maze caches of the process by their directories, kept between the jobs so their in-memory level is used
+_caches = {}
+
+
+def maze_cache(directory):
+    """Returns MazeCache of the process using the given directory"""
+    if directory not in _caches:
+        _caches[directory] = MazeCache(directory)
+    return _caches[directory]
+
+
+def run_job(job, step_limit=5000, trace_directory=None, cache_directory=None):
+    """
+    Runs a single simulation.
+    :param cache_directory: directory of the maze cache to take the maze from, None generates the maze
+    :return: dictionary with values of COLUMNS, times are in seconds, planning time is spent in agent.select_action
+    """
+    random.seed(job.seed)
+    start = time.perf_counter()
+    maze_generator = job.maze_generator
+    if cache_directory is not None:
+        grid = maze_cache(cache_directory).get(job.maze_generator, job.size, seed=job.seed).grid
+        maze_generator = lambda maze_size: grid
+    instrumentation = Instrumentation()
+    sim = Simulation(maze_size=job.size, step_limit=step_limit, visualize=False, agent=job.agent,
+                     maze_generator=maze_generator, instrumentation=instrumentation)
+    if trace_directory is None:
+        trace, _ = sim.run()
+    else:
+        path = os.path.join(trace_directory, job_name(job))
+        with TraceWriter(path + '.trace', job.size) as trace:
+            sim.run(trace)
+    wall_time = time.perf_counter() - start
+    if trace_directory is not None:
+        save_maze(path + '.maze', sim.layout)
+    summary = instrumentation.summary()
+    return {'size': '{}x{}'.format(*job.size),
+            'seed': job.seed,
+            'agent': callable_name(job.agent),
+            'generator': callable_name(job.maze_generator),
+            'success': sim.maze_keeper.finished,
+            'steps': len(trace),
+            'wall_time': wall_time,
+            'planning_time': sum(phases['select_action']['total'] for phases in summary.values())}
+
+
+def _run_chunk(jobs, step_limit, trace_directory=None, cache_directory=None):
+    return [run_job(job, step_limit, trace_directory, cache_directory) for job in jobs]
+
+
+def sweep(jobs, step_limit=5000, workers=None, chunksize=None, trace_directory=None, cache_directory=None):
+    """
+    Runs all jobs in a pool of worker processes.
+    Jobs are sent to the workers in chunks to amortize the cost of inter-process communication of many small jobs.
+    :param trace_directory: directory to save the mazes and traces of the jobs to, None does not save them
+    :param cache_directory: directory of the maze cache shared by the workers, None generates all mazes
+    :return: list of result dictionaries (see run_job) in the order of jobs
+    """
+    if trace_directory is not None:
+        os.makedirs(trace_directory, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        # a few chunks per worker keep the workers busy even when the jobs take different time
+        chunksize = max(1, len(jobs) // (workers * 4))
+    chunks = [jobs[i:i + chunksize] for i in range(0, len(jobs), chunksize)]
+    results = []
+    if workers == 1:
+        for chunk in chunks:
+            results.extend(_run_chunk(chunk, step_limit, trace_directory, cache_directory))
+        return results
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_results in executor.map(_run_chunk, chunks, [step_limit] * len(chunks),
+                                          [trace_directory] * len(chunks), [cache_directory] * len(chunks)):
+            results.extend(chunk_results)
+    return results
+
+
+def write_table(results, file=sys.stdout):
+    """Writes results of the sweep as CSV table"""
+    writer = csv.DictWriter(file, fieldnames=COLUMNS)
+    writer.writeheader()
+    for row in results:
+        writer.writerow(dict(row, wall_time='{:.6f}'.format(row['wall_time']),
+                             planning_time='{:.6f}'.format(row['planning_time'])))
+
+
+if __name__ == '__main__':
+    from functools import partial
+    from agent import Agent
+    from maze_generator import generate_maze
+
+    sizes = [(i, n) for i in range(5, 71) for n in range(5, 71)]
+    jobs = make_jobs(sizes, seeds=[42], agents=[partial(Agent, planner='dstar')], maze_generators=[generate_maze])
+
+    start = time.time()
+    results = sweep(jobs, step_limit=20000)
+    finish = time.time()
+    write_table(results)
+    print('{} jobs, {} succeeded, {:.2f} s'.format(len(results), sum(row['success'] for row in results),
+                                                    finish - start), file=sys.stderr)
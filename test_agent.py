@@ -0,0 +1,87 @@
+import hashlib
+import json
+import random
+from functools import partial
+
+import pytest
+
+from agent import Agent
+from maze_generator import generate_maze
+from maze_keeper import Observation
+from simulation import Simulation
+
+# lengths and digests of the traces of the BFS agent in generated mazes recorded before the route back to start
+# was rebuilt from the flat arrays, the agent must still take the same steps
+BFS_TRACES = {
+    (5, 5): (34, 'd2862272e14c'),
+    (7, 12): (82, 'ebc60d2cc9de'),
+    (12, 7): (82, '16a976721786'),
+    (10, 10): (116, 'd19a18c7422a'),
+    (20, 20): (408, '11654a8ad860'),
+    (15, 30): (450, 'dbecf799e1e7'),
+}
+
+
+def run(maze_size, agent=Agent, step_limit=1000, maze_generator=generate_maze):
+    random.seed(1)
+    sim = Simulation(maze_size=maze_size, step_limit=step_limit, visualize=False, agent=agent,
+                     maze_generator=maze_generator)
+    trace, _ = sim.run()
+    return sim, trace
+
+
+@pytest.mark.parametrize('maze_size', list(BFS_TRACES))
+def test_bfs_traces_match_baseline(maze_size):
+    sim, trace = run(maze_size)
+    digest = hashlib.md5(json.dumps([list(position) for position in trace]).encode()).hexdigest()[:12]
+    assert (len(trace), digest) == BFS_TRACES[maze_size]
+    assert sim.maze_keeper.finished
+
+
+def test_find_route_is_shortest_route_over_known_tiles():
+    sim, trace = run((20, 20))
+    agent = sim.agent
+    agent.remove_barriers()
+    for position in trace[::25]:
+        agent.agent_position = tuple(position)
+        route = agent.find_route(agent.start_position)
+        assert route is not None and len(route) == len(agent.route_to_start())
+
+
+def test_agent_moves_randomly_when_start_cannot_be_reached():
+    agent = Agent((3, 3), 100, (0, 0), (2, 2))
+    # the agent stands on gold walled in from all sides, no route to start is known
+    action = agent.select_action(Observation(vision={'NORTH': 0, 'SOUTH': 0, 'WEST': 0, 'EAST': 0}, position=(2, 2)))
+    assert agent.gold_found
+    assert action in ('NORTH', 'SOUTH', 'WEST', 'EAST')
+    assert agent.route_back is None
+
+
+@pytest.mark.parametrize('planner', ['bfs', 'astar', 'dstar'])
+def test_agent_returns_to_start(planner):
+    for maze_size in ((9, 9), (15, 22), (30, 17)):
+        sim, trace = run(maze_size, agent=partial(Agent, planner=planner), step_limit=5000)
+        assert sim.maze_keeper.finished
+        assert sim.agent.route_back is not None
+
+
+@pytest.mark.parametrize('planner', ['bfs', 'astar', 'dstar'])
+def test_agent_with_exhausted_time_budget_finishes(planner):
+    # with zero budget every search longer than DEADLINE_CHECK tiles is interrupted, the search must be resumed
+    sim, trace = run((25, 25), agent=partial(Agent, planner=planner, time_budget=0), step_limit=20000)
+    assert sim.maze_keeper.finished
+    assert sim.agent.interruptions > 0
+
+
+def test_no_dead_end_barriers_after_interrupted_search(monkeypatch):
+    checked = []
+    original = Agent.check_for_dead_ends
+
+    def check_for_dead_ends(agent, next_move):
+        checked.append(agent.interrupted)
+        original(agent, next_move)
+
+    monkeypatch.setattr(Agent, 'check_for_dead_ends', check_for_dead_ends)
+    sim, trace = run((25, 25), agent=partial(Agent, time_budget=0), step_limit=20000)
+    assert sim.maze_keeper.finished
+    assert checked and not any(checked)
@@ -0,0 +1,50 @@
+import random
+from functools import partial
+
+import numpy as np
+
+from agent import Agent
+from batch_keeper import ACTION_NAMES, BatchMazeKeeper, BatchSimulation, random_policy
+from maze_generator import generate_maze, generate_random_feasible
+from maze_keeper import MazeKeeper
+from simulation import Simulation
+
+
+def test_batch_matches_maze_keepers():
+    random.seed(6)
+    layouts = [generate_random_feasible((12, 14)) for _ in range(10)]
+    batch = BatchMazeKeeper(layouts)
+    keepers = [MazeKeeper(layout) for layout in layouts]
+    rng = np.random.default_rng(1)
+    for _ in range(300):
+        actions = rng.integers(len(ACTION_NAMES), size=len(layouts))
+        observation = batch.agent_move(actions)
+        for episode, keeper in enumerate(keepers):
+            if not keeper.finished:
+                expected = keeper.agent_move(ACTION_NAMES[actions[episode]])
+                assert observation[episode].position == expected.position
+                assert observation[episode].vision == expected.vision
+            assert batch.finished[episode] == keeper.finished
+            assert batch.has_gold[episode] == keeper.has_gold
+
+
+def test_shared_layout_accepts_action_names():
+    batch = BatchMazeKeeper(generate_maze((9, 9)), count=3)
+    observation = batch.agent_move(['SOUTH', 'EAST', 'NORTH'])
+    assert len(observation) == 3
+    assert observation.position.shape == (3, 2)
+
+
+def test_batch_of_agents_matches_simulations():
+    agent = partial(Agent, planner='dstar')
+    finished, steps = BatchSimulation(maze_size=(15, 15), episodes=5, step_limit=2000, maze_generator=generate_maze,
+                                      agent=agent).run()
+    trace, _ = Simulation((15, 15), 2000, False, agent, generate_maze).run()
+    assert finished.all()
+    assert (steps == len(trace)).all()
+
+
+def test_random_policy_is_seedable():
+    results = [BatchSimulation(maze_size=(10, 10), episodes=50, step_limit=300, maze_generator=generate_maze,
+                               policy=random_policy(4)).run()[1] for _ in range(2)]
+    assert (results[0] == results[1]).all()
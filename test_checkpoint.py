@@ -0,0 +1,112 @@
+import random
+from functools import partial
+
+import pytest
+
+from agent import Agent
+from checkpoint import VERSION, Checkpoint, checkpoint, fork, restore
+from maze_generator import generate_maze, generate_random_feasible
+from multi_keeper import CoordinatedAgent
+from simulation import Simulation
+
+
+def simulation(planner, layout, maze_size, time_budget=None):
+    return Simulation(maze_size=maze_size, step_limit=20000, visualize=False,
+                      agent=partial(Agent, planner=planner, time_budget=time_budget),
+                      maze_generator=lambda size: layout)
+
+
+@pytest.mark.parametrize('generator', [generate_maze, generate_random_feasible])
+@pytest.mark.parametrize('planner', ['bfs', 'astar', 'dstar'])
+def test_restored_episodes_reproduce_the_full_trace(planner, generator):
+    random.seed(7)
+    layout = generator((25, 31))
+    state = random.getstate()
+    full, _ = simulation(planner, layout, (25, 31)).run()
+
+    random.setstate(state)
+    sim = simulation(planner, layout, (25, 31))
+    trace = []
+    pauses = 0
+    while not sim.maze_keeper.finished and sim.steps < sim.step_limit:
+        sim.run(trace, steps=37 + pauses * 13 % 50)
+        pauses += 1
+        # every pause goes through the bytes of the checkpoint
+        sim = restore(checkpoint(sim))
+    assert trace == full
+    assert pauses > 1
+
+
+@pytest.mark.parametrize('planner', ['bfs', 'astar', 'dstar'])
+def test_forks_continue_like_the_original(planner):
+    random.seed(8)
+    layout = generate_maze((31, 25))
+    sim = simulation(planner, layout, (31, 25))
+    sim.run(steps=100)
+    state = random.getstate()
+    forked = fork(sim)
+    assert forked.maze_keeper._vision_table is sim.maze_keeper._vision_table
+    trace, _ = sim.run()
+    random.setstate(state)
+    forked_trace, _ = forked.run()
+    assert forked_trace == trace
+    assert forked.steps == sim.steps
+
+
+@pytest.mark.parametrize('planner', ['bfs', 'astar', 'dstar'])
+def test_interrupted_searches_continue_after_restoring(planner):
+    # with no time at all every search is interrupted after the same number of expansions, so runs repeat exactly
+    random.seed(10)
+    layout = generate_maze((41, 41))
+    state = random.getstate()
+    full, _ = simulation(planner, layout, (41, 41), time_budget=0).run()
+
+    random.setstate(state)
+    sim = simulation(planner, layout, (41, 41), time_budget=0)
+    trace = []
+    while not sim.maze_keeper.finished and sim.steps < sim.step_limit:
+        sim.run(trace, steps=5)
+        interruptions = sim.agent.interruptions + (sim.agent.planner.interruptions if sim.agent.planner else 0)
+        if sim.steps % 2:
+            sim = fork(sim, include_random=True)
+        else:
+            sim = restore(checkpoint(sim))
+        assert sim.agent.time_budget == 0
+        assert sim.agent.interruptions + (sim.agent.planner.interruptions if sim.agent.planner else 0) == interruptions
+    assert trace == full
+    assert interruptions > 0
+
+
+def test_checkpoint_keeps_the_route_back():
+    random.seed(9)
+    sim = simulation('dstar', generate_maze((15, 21)), (15, 21))
+    while not sim.agent.gold_found:
+        sim.run(steps=1)
+    sim.run(steps=3)
+    restored = Checkpoint.from_bytes(checkpoint(sim)).restore()
+    assert restored.agent.route_back == sim.agent.route_back
+    assert restored.agent.steps_back_taken == sim.agent.steps_back_taken
+    assert restored.maze_keeper.has_gold
+
+
+def test_other_data_are_rejected():
+    with pytest.raises(Exception, match='version {}'.format(VERSION)):
+        Checkpoint.from_bytes(b'MZTR' + bytes(64))
+
+
+@pytest.mark.parametrize('planner', ['bfs', 'dstar'])
+def test_forks_keep_the_class_of_the_agent(planner):
+    random.seed(11)
+    layout = generate_maze((21, 21))
+    sim = Simulation(maze_size=(21, 21), step_limit=20000, visualize=False,
+                     agent=partial(CoordinatedAgent, planner=planner), maze_generator=lambda size: layout)
+    sim.run(steps=50)
+    state = random.getstate()
+    forked = fork(sim)
+    assert type(forked.agent) is CoordinatedAgent
+    trace, _ = sim.run()
+    random.setstate(state)
+    forked_trace, _ = forked.run()
+    assert forked_trace == trace
+    assert type(restore(checkpoint(sim)).agent) is Agent
+    assert type(restore(checkpoint(sim), agent=CoordinatedAgent).agent) is CoordinatedAgent
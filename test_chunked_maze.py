@@ -0,0 +1,51 @@
+from collections import deque
+
+from chunked_maze import WALL, ChunkedMaze
+from maze_keeper import ACTIONS, Grid, MazeKeeper
+
+
+def reachable(maze):
+    """Returns number of cells reachable from the start and number of all cells which are not walls"""
+    seen = {maze.start_position}
+    queue = deque(seen)
+    while queue:
+        r, c = queue.popleft()
+        for move_r, move_c in ACTIONS.values():
+            position = (r + move_r, c + move_c)
+            if position not in seen and maze.is_movable(position):
+                seen.add(position)
+                queue.append(position)
+    return len(seen), sum(code != WALL for row in maze.iter_rows() for code in row)
+
+
+def test_maze_is_connected():
+    for rows, cols, chunk_size in ((37, 53, 8), (64, 64, 16), (11, 120, 10), (1, 9, 4)):
+        maze = ChunkedMaze(rows, cols, seed=3, chunk_size=chunk_size)
+        count, cells = reachable(maze)
+        assert count == cells
+        assert maze.gold_position in [(r, c) for r in range(rows) for c in range(cols) if maze.cell((r, c)) == 2]
+
+
+def test_evicted_chunks_are_generated_again_the_same():
+    cached = ChunkedMaze(90, 90, seed=5, chunk_size=10)
+    evicting = ChunkedMaze(90, 90, seed=5, chunk_size=10, max_bytes=200)
+    assert list(evicting.iter_rows()) == list(cached.iter_rows())
+    assert evicting.evictions > 0
+    assert len(evicting.chunks) <= 2
+
+
+def test_keeper_loads_only_chunks_around_the_agent():
+    maze = ChunkedMaze(100000, 100000, seed=1, max_bytes=1 << 16)
+    keeper = MazeKeeper(maze)
+    assert keeper._vision_table is None
+    for action in ('SOUTH', 'EAST') * 50:
+        keeper.agent_move(action)
+    assert maze.misses <= 4
+
+
+def test_keeper_layout_of_chunked_maze():
+    maze = ChunkedMaze(21, 35, seed=2, chunk_size=8)
+    layout = MazeKeeper(maze).layout
+    assert len(layout) == 21 and all(len(row) == 35 for row in layout)
+    assert layout[0][0] == 'START' and layout[20][34] == 'GOLD'
+    assert Grid.from_layout(layout).cells == bytearray(b''.join(maze.iter_rows()))
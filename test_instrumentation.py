@@ -0,0 +1,70 @@
+import random
+from itertools import count
+
+from agent import Agent
+from instrumentation import Instrumentation, LatencyHistogram, STAGES, timed_step
+from maze_generator import generate_maze
+from simulation import Simulation
+
+
+def test_percentiles_are_accurate():
+    histogram = LatencyHistogram()
+    latencies = [i * 1e-6 for i in range(1, 1001)]
+    random.Random(3).shuffle(latencies)
+    for seconds in latencies:
+        histogram.add(seconds)
+    summary = histogram.summary()
+    assert summary['count'] == 1000 and summary['max'] == 1e-3
+    bound = 1 / 2 ** (LatencyHistogram.SIGNIFICANT_BITS - 1)
+    assert (1 - bound) * 500e-6 <= summary['p50'] <= 500e-6
+    assert (1 - bound) * 990e-6 <= summary['p99'] <= 990e-6
+    assert LatencyHistogram().percentile(50) == 0.0
+
+
+def test_rounding_error_is_bounded():
+    bound = 1 / 2 ** (LatencyHistogram.SIGNIFICANT_BITS - 1)
+    assert bound < 0.0325
+    rng = random.Random(4)
+    # the first bucket of every power of two is the widest one relative to its values,
+    # its last value is rounded down the most
+    nanoseconds = [((2 ** (LatencyHistogram.SIGNIFICANT_BITS - 1) + 1) << shift) - 1 for shift in range(1, 30)]
+    nanoseconds += [int(10 ** rng.uniform(1, 9)) for _ in range(2000)]
+    worst = 0.0
+    for value in nanoseconds:
+        histogram = LatencyHistogram()
+        histogram.add(value / 1e9)
+        recorded = histogram.percentile(50) * 1e9
+        assert recorded <= value
+        worst = max(worst, (value - recorded) / value)
+    assert bound / 2 < worst <= bound
+
+
+def test_instrumented_run_is_same_as_plain_run():
+    calls = []
+    random.seed(5)
+    plain, _ = Simulation((15, 15), 2000, False, Agent, generate_maze).run()
+    instrumentation = Instrumentation(callbacks=[lambda *args: calls.append(args[0])], time_budget=0.0)
+    random.seed(5)
+    trace, _ = Simulation((15, 15), 2000, False, Agent, generate_maze, instrumentation=instrumentation).run()
+    assert trace == plain
+    assert calls == list(range(1, len(trace) + 1))
+    budget = instrumentation.budget_summary()
+    assert sum(steps for _, steps in budget.values()) == len(trace)
+    assert all(over == steps for over, steps in budget.values())
+    assert 0 < instrumentation.gold_step < len(trace)
+    report = instrumentation.report()
+    assert all(stage in report for stage in STAGES) and 'over the budget' in report
+
+
+def test_timed_step_uses_clock():
+    class Keeper:
+        def agent_move(self, action):
+            return 'observation'
+
+    class Policy:
+        def select_action(self, observation):
+            return 'NORTH'
+
+    clock = count()
+    assert timed_step(Policy(), Keeper(), None, clock=lambda: next(clock)) == \
+        ('NORTH', 'observation', {'select_action': 1, 'agent_move': 1})
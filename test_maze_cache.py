@@ -0,0 +1,41 @@
+import random
+
+from maze_cache import CachedMaze, MazeCache, cached
+from maze_generator import generate_maze, generate_random_feasible
+from maze_keeper import Grid
+
+
+def test_seeded_mazes_are_cached_in_memory_and_on_disk(tmp_path):
+    cache = MazeCache(directory=str(tmp_path))
+    first = cache.get(generate_random_feasible, (15, 17), seed=5)
+    assert cache.get(generate_random_feasible, (15, 17), seed=5) is first
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert len(list(tmp_path.glob('*.maze'))) == 1
+
+    other = MazeCache(directory=str(tmp_path))
+    entry = other.get(generate_random_feasible, (15, 17), seed=5)
+    assert other.disk_hits == 1
+    assert entry.grid.cells == first.grid.cells and entry.feasible == first.feasible
+
+
+def test_unseeded_mazes_are_not_cached(tmp_path):
+    cache = MazeCache(directory=str(tmp_path))
+    random.seed(1)
+    first = cache.get(generate_random_feasible, (15, 17))
+    second = cache.get(generate_random_feasible, (15, 17))
+    assert first.grid.cells != second.grid.cells
+    assert cache.hits == 0 and cache.misses == 2
+    assert not list(tmp_path.glob('*.maze'))
+
+
+def test_cached_generator_returns_layout(tmp_path):
+    generator = cached(generate_maze, MazeCache(directory=None), seed=0)
+    assert generator((11, 13)) == generate_maze((11, 13))
+
+
+def test_entry_round_trip():
+    grid = Grid.from_layout(generate_maze((9, 12)))
+    entry = CachedMaze.from_result(grid)
+    copy = CachedMaze.from_bytes(entry.to_bytes())
+    assert copy.grid.cells == grid.cells
+    assert (copy.feasible, copy.start_position, copy.gold_position) == (True, (0, 0), entry.gold_position)
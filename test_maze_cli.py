@@ -0,0 +1,51 @@
+import argparse
+
+import pytest
+
+import maze_cli
+
+
+def test_maze_size():
+    assert maze_cli.maze_size('30x50') == (30, 50)
+    assert maze_cli.maze_size('7') == (7, 7)
+    with pytest.raises(argparse.ArgumentTypeError):
+        maze_cli.maze_size('0x5')
+
+
+def test_run_finishes(capsys):
+    assert maze_cli.main(['run', '--size', '15x15', '--planner', 'dstar']) == 0
+    assert capsys.readouterr().out.startswith('SUCCESS')
+
+
+def test_run_reports_infeasible_generator(monkeypatch, capsys):
+    monkeypatch.setattr(maze_cli, 'generator', lambda name: lambda maze_size: None)
+    assert maze_cli.main(['run', '--size', '10x10']) == 1
+    assert 'did not return a feasible maze' in capsys.readouterr().err
+
+
+def test_run_reports_failing_generator(capsys):
+    assert maze_cli.main(['run', '--size', '3x3']) == 1
+    assert 'cannot be generated' in capsys.readouterr().err
+
+
+def test_run_reports_missing_maze_file(tmp_path, capsys):
+    assert maze_cli.main(['run', '--maze', str(tmp_path / 'missing.maze')]) == 1
+    assert 'cannot be loaded' in capsys.readouterr().err
+
+
+def test_run_reports_maze_without_gold(tmp_path, capsys):
+    path = tmp_path / 'maze.txt'
+    path.write_text('S··\n···\n', encoding='utf-8')
+    assert maze_cli.main(['run', '--maze', str(path)]) == 1
+    assert 'cannot be started' in capsys.readouterr().err
+
+
+def test_sweep_uses_maze_cache(tmp_path, capsys):
+    arguments = ['sweep', '--sizes', '9x11', '--seeds', '1', '2', '--workers', '1',
+                 '--maze-cache', str(tmp_path)]
+    assert maze_cli.main(arguments) == 0
+    first = capsys.readouterr().out
+    assert len(list(tmp_path.glob('*.maze'))) == 2
+    assert maze_cli.main(arguments) == 0
+    assert [row.split(',')[:6] for row in capsys.readouterr().out.splitlines()] == \
+        [row.split(',')[:6] for row in first.splitlines()]
@@ -0,0 +1,62 @@
+import random
+
+from maze_file import PackedGrid, load_maze, pack_cells, save_maze
+from maze_generator import generate_maze, generate_random
+from maze_keeper import ACTIONS, Grid, MazeKeeper
+
+
+def random_layout(rng):
+    random.seed(rng.random())
+    return generate_random((rng.randint(1, 40), rng.randint(1, 40)))
+
+
+def test_packed_grid_agrees_with_grid(tmp_path):
+    rng = random.Random(0)
+    path = str(tmp_path / 'maze.maze')
+    for _ in range(200):
+        layout = random_layout(rng)
+        grid = Grid.from_layout(layout)
+        save_maze(path, layout)
+        packed = load_maze(path)
+        try:
+            assert (packed.rows, packed.cols) == (grid.rows, grid.cols)
+            assert list(packed.iter_rows()) == list(grid.iter_rows())
+            assert [packed.cells[i] for i in range(len(grid.cells))] == list(grid.cells)
+            assert packed.unique('START') == grid.unique('START')
+            assert packed.unique('GOLD') == grid.unique('GOLD')
+            assert packed.to_layout() == layout
+        finally:
+            packed.close()
+
+
+def test_pack_cells_packs_four_cells_per_byte():
+    assert pack_cells(bytes([1, 2, 3, 0, 1])) == bytes([1 | 2 << 2 | 3 << 4, 1])
+
+
+def test_keeper_walks_vision_of_packed_grid(tmp_path):
+    layout = generate_maze((21, 25))
+    path = str(tmp_path / 'maze.maze')
+    save_maze(path, layout)
+    packed = load_maze(path)
+    keeper = MazeKeeper(packed)
+    assert keeper._vision_table is None
+    reference = MazeKeeper(layout)
+    rng = random.Random(2)
+    for _ in range(300):
+        action = rng.choice(list(ACTIONS))
+        observation, expected = keeper.agent_move(action), reference.agent_move(action)
+        assert (observation.position, observation.vision) == (expected.position, expected.vision)
+    packed.close()
+
+
+def test_truncated_data_is_rejected(tmp_path):
+    path = str(tmp_path / 'maze.maze')
+    save_maze(path, generate_maze((20, 20)))
+    with open(path, 'rb') as file:
+        data = file.read()
+    try:
+        PackedGrid(data[:-1])
+    except Exception as error:
+        assert 'truncated' in str(error)
+    else:
+        raise AssertionError('truncated maze was accepted')
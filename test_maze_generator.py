@@ -0,0 +1,35 @@
+import random
+
+import maze_generator
+from maze_generator import feasible_batch, generate_maze, generate_random, generate_random_feasible, is_feasible
+
+
+def test_cell_constants_are_names_of_layout_cells():
+    layout = generate_maze((12, 17))
+    names = {maze_generator.EMPTY, maze_generator.WALL, maze_generator.GOLD, maze_generator.START}
+    assert {cell for row in layout for cell in row} == names
+    assert layout[0][0] == maze_generator.START
+
+
+def test_generated_mazes_are_feasible():
+    for rows in range(5, 71, 7):
+        for cols in range(5, 71, 9):
+            layout = generate_maze((rows, cols))
+            assert len(layout) == rows and len(layout[0]) == cols
+            assert is_feasible(layout)
+
+
+def test_feasible_batch_agrees_with_is_feasible():
+    random.seed(7)
+    layouts = [generate_random((random.randint(1, 30), random.randint(1, 30))) for _ in range(300)]
+    # identical candidates are checked once and must get the same answer
+    layouts += layouts[:20]
+    expected = [is_feasible(layout) for layout in layouts]
+    assert feasible_batch(layouts) == expected
+    assert any(expected) and not all(expected)
+
+
+def test_generate_random_feasible():
+    random.seed(3)
+    layout = generate_random_feasible((25, 25))
+    assert layout is not None and is_feasible(layout)
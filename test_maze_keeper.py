@@ -0,0 +1,43 @@
+import random
+
+from maze_generator import generate_maze
+from maze_keeper import ACTIONS, Grid, MazeKeeper
+from simulation import Simulation
+from agent import Agent
+
+
+def test_grid_round_trip():
+    layout = generate_maze((15, 21))
+    grid = Grid.from_layout(layout)
+    assert grid.to_layout() == layout
+    assert grid.unique('START') == (0, 0)
+    assert not grid.is_movable((-1, 0))
+    assert not grid.is_movable((15, 0))
+
+
+def test_layout_of_keeper_created_from_grid_is_list():
+    layout = generate_maze((15, 21))
+    keeper = MazeKeeper(Grid.from_layout(layout))
+    assert keeper.layout == layout
+    assert keeper.layout is keeper.layout
+
+
+def test_simulation_returns_list_layout_for_grid_generator():
+    layout = generate_maze((11, 13))
+    sim = Simulation(maze_size=(11, 13), step_limit=1000, visualize=False, agent=Agent,
+                     maze_generator=lambda maze_size: Grid.from_layout(layout))
+    trace, returned = sim.run()
+    assert returned == layout
+    assert sim.maze_keeper.finished
+
+
+def test_precomputed_vision_matches_walked_vision():
+    layout = generate_maze((17, 23))
+    precomputed = MazeKeeper(layout)
+    walked = MazeKeeper(layout, precompute_vision=False)
+    rng = random.Random(1)
+    for _ in range(500):
+        action = rng.choice(list(ACTIONS))
+        first, second = precomputed.agent_move(action), walked.agent_move(action)
+        assert first.position == second.position
+        assert first.vision == second.vision
@@ -0,0 +1,52 @@
+import asyncio
+import io
+from functools import partial
+
+import pytest
+
+from agent import Agent
+from maze_generator import generate_maze
+from maze_server import EpisodeServer, MessageProtocol, connect, run_clients
+from simulation import Simulation
+
+
+async def with_server(client):
+    server = EpisodeServer(generate_maze, log=io.StringIO())
+    await server.start(port=0)
+    try:
+        return await client(*server.address)
+    finally:
+        server.close()
+
+
+def test_message_protocol_is_abstract():
+    with pytest.raises(TypeError):
+        MessageProtocol()
+
+
+def test_remote_episode_matches_simulation():
+    agent = partial(Agent, planner='dstar')
+    result = asyncio.run(with_server(lambda host, port: run_clients(agent, (20, 20), 1, 5000, 1, host, port)))
+    trace, _ = Simulation((20, 20), 5000, False, agent, generate_maze).run()
+    assert result['finished'] == 1
+    assert result['steps'] == len(trace)
+
+
+def test_concurrent_episodes_finish():
+    agent = partial(Agent, planner='dstar')
+    result = asyncio.run(with_server(lambda host, port: run_clients(agent, (15, 15), 40, 5000, 3, host, port)))
+    assert result['episodes'] == result['finished'] == 40
+
+
+def test_errors_are_reported_to_the_client():
+    async def client(host, port):
+        connection = await connect(host, port)
+        with pytest.raises(Exception, match='cannot be generated'):
+            await connection.new_episode((2, 2))
+        episode = await connection.new_episode((10, 10))
+        connection.close_episode(episode)
+        with pytest.raises(Exception, match='does not exist'):
+            await connection.step(episode, 'NORTH')
+        connection.close()
+
+    asyncio.run(with_server(client))
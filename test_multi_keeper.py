@@ -0,0 +1,68 @@
+import random
+from functools import partial
+
+import pytest
+
+from agent import Agent
+from maze_generator import generate_maze, generate_random_feasible
+from maze_keeper import Grid, MazeKeeper, MazeKeeperBase
+from multi_keeper import BLOCKING_RULES, CoordinatedAgent, MultiAgentKeeper, MultiAgentSimulation
+
+
+def test_single_agent_matches_maze_keeper():
+    layout = generate_maze((13, 17))
+    keeper = MultiAgentKeeper(Grid.from_layout(layout), 1)
+    reference = MazeKeeper(layout)
+    rng = random.Random(4)
+    for _ in range(200):
+        action = rng.choice(['NORTH', 'SOUTH', 'WEST', 'EAST'])
+        observation, = keeper.step([action])
+        expected = reference.agent_move(action)
+        assert (observation.position, observation.vision) == (expected.position, expected.vision)
+        assert bool(keeper.has_gold[0]) == reference.has_gold
+
+
+def test_occupied_cells_block_agents():
+    layout = [['START', 'EMPTY', 'EMPTY', 'GOLD']]
+    keeper = MultiAgentKeeper(layout, 2, blocking='occupied')
+    first, second = keeper.step(['EAST', 'EAST'])
+    assert first.position == (0, 1)
+    assert second.position == (0, 0)
+
+
+def test_agent_keeps_no_multi_agent_state():
+    agent = Agent((5, 5), 100, (0, 0), (4, 4))
+    assert not hasattr(agent, 'expected_position')
+
+
+@pytest.mark.parametrize('blocking', BLOCKING_RULES)
+@pytest.mark.parametrize('planner', ['bfs', 'dstar'])
+def test_coordinated_agents_finish(blocking, planner):
+    random.seed(1)
+    sim = MultiAgentSimulation(maze_size=(20, 20), count=8, step_limit=3000,
+                               agent=partial(CoordinatedAgent, planner=planner),
+                               maze_generator=generate_random_feasible, blocking=blocking)
+    finished, steps = sim.run()
+    assert all(finished)
+
+
+def test_observations_are_arrays_indexed_by_agent():
+    layout = generate_maze((11, 15))
+    keeper = MultiAgentKeeper(layout, 3)
+    reference = MazeKeeper(layout)
+    observations = keeper.step(['SOUTH', 'EAST', None])
+    assert observations.position.shape == (3, 2) and observations.vision.shape == (3, 4)
+    for agent, action in enumerate(['SOUTH', 'EAST', None]):
+        reference.agent_position = reference.start_position
+        expected = reference.agent_move(action) if action else reference.observation()
+        assert observations[agent].position == expected.position
+        assert observations[agent].vision == expected.vision
+
+
+def test_keeper_shares_the_maze_setup():
+    grid = Grid.from_layout(generate_maze((9, 9)))
+    reference = MazeKeeper(grid)
+    keeper = MultiAgentKeeper(grid, 2, vision_table=reference._vision_table)
+    assert isinstance(keeper, MazeKeeperBase)
+    assert keeper._vision_table is reference._vision_table
+    assert keeper.layout == grid.to_layout()
@@ -0,0 +1,86 @@
+import random
+from collections import deque
+
+import pytest
+
+from agent import DIRECTIONS as AGENT_DIRECTIONS
+from planner import DIRECTIONS, AStarPlanner, DStarLitePlanner, GridPlanner, closest_move
+
+
+def random_blocked(rng, rows, cols):
+    return {(r, c) for r in range(rows) for c in range(cols) if rng.random() < 0.3} - {(0, 0), (rows - 1, cols - 1)}
+
+
+def distance(blocked, size, start, goal):
+    """Length of the shortest route by BFS, None if there is none"""
+    distances = {start: 0}
+    queue = deque([start])
+    while queue:
+        r, c = queue.popleft()
+        if (r, c) == goal:
+            return distances[goal]
+        for move_r, move_c in DIRECTIONS.values():
+            tile = (r + move_r, c + move_c)
+            if (0 <= tile[0] < size[0] and 0 <= tile[1] < size[1] and tile not in blocked
+                    and tile not in distances):
+                distances[tile] = distances[(r, c)] + 1
+                queue.append(tile)
+    return None
+
+
+def test_grid_planner_is_abstract():
+    with pytest.raises(TypeError):
+        GridPlanner((3, 3), (2, 2), lambda position: False)
+
+
+@pytest.mark.parametrize('deadline', [None, float('inf')])
+@pytest.mark.parametrize('planner_class', [AStarPlanner, DStarLitePlanner])
+def test_planners_follow_shortest_routes(planner_class, deadline):
+    rng = random.Random(11)
+    for _ in range(30):
+        size = (rng.randint(2, 15), rng.randint(2, 15))
+        goal = (size[0] - 1, size[1] - 1)
+        blocked = random_blocked(rng, *size)
+        planner = planner_class(size, goal, lambda position: position in blocked)
+        planner.update((r, c) for r in range(size[0]) for c in range(size[1]))
+        expected = distance(blocked, size, (0, 0), goal)
+        position, steps = (0, 0), 0
+        while position != goal:
+            action = planner.next_action(position, deadline)
+            if action is None:
+                break
+            move = DIRECTIONS[action]
+            position = (position[0] + move[0], position[1] + move[1])
+            assert position not in blocked
+            steps += 1
+        assert (steps if position == goal else None) == expected
+        assert not planner.interruptions
+
+
+def test_interrupted_search_from_goal_is_resumed():
+    size, goal = (40, 40), (39, 39)
+    planner = AStarPlanner(size, goal, lambda position: False)
+    planner.update((r, c) for r in range(size[0]) for c in range(size[1]))
+    position, steps = (0, 0), 0
+    while position != goal:
+        # the deadline has always passed, only DEADLINE_CHECK tiles are expanded every step
+        move = DIRECTIONS[planner.next_action(position, 0)]
+        position = (position[0] + move[0], position[1] + move[1])
+        steps += 1
+    assert steps == 78
+    assert planner.interruptions > 0
+    # the search reached the agent and the rest of the route needs no expansions
+    assert planner.step_expansions[-1] == 0
+
+
+def test_agent_and_planners_share_the_directions():
+    assert AGENT_DIRECTIONS is DIRECTIONS
+
+
+def test_closest_move():
+    blocked = bytearray(9)
+    assert closest_move((1, 1), (2, 2), (3, 3), blocked.__getitem__) == 'SOUTH'
+    blocked[7] = 1
+    assert closest_move((1, 1), (2, 2), (3, 3), blocked.__getitem__) == 'EAST'
+    blocked[1] = blocked[3] = blocked[5] = 1
+    assert closest_move((1, 1), (2, 2), (3, 3), blocked.__getitem__) is None
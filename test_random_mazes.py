@@ -0,0 +1,34 @@
+import io
+
+import pytest
+
+from maze_generator import is_grid_feasible
+from random_mazes import GENERATORS, write_maze
+
+SIZES = [(3, 3), (2, 7), (9, 1), (11, 21), (40, 41)]
+
+
+@pytest.mark.parametrize('name', sorted(GENERATORS))
+@pytest.mark.parametrize('size', SIZES)
+def test_generated_maze_is_spanning_tree_of_rooms(name, size):
+    grid = GENERATORS[name](size, seed=7)
+    rooms = ((size[0] + 1) // 2) * ((size[1] + 1) // 2)
+    # rooms and the rooms - 1 carved walls between them
+    assert sum(1 for code in grid.cells if code != 1) == 2 * rooms - 1
+    assert is_grid_feasible(grid)
+
+
+@pytest.mark.parametrize('name', sorted(GENERATORS))
+def test_generators_are_seedable(name):
+    generator = GENERATORS[name]
+    assert generator((21, 31), seed=3).cells == generator((21, 31), seed=3).cells
+    assert generator((21, 31), seed=3).cells != generator((21, 31), seed=4).cells
+
+
+def test_write_maze_writes_one_character_per_cell():
+    grid = GENERATORS['dfs']((5, 7), seed=1)
+    file = io.StringIO()
+    write_maze(grid, file)
+    lines = file.getvalue().splitlines()
+    assert len(lines) == 5 and all(len(line) == 7 for line in lines)
+    assert lines[0][0] == 'S' and lines[4][6] == 'G'
@@ -0,0 +1,61 @@
+import csv
+import io
+from functools import partial
+
+from agent import Agent
+from maze_generator import generate_maze
+from sweep import COLUMNS, job_name, make_jobs, maze_cache, run_job, sweep, write_table
+
+
+def make_test_jobs():
+    agents = [partial(Agent, planner='bfs'), partial(Agent, planner='dstar')]
+    return make_jobs([(9, 9), (11, 15)], [1, 2], agents, [generate_maze])
+
+
+def test_make_jobs_covers_all_combinations():
+    jobs = make_test_jobs()
+    assert len(jobs) == 8
+    assert len({job_name(job) for job in jobs}) == 8
+
+
+def test_sweep_keeps_order_of_jobs():
+    jobs = make_test_jobs()
+    expected = [run_job(job, step_limit=2000) for job in jobs]
+    for workers in (1, 2):
+        results = sweep(jobs, step_limit=2000, workers=workers, chunksize=3)
+        assert [(row['agent'], row['size'], row['seed'], row['steps']) for row in results] == \
+               [(row['agent'], row['size'], row['seed'], row['steps']) for row in expected]
+    assert all(row['success'] for row in expected)
+
+
+def test_traces_are_saved(tmp_path):
+    jobs = make_test_jobs()[:2]
+    sweep(jobs, step_limit=2000, workers=1, trace_directory=str(tmp_path))
+    names = sorted(path.name for path in tmp_path.iterdir())
+    assert names == sorted(job_name(job) + extension for job in jobs for extension in ('.maze', '.trace'))
+
+
+def test_write_table():
+    results = [run_job(job, step_limit=2000) for job in make_test_jobs()[:3]]
+    file = io.StringIO()
+    write_table(results, file)
+    rows = list(csv.DictReader(io.StringIO(file.getvalue())))
+    assert list(rows[0]) == COLUMNS
+    assert [int(row['steps']) for row in rows] == [row['steps'] for row in results]
+
+
+def test_repeated_sweep_takes_mazes_from_the_cache(tmp_path):
+    jobs = make_test_jobs()
+    directory = str(tmp_path / 'cache')
+    first = sweep(jobs, step_limit=2000, workers=1, cache_directory=directory)
+    cache = maze_cache(directory)
+    # the two agents of every size and seed share one maze
+    assert (cache.misses, cache.hits) == (4, 4)
+    assert len(list((tmp_path / 'cache').glob('*.maze'))) == 4
+    second = sweep(jobs, step_limit=2000, workers=1, cache_directory=directory)
+    assert (cache.misses, cache.hits) == (4, 12)
+    assert [row['steps'] for row in second] == [row['steps'] for row in first]
+    assert all(row['success'] for row in second)
+    # workers of other processes find the mazes on disk
+    assert [row['steps'] for row in sweep(jobs, step_limit=2000, workers=2, cache_directory=directory)] == \
+        [row['steps'] for row in first]
@@ -0,0 +1,159 @@
+import json
+import random
+import struct
+import zlib
+from functools import partial
+
+import pytest
+
+from agent import Agent
+from maze_generator import generate_maze
+from maze_keeper import Grid
+from simulation import Simulation
+from trace_export import (AGENT, BORDER, MIN_CODE_SIZE, PALETTE, TRAIL, export_asciicast, export_gif,
+                          export_png_strip, lzw_encode)
+
+
+def lzw_decode(data, min_code_size=MIN_CODE_SIZE):
+    """Plain GIF LZW decoder checking the encoder"""
+    clear, end = 1 << min_code_size, (1 << min_code_size) + 1
+    bits, position, total = int.from_bytes(data, 'little'), 0, 8 * len(data)
+    code_size = min_code_size + 1
+    table, previous, output = None, None, bytearray()
+    while position + code_size <= total:
+        code = bits >> position & (1 << code_size) - 1
+        position += code_size
+        if code == clear:
+            table = [bytes([i]) for i in range(clear)] + [b'', b'']
+            code_size, previous = min_code_size + 1, None
+            continue
+        if code == end:
+            break
+        if previous is None:
+            entry = table[code]
+        else:
+            entry = table[code] if code < len(table) else previous + previous[:1]
+            if len(table) < 4096:
+                table.append(previous + entry[:1])
+        output += entry
+        previous = entry
+        if len(table) == 1 << code_size and code_size < 12:
+            code_size += 1
+    return bytes(output)
+
+
+def read_gif(path):
+    """Returns (width, height, frames) of the GIF, frames are (left, top, width, height, pixels)"""
+    with open(path, 'rb') as file:
+        data = file.read()
+    assert data[:6] == b'GIF89a' and data[-1:] == b'\x3b'
+    width, height, flags = struct.unpack_from('<HHB', data, 6)
+    offset = 13 + 3 * (2 << (flags & 7))
+    frames = []
+    while data[offset] != 0x3b:
+        if data[offset] == 0x21:
+            offset += 2
+            while data[offset]:
+                offset += data[offset] + 1
+            offset += 1
+            continue
+        left, top, frame_width, frame_height, _ = struct.unpack_from('<HHHHB', data, offset + 1)
+        offset += 10
+        min_code_size = data[offset]
+        offset += 1
+        blocks = bytearray()
+        while data[offset]:
+            blocks += data[offset + 1:offset + 1 + data[offset]]
+            offset += data[offset] + 1
+        offset += 1
+        frames.append((left, top, frame_width, frame_height, lzw_decode(bytes(blocks), min_code_size)))
+    return width, height, frames
+
+
+def final_colors(layout, trace):
+    """Cell colors after the whole trace with the agent at its last position"""
+    grid = Grid.from_layout(layout)
+    colors = bytearray(grid.cells)
+    previous = None
+    for r, c in trace:
+        if previous is not None:
+            colors[previous] = TRAIL[colors[previous]]
+        previous = r * grid.cols + c
+    colors[previous] = AGENT
+    return grid, colors
+
+
+@pytest.fixture(scope='module')
+def episode():
+    random.seed(3)
+    trace, layout = Simulation((15, 19), 5000, False, partial(Agent, planner='dstar'), generate_maze).run()
+    return layout, trace
+
+
+@pytest.mark.parametrize('length', [1, 2, 100, 5000, 30000])
+@pytest.mark.parametrize('alphabet', [2, 8])
+def test_lzw_round_trip(length, alphabet):
+    rng = random.Random(length)
+    pixels = bytes(rng.randrange(alphabet) for _ in range(length))
+    assert lzw_decode(lzw_encode(pixels)) == pixels
+
+
+@pytest.mark.parametrize('steps_per_frame, scale', [(1, 1), (7, 3)])
+def test_gif_ends_with_the_whole_trace(tmp_path, episode, steps_per_frame, scale):
+    layout, trace = episode
+    path = str(tmp_path / 'run.gif')
+    export_gif(layout, trace, path, speed=0.05, steps_per_frame=steps_per_frame, scale=scale)
+    width, height, frames = read_gif(path)
+    grid, colors = final_colors(layout, trace)
+    assert (width, height) == (grid.cols * scale, grid.rows * scale)
+    assert len(frames) == 1 + (len(trace) + steps_per_frame - 1) // steps_per_frame
+    canvas = bytearray(width * height)
+    for left, top, frame_width, frame_height, pixels in frames:
+        assert len(pixels) == frame_width * frame_height
+        for y in range(frame_height):
+            start = (top + y) * width + left
+            canvas[start:start + frame_width] = pixels[y * frame_width:(y + 1) * frame_width]
+    assert all(canvas[r * scale * width + c * scale] == colors[r * grid.cols + c]
+               for r in range(grid.rows) for c in range(grid.cols))
+
+
+def test_png_strip_ends_with_the_whole_trace(tmp_path, episode):
+    layout, trace = episode
+    path = str(tmp_path / 'run.png')
+    export_png_strip(layout, trace, path, snapshots=4, scale=2)
+    with open(path, 'rb') as file:
+        data = file.read()
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    chunks, offset = {}, 8
+    while offset < len(data):
+        length, = struct.unpack_from('>I', data, offset)
+        kind, body = data[offset + 4:offset + 8], data[offset + 8:offset + 8 + length]
+        assert struct.unpack_from('>I', data, offset + 8 + length)[0] == zlib.crc32(kind + body)
+        chunks[kind] = body
+        offset += 12 + length
+    assert chunks[b'PLTE'] == PALETTE and b'IEND' in chunks
+    width, height = struct.unpack_from('>II', chunks[b'IHDR'])
+    grid, colors = final_colors(layout, trace)
+    assert (width, height) == (4 * (grid.cols + 1) * 2 - 2, grid.rows * 2)
+    lines = zlib.decompress(chunks[b'IDAT'])
+    assert len(lines) == height * (width + 1)
+    for r in range(grid.rows):
+        line = lines[2 * r * (width + 1) + 1:(2 * r + 1) * (width + 1)]
+        # the last snapshot is the rightmost one, it is preceded by a border
+        assert line[-2 * grid.cols - 1] == BORDER
+        assert line[-2 * grid.cols::2] == bytes(colors[r * grid.cols:(r + 1) * grid.cols])
+
+
+def test_asciicast_has_event_per_frame(tmp_path, episode):
+    layout, trace = episode
+    path = str(tmp_path / 'run.cast')
+    export_asciicast(layout, trace, path, speed=0.1, steps_per_frame=3, title='run')
+    with open(path) as file:
+        lines = file.read().splitlines()
+    header = json.loads(lines[0])
+    assert header['version'] == 2 and header['title'] == 'run'
+    events = [json.loads(line) for line in lines[1:]]
+    assert len(events) == 2 + (len(trace) + 2) // 3
+    times = [event[0] for event in events]
+    assert times == sorted(times)
+    assert 'Step: {}'.format(len(trace) - 1) in events[-2][2]
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from agent import Agent
+from maze_generator import generate_maze
+from simulation import Simulation
+from trace_file import CHUNK, ArraySink, TraceReader, TraceWriter, position_typecode, read_trace
+
+
+def test_position_typecode():
+    assert position_typecode((30, 50)) == 'h'
+    assert position_typecode((10, 2 ** 15)) == 'h'
+    assert position_typecode((2 ** 15 + 1, 10)) == 'i'
+
+
+@pytest.mark.parametrize('maze_size', [(30, 50), (100000, 3)])
+def test_written_trace_is_read_back(tmp_path, maze_size):
+    rng = random.Random(5)
+    positions = [(rng.randrange(maze_size[0]), rng.randrange(maze_size[1])) for _ in range(3 * CHUNK + 17)]
+    path = str(tmp_path / 'run.trace')
+    with TraceWriter(path, maze_size) as writer:
+        for position in positions:
+            writer.append(position)
+        assert len(writer) == len(positions)
+    reader = TraceReader(path)
+    assert reader.maze_size == maze_size
+    assert len(reader) == len(positions)
+    assert list(reader) == positions
+
+    sink = ArraySink(maze_size)
+    for position in positions:
+        sink.append(position)
+    assert len(sink) == len(positions)
+    assert list(sink) == positions
+
+
+def test_simulation_streams_trace_to_file(tmp_path):
+    path = str(tmp_path / 'run.trace')
+    random.seed(2)
+    expected, _ = Simulation((15, 21), 5000, False, Agent, generate_maze).run()
+    random.seed(2)
+    with TraceWriter(path, (15, 21)) as writer:
+        Simulation((15, 21), 5000, False, Agent, generate_maze).run(writer)
+    assert list(read_trace(path)) == [tuple(position) for position in expected]
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / 'maze.maze'
+    path.write_bytes(b'MZPK' + bytes(20))
+    with pytest.raises(Exception, match='not a trace file'):
+        TraceReader(str(path))
@@ -0,0 +1,27 @@
+import time
+
+from visualization import Visualization
+
+E, O, G, S = 'EMPTY', 'OBSTACLE', 'GOLD', 'START'
+LAYOUT = [[S, E, E],
+          [O, O, E],
+          [G, E, E]]
+TRACE = [(0, 1), (0, 2), (1, 2), (2, 2), (2, 1), (2, 0)]
+
+
+def test_replay_time_is_bounded_by_speed(capsys):
+    trace = TRACE * 100
+    start = time.perf_counter()
+    Visualization(LAYOUT, speed=0.001).show_trace(trace, fps=50)
+    elapsed = time.perf_counter() - start
+    assert len(trace) * 0.001 * 0.9 <= elapsed < len(trace) * 0.001 + 0.5
+    # only a few frames are drawn, the last one shows the last step
+    output = capsys.readouterr().out
+    assert output.count('Step:') <= elapsed * 50 + 2
+    assert output.rstrip().endswith('\x1b[?25h') and 'Step: {}'.format(len(trace) - 1) in output
+
+
+def test_last_step_counter_is_drawn_when_agent_stays(capsys):
+    Visualization(LAYOUT, speed=0).show_trace([(0, 1), (0, 1), (0, 1)], fps=1)
+    output = capsys.readouterr().out
+    assert 'Step: 0' in output and 'Step: 2' in output
@@ -0,0 +1,337 @@
+import json
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from cells import Cell
+from maze_file import load_maze
+from maze_keeper import Grid
+from trace_file import TraceReader
+from visualization import Visualization
+
+"""
+Headless export of agent traces for reviewing runs without a terminal.
+A (layout, trace) pair, e.g. from Simulation.run or from maze and trace files, is exported to
+an asciicast v2 recording (replayed by asciinema), an animated GIF and a PNG strip of snapshots.
+Nothing sleeps, frames get their time from the step number. Only the cells changed between two frames are encoded:
+the asciicast events redraw them by ANSI sequences, the GIF frames are sub-images covering just the changed cells.
+The GIF and the PNG strip mark the cells the agent has visited. GIF uses a hand-written LZW encoder, PNG uses zlib.
+Traces are iterated only once, so TraceReader exports traces larger than the memory.
+Run this file from console with maze/trace files or directories written by sweep, use --help to see the options.
+"""
+
+FORMATS = ('cast', 'gif', 'png')
+
+# palette of the images, the cell codes are the indexes of their colors
+VISITED = 4
+AGENT = 5
+BORDER = 6
+PALETTE = bytes([255, 255, 255,  # EMPTY
+                 40, 40, 40,     # OBSTACLE
+                 255, 200, 0,    # GOLD
+                 0, 160, 0,      # START
+                 170, 200, 255,  # visited
+                 220, 0, 0,      # agent
+                 128, 128, 128,  # border between snapshots of the strip
+                 0, 0, 0])
+# cell colors after the agent leaves the cell, start and gold keep their colors
+TRAIL = bytes(VISITED if code == Cell.EMPTY else code for code in range(256))
+# GIF codes are at least 3 bits, enough for the 8 colors of the palette
+MIN_CODE_SIZE = 3
+MAX_CODES = 4096
+
+
+def as_grid(layout):
+    return Grid.from_layout(layout) if isinstance(layout, list) else layout
+
+
+def as_layout(layout):
+    return layout if isinstance(layout, list) else layout.to_layout()
+
+
+def frames(trace, steps_per_frame=1):
+    """Groups positions of the trace to frames, yields (step of the last position, positions of the frame)"""
+    positions = []
+    step = -1
+    for step, position in enumerate(trace):
+        positions.append(tuple(position))
+        if len(positions) == steps_per_frame:
+            yield step, positions
+            positions = []
+    if positions:
+        yield step, positions
+
+
+def export_asciicast(layout, trace, path, speed=0.1, steps_per_frame=1, title=None):
+    """
+    Writes asciicast v2 recording of the trace, the same picture as Visualization.show_trace shows.
+    The first event draws the whole maze, every other event only moves the agent (Visualization.draw_step).
+    :param speed: seconds per step in the recording
+    :param steps_per_frame: number of steps merged to one event
+    """
+    visualization = Visualization(as_layout(layout), speed=speed)
+    rows, cols = len(visualization.rows), len(visualization.rows[0])
+    header = {'version': 2, 'width': cols + 2, 'height': rows + 4}
+    if title is not None:
+        header['title'] = title
+    event = '[{:.3f}, "o", {}]\n'.format
+    with open(path, 'w') as file:
+        file.write(json.dumps(header) + '\n')
+        file.write(event(0, json.dumps(visualization.board())))
+        drawn = None
+        step = 0
+        for step, positions in frames(trace, steps_per_frame):
+            file.write(event((step + 1) * speed, json.dumps(visualization.draw_step(step, drawn, positions[-1]))))
+            drawn = positions[-1]
+        file.write(event((step + 2) * speed, json.dumps(visualization.board_end())))
+
+
+def lzw_encode(pixels, min_code_size=MIN_CODE_SIZE):
+    """Returns GIF LZW compressed pixels (bytes of palette indexes), not split to sub-blocks"""
+    clear = 1 << min_code_size
+    end = clear + 1
+    output = bytearray()
+    # bits waiting for output, the first code is in the lowest bits
+    bits = clear
+    bit_count = code_size = min_code_size + 1
+    table = {}
+    next_code = end + 1
+    prefix = pixels[0]
+    for pixel in pixels[1:]:
+        key = prefix << 8 | pixel
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        bits |= prefix << bit_count
+        bit_count += code_size
+        if next_code < MAX_CODES:
+            table[key] = next_code
+            next_code += 1
+            # the decoder adds its entries one code later
+            if next_code > 1 << code_size and code_size < 12:
+                code_size += 1
+        else:
+            bits |= clear << bit_count
+            bit_count += code_size
+            table.clear()
+            next_code = end + 1
+            code_size = min_code_size + 1
+        prefix = pixel
+        if bit_count >= 64:
+            output += (bits & 0xffffffffffffffff).to_bytes(8, 'little')
+            bits >>= 64
+            bit_count -= 64
+    bits |= prefix << bit_count
+    bit_count += code_size
+    bits |= end << bit_count
+    bit_count += code_size
+    output += bits.to_bytes((bit_count + 7) // 8, 'little')
+    return bytes(output)
+
+
+def sub_blocks(data):
+    """Splits data to GIF sub-blocks of at most 255 bytes followed by the block terminator"""
+    blocks = [bytes([len(data[i:i + 255])]) + data[i:i + 255] for i in range(0, len(data), 255)]
+    return b''.join(blocks) + b'\x00'
+
+
+class CellImage:
+    """Colors of all cells of the maze (palette indexes), rendered to pixels scale times enlarged"""
+
+    def __init__(self, grid, scale=1):
+        self.rows, self.cols = grid.rows, grid.cols
+        self.scale = scale
+        self.colors = bytearray(b''.join(grid.iter_rows()))
+        self.scaled = [bytes([color]) * scale for color in range(256)]
+
+    def pixel_row(self, r, first, last):
+        """Returns pixels of one line of the cells first..last-1 of the row r"""
+        row = self.colors[r * self.cols + first:r * self.cols + last]
+        if self.scale == 1:
+            return bytes(row)
+        return b''.join(map(self.scaled.__getitem__, row))
+
+    def pixels(self, top, left, bottom, right):
+        """Returns pixels of the rectangle of cells top..bottom-1 x left..right-1 row by row"""
+        lines = []
+        for r in range(top, bottom):
+            lines.extend([self.pixel_row(r, left, right)] * self.scale)
+        return b''.join(lines)
+
+
+def gif_frame(image, top, left, bottom, right, delay):
+    """Returns graphic control extension and image of the rectangle of cells, the previous frames stay under it"""
+    scale = image.scale
+    # disposal 1 (do not dispose), delay in hundredths of a second, no transparency
+    control = b'\x21\xf9\x04' + struct.pack('<BHBB', 1 << 2, delay, 0, 0)
+    descriptor = b'\x2c' + struct.pack('<HHHHB', left * scale, top * scale, (right - left) * scale,
+                                       (bottom - top) * scale, 0)
+    data = lzw_encode(image.pixels(top, left, bottom, right))
+    return control + descriptor + bytes([MIN_CODE_SIZE]) + sub_blocks(data)
+
+
+def export_gif(layout, trace, path, speed=0.1, steps_per_frame=1, scale=1):
+    """
+    Writes animated GIF of the trace, the first frame is the whole maze,
+    every other frame covers only the bounding box of the cells changed since the previous frame.
+    :param speed: seconds per step, GIF delays are in hundredths of a second, at least 2
+    :param steps_per_frame: number of steps merged to one frame
+    :param scale: size of a cell in pixels
+    """
+    grid = as_grid(layout)
+    image = CellImage(grid, scale)
+    cols, colors = image.cols, image.colors
+    if image.rows * scale > 0xffff or cols * scale > 0xffff:
+        raise Exception('Maze of size {}x{} is too large for GIF'.format(image.rows, cols))
+    delay = max(2, round(speed * steps_per_frame * 100))
+    with open(path, 'wb') as file:
+        file.write(b'GIF89a' + struct.pack('<HHBBB', cols * scale, image.rows * scale, 0xf2, 0, 0) + PALETTE)
+        # loop forever
+        file.write(b'\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00')
+        file.write(gif_frame(image, 0, 0, image.rows, cols, delay))
+        agent = None
+        for _, positions in frames(trace, steps_per_frame):
+            changed = [agent] if agent is not None else []
+            for r, c in positions:
+                agent = r * cols + c
+                changed.append(agent)
+                colors[agent] = TRAIL[colors[agent]]
+            top, bottom = min(changed) // cols, max(changed) // cols + 1
+            left = min(cell % cols for cell in changed)
+            right = max(cell % cols for cell in changed) + 1
+            # the agent is drawn only into the frame, its cell keeps the trail color
+            color, colors[agent] = colors[agent], AGENT
+            file.write(gif_frame(image, top, left, bottom, right, delay))
+            colors[agent] = color
+        file.write(b'\x3b')
+
+
+def png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def export_png_strip(layout, trace, path, snapshots=8, scale=1, length=None):
+    """
+    Writes PNG strip of snapshots of the maze taken at evenly spaced steps of the trace (the last one at its end),
+    side by side separated by a border.
+    :param length: number of positions of the trace, needed only if the trace has no len
+    """
+    grid = as_grid(layout)
+    image = CellImage(grid, scale)
+    rows, cols, colors = image.rows, image.cols, image.colors
+    length = len(trace) if length is None else length
+    steps = sorted({(length - 1) * (i + 1) // snapshots for i in range(snapshots)}) if length else []
+    taken = []
+    agent = None
+    for step, (r, c) in enumerate(trace):
+        if agent is not None:
+            colors[agent] = TRAIL[colors[agent]]
+        agent = r * cols + c
+        if step == steps[len(taken)]:
+            taken.append(bytes(colors[:agent]) + bytes([AGENT]) + bytes(colors[agent + 1:]))
+            if len(taken) == len(steps):
+                break
+    if not taken:
+        taken.append(bytes(colors))
+
+    border = bytes([BORDER]) * scale
+    width = len(taken) * (cols + 1) * scale - scale
+    lines = []
+    for r in range(rows):
+        parts = []
+        for snapshot in taken:
+            image.colors = snapshot
+            parts.append(image.pixel_row(r, 0, cols))
+        lines.extend([b'\x00' + border.join(parts)] * scale)
+    header = struct.pack('>IIBBBBB', width, rows * scale, 8, 3, 0, 0, 0)
+    with open(path, 'wb') as file:
+        file.write(b'\x89PNG\r\n\x1a\n')
+        file.write(png_chunk(b'IHDR', header))
+        file.write(png_chunk(b'PLTE', PALETTE))
+        file.write(png_chunk(b'IDAT', zlib.compress(b''.join(lines), 6)))
+        file.write(png_chunk(b'IEND', b''))
+
+
+def export_files(maze_path, trace_path, formats=FORMATS, speed=0.1, steps_per_frame=1, scale=1):
+    """
+    Exports trace file (trace_file.TraceWriter) of the agent in the maze file (maze_file.save_maze)
+    to files named as the trace file with the extensions of formats.
+    :return: list of written paths
+    """
+    grid = load_maze(maze_path)
+    trace = TraceReader(trace_path)
+    stem = os.path.splitext(trace_path)[0]
+    written = []
+    try:
+        for extension in formats:
+            path = '{}.{}'.format(stem, extension)
+            if extension == 'cast':
+                export_asciicast(grid, trace, path, speed, steps_per_frame, title=os.path.basename(stem))
+            elif extension == 'gif':
+                export_gif(grid, trace, path, speed, steps_per_frame, scale)
+            elif extension == 'png':
+                export_png_strip(grid, trace, path, scale=scale)
+            else:
+                raise Exception('Unknown export format {}, use one of {}'.format(extension, FORMATS))
+            written.append(path)
+    finally:
+        grid.close()
+    return written
+
+
+def _export_pair(pair, options):
+    return export_files(*pair, **options)
+
+
+def export_directory(directory, formats=FORMATS, workers=None, **options):
+    """
+    Exports all traces of the directory written by sweep (every NAME.trace with its NAME.maze)
+    in a pool of worker processes.
+    :param options: speed, steps_per_frame and scale passed to export_files
+    :return: list of written paths
+    """
+    pairs = []
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        maze_path = os.path.join(directory, stem + '.maze')
+        if extension == '.trace' and os.path.exists(maze_path):
+            pairs.append((maze_path, os.path.join(directory, name)))
+    options = dict(options, formats=formats)
+    workers = workers or os.cpu_count() or 1
+    written = []
+    if workers == 1 or len(pairs) <= 1:
+        for pair in pairs:
+            written.extend(_export_pair(pair, options))
+        return written
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for paths in executor.map(_export_pair, pairs, [options] * len(pairs)):
+            written.extend(paths)
+    return written
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    import time
+
+    parser = argparse.ArgumentParser(description='Export of agent traces to asciicast, GIF and PNG strip')
+    parser.add_argument('paths', nargs='+', help='trace files (the maze file has the same name with .maze) '
+                                                 'or directories written by sweep')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS))
+    parser.add_argument('--speed', type=float, default=0.1, help='seconds per step')
+    parser.add_argument('--steps-per-frame', type=int, default=1)
+    parser.add_argument('--scale', type=int, default=1, help='size of a cell in pixels')
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+
+    start = time.time()
+    options = dict(speed=args.speed, steps_per_frame=args.steps_per_frame, scale=args.scale)
+    written = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            written += export_directory(path, args.formats, args.workers, **options)
+        else:
+            written += export_files(os.path.splitext(path)[0] + '.maze', path, args.formats, **options)
+    print('{} files written in {:.2f} s'.format(len(written), time.time() - start), file=sys.stderr)
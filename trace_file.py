@@ -0,0 +1,128 @@
+import struct
+import sys
+from array import array
+
+"""
+Compact storage of agent traces.
+Positions are stored as packed pairs of 16-bit integers (32-bit for mazes larger than 32767 cells in any direction),
+either in memory (ArraySink) or in a binary file written while the simulation runs (TraceWriter).
+Trace file starts with a header: magic, format version, array typecode and size of the maze,
+positions follow as little-endian (r, c) pairs.
+"""
+
+MAGIC = b'MZTR'
+VERSION = 1
+HEADER = struct.Struct('<4sBcII')
+# number of positions read or written at once
+CHUNK = 4096
+
+
+def position_typecode(maze_size):
+    """Returns array typecode large enough to store coordinates in the maze of the given size"""
+    return 'h' if max(maze_size) <= 2 ** 15 else 'i'
+
+
+class ArraySink:
+    """Trace kept in memory as array of packed (r, c) pairs"""
+
+    def __init__(self, maze_size):
+        self.positions = array(position_typecode(maze_size))
+
+    def append(self, position):
+        self.positions.extend(position)
+
+    def __len__(self):
+        return len(self.positions) // 2
+
+    def __iter__(self):
+        positions = self.positions
+        for i in range(0, len(positions), 2):
+            yield positions[i], positions[i + 1]
+
+
+class TraceWriter:
+    """
+    Writes trace to a binary file while the simulation runs.
+    Can be passed to Simulation.run as the trace, positions are buffered and written in chunks.
+    """
+
+    def __init__(self, path, maze_size):
+        self.maze_size = maze_size
+        self.typecode = position_typecode(maze_size)
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.typecode.encode(), maze_size[0], maze_size[1]))
+        self.buffer = array(self.typecode)
+        self.count = 0
+
+    def append(self, position):
+        self.buffer.extend(position)
+        self.count += 1
+        if len(self.buffer) >= 2 * CHUNK:
+            self.flush()
+
+    def flush(self):
+        if sys.byteorder == 'big':
+            self.buffer.byteswap()
+        self.buffer.tofile(self.file)
+        self.buffer = array(self.typecode)
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TraceReader:
+    """
+    Reads trace file written by TraceWriter.
+    Iterating over the reader yields (r, c) positions, the file is read in chunks, never as a whole.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            magic, version, typecode, rows, cols = HEADER.unpack(file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise Exception('{} is not a trace file of version {}'.format(path, VERSION))
+            file.seek(0, 2)
+            size = file.tell() - HEADER.size
+        self.typecode = typecode.decode()
+        self.maze_size = (rows, cols)
+        self.count = size // (2 * array(self.typecode).itemsize)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        itemsize = array(self.typecode).itemsize
+        with open(self.path, 'rb') as file:
+            file.seek(HEADER.size)
+            while True:
+                data = file.read(2 * CHUNK * itemsize)
+                if not data:
+                    return
+                positions = array(self.typecode, data)
+                if sys.byteorder == 'big':
+                    positions.byteswap()
+                for i in range(0, len(positions), 2):
+                    yield positions[i], positions[i + 1]
+
+
+def read_trace(path):
+    """Yields positions stored in the trace file"""
+    return iter(TraceReader(path))
+
+
+def replay_trace(path, layout, speed=0.1):
+    """Shows trace stored in the file in the console without loading it to memory"""
+    from visualization import Visualization
+    Visualization(layout, speed=speed).show_trace(TraceReader(path))
@@ -1,5 +1,6 @@
 # coding: utf8
 import os
+import sys
 import time
 
 MAZE_OBJECTS = {'EMPTY', 'OBSTACLE', 'GOLD', 'START'}
@@ -9,6 +10,13 @@ VISUALIZATION_OBJECT_MAPPING = {'EMPTY': ' ',  # '.',
                                 'GOLD': 'G',
                                 'AGENT': 'O',
                                 'START': 'X'}  # '_'}
+# ANSI escape sequences used by the differential renderer
+CSI = '\x1b['
+CLEAR_SCREEN = CSI + '2J' + CSI + 'H'
+HIDE_CURSOR = CSI + '?25l'
+SHOW_CURSOR = CSI + '?25h'
+# terminal row of the top border of the maze, the line above shows the step
+BOARD_TOP = 2
 
 
 class Visualization:
@@ -20,6 +28,7 @@ class Visualization:
         self.N = len(layout[1])
         self.draw_mapping = VISUALIZATION_OBJECT_MAPPING
         self.speed = speed
+        self.rows = [''.join(self.draw_mapping[cell] for cell in row) for row in layout]
 
     def line(self, top=True):
         corners = ('╔', '╗') if top else ('╚', '╝')
@@ -30,26 +39,87 @@ class Visualization:
         os.system('cls' if os.name == 'nt' else 'clear')
 
     def show(self, agent_cord=()):
+        rows = list(self.rows)
+        for r, c in agent_cord:
+            rows[r] = rows[r][:c] + self.draw_mapping['AGENT'] + rows[r][c + 1:]
         output = [self.line(top=True), '\n']
-        for r, row in enumerate(self.layout):
+        for row in rows:
             output.append('║')
-            for c, cell in enumerate(row):
-                if (r, c) in agent_cord:
-                    output.append(self.draw_mapping['AGENT'])
-                else:
-                    output.append(self.draw_mapping[cell])
+            output.append(row)
             output.append('║\n')
         output.append(self.line(top=False))
         output.append('\n')
 
         print(''.join(output))
 
-    def show_trace(self, trace):
-        for step, position in enumerate(trace):
-            self.cls()
-            print('\t Step: {}'.format(step))
-            self.show(agent_cord=[position])
-            time.sleep(self.speed)
+    def board(self):
+        """Returns ANSI sequences clearing the screen and drawing the whole maze without the agent"""
+        output = [CLEAR_SCREEN + HIDE_CURSOR + '\n', self.line(top=True) + '\n']
+        for row in self.rows:
+            output.append('║' + row + '║\n')
+        output.append(self.line(top=False) + '\n')
+        return ''.join(output)
+
+    def board_end(self):
+        """Returns ANSI sequences moving the cursor below the maze and showing it again"""
+        return '{}{};1H{}\n'.format(CSI, BOARD_TOP + len(self.rows) + 2, SHOW_CURSOR)
+
+    @staticmethod
+    def move_to(r, c):
+        """Returns ANSI sequence moving the cursor to the cell (r,c) of the maze"""
+        return '{}{};{}H'.format(CSI, BOARD_TOP + r + 1, c + 2)
+
+    def draw_step(self, step, old_position, new_position):
+        """Returns ANSI sequences redrawing the step counter and the cells changed by the move of the agent"""
+        output = [CSI + '1;1H', '\t Step: {}'.format(step)]
+        if old_position is not None:
+            output.append(self.move_to(*old_position))
+            output.append(self.rows[old_position[0]][old_position[1]])
+        output.append(self.move_to(*new_position))
+        output.append(self.draw_mapping['AGENT'])
+        return ''.join(output)
+
+    def show_trace(self, trace, fps=None):
+        """
+        Shows the agent moving along the trace.
+        The maze is drawn once, afterwards only the cells changed between the frames are redrawn.
+        Every step is due speed seconds after the previous one, the replay waits for the due time of each step
+        measured from the start (perf_counter), so drawing does not slow it down and it takes about
+        len(trace) * speed seconds.
+        :param trace: iterable of positions of the agent
+        :param fps: if given, at most fps frames per second are drawn, steps due sooner than the next frame are
+                    skipped; the last step is always drawn
+        """
+        if os.name == 'nt':
+            # enables processing of ANSI sequences in Windows console
+            os.system('')
+        out = sys.stdout
+        out.write(self.board())
+
+        drawn = drawn_step = None
+        frame_time = 1 / fps if fps else 0
+        start = time.perf_counter()
+        next_frame = start
+        step = position = None
+        try:
+            for step, position in enumerate(trace):
+                now = time.perf_counter()
+                due = start + step * self.speed
+                if now < due:
+                    time.sleep(due - now)
+                    now = due
+                if now < next_frame:
+                    continue
+                next_frame = now + frame_time
+                out.write(self.draw_step(step, drawn, position))
+                out.flush()
+                drawn, drawn_step = position, step
+            # the last step may have been skipped, draw its position and counter
+            if step is not None and step != drawn_step:
+                out.write(self.draw_step(step, drawn, position))
+        finally:
+            out.write(self.board_end())
+            out.flush()
 
 
 if __name__ == '__main__':